@@ -1,10 +1,14 @@
 from datetime import datetime
+from typing import Optional
+
+from BHKW_Entscheidung import STATUSTEXTE, statuscode
 
 def anlagensteuerung_bhkw(
     Stoerung: bool,
     Schalter: bool,
     Wartungsmeldung: bool,
-    Thermische_Desinfektion: bool
+    Thermische_Desinfektion: bool,
+    jetzt: Optional[datetime] = None
 ) -> str:
     """
     Steuert das BHKW basierend auf verschiedenen Signalen und der aktuellen Uhrzeit.
@@ -14,37 +18,20 @@ def anlagensteuerung_bhkw(
     - Schalter: True, wenn der Hauptschalter eingeschaltet ist.
     - Wartungsmeldung: True, wenn eine Wartung ansteht.
     - Thermische_Desinfektion: True, wenn die thermische Desinfektion aktiv ist.
+    - jetzt: Zeitpunkt der Entscheidung (Standard: aktuelle Uhrzeit).
 
     Rückgabe:
     Ein formatiertes Status-String mit Uhrzeit.
     """
 
-    # 1. Aktuelle Zeit ermitteln
-    aktuelle_zeit = datetime.now()
-    # 2. Nur die Stunde extrahieren (0–23)
-    aktuelle_stunde = aktuelle_zeit.hour
-
-    # 3. Prioritäten-Logik:
-    #    a) Immer zuerst Störungen behandeln
-    if Stoerung:
-        status_text = "BHKW aus: Störung erkannt"
-    #    b) Dann Wartungshinweise
-    elif Wartungsmeldung:
-        status_text = "BHKW aus: Wartung erforderlich"
-    #    c) Dann thermische Desinfektion
-    elif Thermische_Desinfektion:
-        status_text = "BHKW aus: Thermische Desinfektion aktiv"
-    #    d) Wenn der Schalter aus ist, unabhängig von der Zeit ausschalten
-    elif not Schalter:
-        status_text = "BHKW aus: Schalter ist ausgeschaltet"
-    #    e) Innerhalb der gewünschten Betriebszeit einschalten
-    elif 6 <= aktuelle_stunde < 22:
-        status_text = "BHKW ein: in Ordnung"
-    #    f) Außerhalb der Betriebszeit ausschalten
-    else:
-        status_text = "BHKW aus: außerhalb der Betriebszeit"
+    # Prioritäten-Logik (Störung, Wartung, Desinfektion, Schalter, Betriebszeit)
+    # liegt in BHKW_Entscheidung.statuscode
+    code = statuscode(
+        Stoerung, Schalter, Wartungsmeldung, Thermische_Desinfektion, jetzt
+    )
+    status_text = STATUSTEXTE[code]
 
-    # 4. Ergebnis-String zusammenstellen und zurückgeben
+    # Ergebnis-String zusammenstellen und zurückgeben
     return f"{status_text}" #um {aktuelle_zeit.strftime('%H:%M:%S')}
 
 # Beispielaufruf
@@ -1,73 +1,64 @@
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from BHKW_Aussentemperatur_3Tage import berechnung_3_tage_mittelwert
+from BHKW_Entscheidung import STATUSTEXTE, Statuscode, statuscode
+from BHKW_Gleitender_Mittelwert import HEIZGRENZE
 
 def anlagensteuerung_bhkw(
     Stoerung: bool,
     Schalter: bool,
     Wartungsmeldung: bool,
-    Thermische_Desinfektion: bool
+    Thermische_Desinfektion: bool,
+    jetzt: Optional[datetime] = None
 ) -> str:
     """
     Steuert das BHKW basierend auf Signalen und Uhrzeit.
     Gibt einen Status-String zurück, z.B. "BHKW ein um 14:23:05" oder
     "BHKW aus: <Grund> um HH:MM:SS".
+    `jetzt` ersetzt die Systemuhr (Standard: aktuelle Uhrzeit).
     """
-    aktuelle_zeit = datetime.now()
-    h = aktuelle_zeit.hour
-
-    if Stoerung:
-        status = "BHKW aus: Störung erkannt"
-    elif Wartungsmeldung:
-        status = "BHKW aus: Wartung erforderlich"
-    elif Thermische_Desinfektion:
-        status = "BHKW aus: Thermische Desinfektion aktiv"
-    elif not Schalter:
-        status = "BHKW aus: Schalter ist ausgeschaltet"
-    elif 6 <= h < 22:
-        status = "BHKW ein"
-    else:
-        status = "BHKW aus: außerhalb der Betriebszeit"
+    aktuelle_zeit = jetzt or datetime.now()
+    code = statuscode(
+        Stoerung, Schalter, Wartungsmeldung, Thermische_Desinfektion, aktuelle_zeit
+    )
+    status = "BHKW ein" if code == Statuscode.EIN else STATUSTEXTE[code]
 
     return f"{status} um {aktuelle_zeit.strftime('%H:%M:%S')}"
 
-def berechnung_3_tage_mittelwert(
-    temperaturdaten: Dict[int, List[float]]
-) -> float:
-    """
-    Berechnet den Durchschnitt der Außentemperatur über 3 Tage.
-    Erwartet temperaturdaten = {1: [t1,t2,t3], 2: [...], 3: [...]}.
-    """
-    if set(temperaturdaten.keys()) != {1, 2, 3}:
-        raise ValueError("Temperaturdaten muss die Schlüssel 1, 2 und 3 enthalten.")
-    for tag, werte in temperaturdaten.items():
-        if not isinstance(werte, list) or len(werte) != 3:
-            raise ValueError(f"Für Tag {tag} müssen genau 3 Messwerte vorliegen.")
-
-    tage_mw = [sum(temperaturdaten[tag]) / 3 for tag in sorted(temperaturdaten)]
-    return sum(tage_mw) / 3
-
 def ansteuerung_bhkw(
     Stoerung: bool,
     Schalter: bool,
     Wartungsmeldung: bool,
     Thermische_Desinfektion: bool,
-    temperaturdaten: Dict[int, List[float]]
+    temperaturdaten: Optional[Dict[int, List[float]]] = None,
+    aussentemp_mittelwert: Optional[float] = None,
+    jetzt: Optional[datetime] = None
 ) -> str:
     """
     Gibt den Schaltbefehl 'AN' oder 'AUS' zurück:
       - 'AN', wenn das BHKW laut anlagensteuerung_bhkw ein ist
          UND der 3‑Tage‑Mittelwert ≤ 18°C.
       - 'AUS' sonst (wenn BHKW aus oder Mittelwert > 18°C).
+
+    Der Mittelwert kann direkt als aussentemp_mittelwert übergeben werden
+    (z.B. aus einem GleitenderMittelwert), dann entfällt die Berechnung
+    aus temperaturdaten. `jetzt` ersetzt die Systemuhr.
     """
-    status = anlagensteuerung_bhkw(
-        Stoerung, Schalter, Wartungsmeldung, Thermische_Desinfektion
+    # Statuscode statt Status-String: kein Formatieren, kein Textvergleich
+    code = statuscode(
+        Stoerung, Schalter, Wartungsmeldung, Thermische_Desinfektion, jetzt
     )
-    # prüfen, ob Code1 "ein" meldet
-    is_on = status.startswith("BHKW ein")
+    is_on = code == Statuscode.EIN
 
-    avg_temp = berechnung_3_tage_mittelwert(temperaturdaten)
+    if aussentemp_mittelwert is None:
+        if temperaturdaten is None:
+            raise ValueError("temperaturdaten oder aussentemp_mittelwert muss angegeben werden.")
+        avg_temp = berechnung_3_tage_mittelwert(temperaturdaten)
+    else:
+        avg_temp = aussentemp_mittelwert
 
-    if is_on and avg_temp <= 18.0:
+    if is_on and avg_temp <= HEIZGRENZE:
         return "AN"
     else:
         return "AUS"
@@ -1,7 +1,11 @@
 from typing import Dict, List
 
+from BHKW_Metriken import instrumentiert
+
+@instrumentiert("mittelwert")
 def berechnung_3_tage_mittelwert(
-    temperaturdaten: Dict[int, List[float]]
+    temperaturdaten: Dict[int, List[float]],
+    ausgabe: bool = False
 ) -> float:
     """
     Berechnet den Mittelwert der Außentemperatur über 3 Tage,
@@ -10,6 +14,8 @@ def berechnung_3_tage_mittelwert(
     :param temperaturdaten:
         Ein Dictionary mit genau 3 Schlüsseln (1, 2, 3),
         jeweils eine Liste mit genau 3 float-Werten.
+    :param ausgabe:
+        True, um Tages- und Gesamtmittelwerte auszugeben.
     :return:
         Der 3-Tage-Mittelwert (float).
     :raises:
@@ -29,11 +35,13 @@ def berechnung_3_tage_mittelwert(
         werte = temperaturdaten[tag]
         mittelwert = sum(werte) / len(werte)
         tage_mittelwerte.append(mittelwert)
-        print(f"Tagesmittelwert Tag {tag}: {mittelwert:.2f} °C")
+        if ausgabe:
+            print(f"Tagesmittelwert Tag {tag}: {mittelwert:.2f} °C")
 
     # 3. Gesamtmittelwert über 3 Tage
     gesamtdurchschnitt = sum(tage_mittelwerte) / len(tage_mittelwerte)
-    print(f"\n🌡️ Durchschnitt der letzten 3 Tage: {gesamtdurchschnitt:.2f} °C")
+    if ausgabe:
+        print(f"\n🌡️ Durchschnitt der letzten 3 Tage: {gesamtdurchschnitt:.2f} °C")
 
     return gesamtdurchschnitt
 
@@ -47,4 +55,4 @@ if __name__ == "__main__":
     }
 
     # Funktion aufrufen und Ergebnis speichern
-    durchschnitt = berechnung_3_tage_mittelwert(beispiel_daten)
+    durchschnitt = berechnung_3_tage_mittelwert(beispiel_daten, ausgabe=True)
@@ -0,0 +1,195 @@
+import os
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import BHKW_Regelventil as rv
+from BHKW_Einschwingverhalten import analysiere_sprungantwort
+from BHKW_Regelventil import regler_parameter, regler_zustand, simuliere_regelventil, sollwertprofil
+
+# Suchraum je Reglerparameter: (untere Grenze, obere Grenze, logarithmisch)
+SUCHRAUM: Dict[str, Tuple[float, float, bool]] = {
+    "Kp": (0.1, 20.0, True),
+    "Ki": (0.001, 1.0, True),
+    "Kd": (0.0, 5.0, False),
+    "totzone": (0.0, 1.0, False),
+    "reset_band": (0.0, 2.0, False),
+    "max_delta": (1.0, 20.0, False),
+}
+
+# Gewichte der Bewertung: je Sekunde Einschwingzeit, je % Überschwingen,
+# je % Ventilhub (Summe der Stellwertänderungen)
+GEWICHTE = {"einschwingzeit": 1.0, "ueberschwingen": 2.0, "ventilhub": 0.1}
+
+BEWERTUNG_DTYPE = np.dtype([
+    ("kosten", np.float64),
+    ("einschwingzeit", np.float64),
+    ("ueberschwingen", np.float64),
+    ("ventilhub", np.float64),
+])
+
+def bewerte_regler(
+    parameter: np.ndarray,
+    sollwerte: Optional[np.ndarray] = None,
+    T_start: float = rv.T_start,
+    gewichte: Optional[dict] = None,
+    toleranz: float = 0.5,
+    stabil_dauer: int = 30,
+    dt: float = rv.dt
+) -> np.ndarray:
+    """
+    Simuliert alle Parametersätze gleichzeitig auf dem Sollwertprofil und
+    bewertet die Sprungantworten.
+
+    Jeder Sollwertsprung (und der Anlauf von T_start) ist ein eigener
+    Abschnitt; Einschwingzeit und Überschwingen werden über die Abschnitte
+    summiert. Nicht eingeschwungene Abschnitte zählen mit der doppelten
+    Abschnittslänge.
+
+    Rückgabe:
+        Strukturiertes Array (BEWERTUNG_DTYPE), kleinere Kosten sind besser.
+    """
+    gewichte = dict(GEWICHTE, **(gewichte or {}))
+    if sollwerte is None:
+        sollwerte = sollwertprofil()
+    sollwerte = np.asarray(sollwerte, dtype=np.float64)
+    parameter = np.atleast_1d(parameter)
+
+    ergebnis = simuliere_regelventil(parameter, sollwerte, regler_zustand(parameter.size, T_start), dt)
+    temps = ergebnis["T_ist"]
+
+    bewertung = np.zeros(parameter.size, dtype=BEWERTUNG_DTYPE)
+    grenzen = np.concatenate([[0], np.flatnonzero(np.diff(sollwerte)) + 1, [sollwerte.size]])
+    anfang = T_start
+    for start, ende in zip(grenzen[:-1], grenzen[1:]):
+        kennwerte = analysiere_sprungantwort(
+            temps, sollwerte[start], start, anfang, toleranz, stabil_dauer, ende, dt
+        )
+        bewertung["einschwingzeit"] += np.nan_to_num(kennwerte["einschwingzeit"], nan=2 * (ende - start) * dt)
+        bewertung["ueberschwingen"] += np.nan_to_num(kennwerte["ueberschwingen"])
+        anfang = sollwerte[start]
+
+    bewertung["ventilhub"] = np.abs(np.diff(ergebnis["stellwert"], axis=1)).sum(axis=1)
+    bewertung["kosten"] = sum(gewichte[name] * bewertung[name] for name in GEWICHTE)
+    return bewertung
+
+def _zufallskandidaten(rng: np.random.Generator, anzahl: int, bereiche: dict, **anlage) -> np.ndarray:
+    """Gleichverteilte Kandidaten im Suchraum (logarithmische Achsen in log-Skala)."""
+    werte = {}
+    for name, (unten, oben, logarithmisch) in bereiche.items():
+        if logarithmisch:
+            werte[name] = np.exp(rng.uniform(np.log(unten), np.log(oben), anzahl))
+        else:
+            werte[name] = rng.uniform(unten, oben, anzahl)
+    return regler_parameter(anzahl, **werte, **anlage)
+
+def _eingrenzen(beste: np.ndarray, bereiche: dict, erweiterung: float = 0.1) -> dict:
+    """Neuer Suchraum: Hülle der besten Kandidaten, leicht erweitert, innerhalb von SUCHRAUM."""
+    neu = {}
+    for name, (unten, oben, logarithmisch) in bereiche.items():
+        werte = np.log(beste[name]) if logarithmisch else beste[name]
+        rand = erweiterung * max(werte.max() - werte.min(), 1e-9)
+        u, o = werte.min() - rand, werte.max() + rand
+        if logarithmisch:
+            u, o = np.exp(u), np.exp(o)
+        neu[name] = (max(u, SUCHRAUM[name][0]), min(o, SUCHRAUM[name][1]), logarithmisch)
+    return neu
+
+def _bewerte_teil(argumente: tuple) -> np.ndarray:
+    parameter, optionen = argumente
+    return bewerte_regler(parameter, **optionen)
+
+def _bewerte_parallel(parameter: np.ndarray, optionen: dict, pool: Optional[Executor], teile: int) -> np.ndarray:
+    """Teilt die Kandidaten in Blöcke; jeder Block wird vektorisiert simuliert."""
+    if pool is None or teile <= 1:
+        return bewerte_regler(parameter, **optionen)
+    bloecke = np.array_split(parameter, teile)
+    return np.concatenate(list(pool.map(_bewerte_teil, [(block, optionen) for block in bloecke])))
+
+def autotuning(
+    T_kessel: float = rv.T_kessel,
+    T_ruecklauf: float = rv.T_ruecklauf,
+    traegheit: float = rv.traegheit,
+    kandidaten: int = 4096,
+    runden: int = 5,
+    elite: float = 0.1,
+    sollwerte: Optional[np.ndarray] = None,
+    T_start: float = rv.T_start,
+    gewichte: Optional[dict] = None,
+    max_worker: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sucht Verstärkungen und Totzonen für eine Anlage (Mischventil-Strecke
+    mit T_kessel, T_ruecklauf, traegheit) von grob nach fein.
+
+    Runde 1 bewertet `kandidaten` zufällige Parametersätze im SUCHRAUM. Die
+    besten `elite` (Anteil) bestimmen den Suchraum der nächsten Runde, in
+    der nur noch halb so viele Kandidaten bewertet werden (successive
+    halving). Die Bewertung läuft über einen Prozesspool, jeder Worker
+    simuliert seinen Block vektorisiert.
+
+    Rückgabe:
+        (bester Parametersatz als PARAMETER_DTYPE-Array der Länge 1,
+        zugehörige Bewertung als BEWERTUNG_DTYPE-Array der Länge 1)
+    """
+    rng = np.random.default_rng(seed)
+    anlage = dict(T_kessel=T_kessel, T_ruecklauf=T_ruecklauf, traegheit=traegheit)
+    optionen = dict(sollwerte=sollwerte, T_start=T_start, gewichte=gewichte)
+    max_worker = max_worker or os.cpu_count() or 1
+
+    # Startwerte aus BHKW_Regelventil nehmen am Wettbewerb teil
+    bester = regler_parameter(1, **anlage)
+    beste_bewertung = bewerte_regler(bester, **optionen)
+    bereiche = dict(SUCHRAUM)
+
+    pool = ProcessPoolExecutor(max_workers=max_worker) if max_worker > 1 else None
+    try:
+        anzahl = kandidaten
+        for _ in range(runden):
+            parameter = _zufallskandidaten(rng, anzahl, bereiche, **anlage)
+            bewertung = _bewerte_parallel(parameter, optionen, pool, max_worker)
+            reihenfolge = np.argsort(bewertung["kosten"])
+            if bewertung["kosten"][reihenfolge[0]] < beste_bewertung["kosten"][0]:
+                bester = parameter[reihenfolge[:1]]
+                beste_bewertung = bewertung[reihenfolge[:1]]
+            spitze = parameter[reihenfolge[:max(2, int(elite * anzahl))]]
+            bereiche = _eingrenzen(spitze, bereiche)
+            anzahl = max(anzahl // 2, 16)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return bester, beste_bewertung
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="PID-Autotuning für das Mischventil-Modell")
+    parser.add_argument("--T-kessel", type=float, default=rv.T_kessel)
+    parser.add_argument("--T-ruecklauf", type=float, default=rv.T_ruecklauf)
+    parser.add_argument("--traegheit", type=float, default=rv.traegheit)
+    parser.add_argument("--kandidaten", type=int, default=4096)
+    parser.add_argument("--runden", type=int, default=5)
+    parser.add_argument("--worker", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bester, bewertung = autotuning(
+        args.T_kessel, args.T_ruecklauf, args.traegheit, args.kandidaten, args.runden,
+        max_worker=args.worker, seed=args.seed,
+    )
+    ausgangswerte = bewerte_regler(regler_parameter(
+        1, T_kessel=args.T_kessel, T_ruecklauf=args.T_ruecklauf, traegheit=args.traegheit
+    ))
+
+    print(f"Autotuning in {time.perf_counter() - start:.1f} s")
+    for name in SUCHRAUM:
+        print(f"{name:>10} = {bester[name][0]:.4g}")
+    for titel, werte in (("Ausgangswerte", ausgangswerte), ("Optimiert", bewertung)):
+        print(
+            f"{titel}: Kosten {werte['kosten'][0]:.1f}, Einschwingzeit {werte['einschwingzeit'][0]:.0f} s, "
+            f"Überschwingen {werte['ueberschwingen'][0]:.1f} %, Ventilhub {werte['ventilhub'][0]:.0f} %"
+        )
@@ -0,0 +1,354 @@
+import gc
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from BHKW_Anlagensteuerung import anlagensteuerung_bhkw
+from BHKW_Aussentemperatur_3Tage import berechnung_3_tage_mittelwert
+from BHKW_Berechnung_SW_VT import STANDARD_KENNLINIE, berechnung_heizkennlinie, berechnung_heizkennlinie_batch
+from BHKW_Einschwingverhalten import einschwingzeit
+from BHKW_Entscheidung import statuscodes_batch
+from BHKW_Gleitender_Mittelwert import gleitender_mittelwert
+from BHKW_Heizlast import berechne_heizlast_und_vorlauftemperatur
+from BHKW_Regelventil import (
+    berechne_einschwingzeit, regler_parameter, simuliere_regelventil, sollwertprofil
+)
+from BHKW_Regelkern import simuliere_regelventil_kern
+from BHKW_Waermeleistung import berechnung_waermeleistung, berechnung_waermeleistung_array
+
+# Zeitauflösungen (Sekunden je Wert) und Flottengrößen je Stufe
+AUFLOESUNGEN = {"1h": 3600, "1min": 60, "1s": 1}
+STUFEN = {
+    "klein": {"aufloesungen": ("1h", "1min"), "anlagen": (1, 100)},
+    "voll": {"aufloesungen": ("1h", "1min", "1s"), "anlagen": (1, 100, 10_000)},
+}
+SEKUNDEN_PRO_JAHR = 365 * 86_400
+SEED = 20240101
+
+# Ab dieser relativen Verlangsamung gilt ein Fall als Regression
+SCHWELLE = 0.2
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# ---------- Synthetische Daten ----------
+def zeitachse(aufloesung_s: int, dauer_s: int = SEKUNDEN_PRO_JAHR) -> np.ndarray:
+    """Zeitstempel (datetime64[s]) ab 01.01.2024 im Abstand aufloesung_s."""
+    return np.datetime64("2024-01-01T00:00:00") + np.arange(0, dauer_s, aufloesung_s).astype("timedelta64[s]")
+
+def aussentemperatur(anzahl: int, aufloesung_s: int, seed: int = SEED) -> np.ndarray:
+    """Außentemperatur (°C) mit Jahres- und Tagesgang und Rauschen."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(anzahl) * (aufloesung_s / 86_400.0)
+    return (
+        9.0 - 10.0 * np.cos(2 * np.pi * t / 365.0)
+        - 4.0 * np.cos(2 * np.pi * t)
+        + rng.normal(0.0, 1.0, anzahl)
+    )
+
+def vorlauftemperatur(anzahl: int, seed: int = SEED) -> np.ndarray:
+    """Vorlauftemperatur (°C) um 60 °C, gelegentlich unter der Rücklauftemperatur."""
+    return np.random.default_rng(seed + 1).normal(60.0, 8.0, anzahl)
+
+def meldungen(anzahl: int, seed: int = SEED) -> Dict[str, np.ndarray]:
+    """Zufällige Anlagensignale mit realistischen Häufigkeiten."""
+    rng = np.random.default_rng(seed + 2)
+    return {
+        "stoerung": rng.random(anzahl) < 0.01,
+        "schalter": rng.random(anzahl) < 0.95,
+        "wartungsmeldung": rng.random(anzahl) < 0.02,
+        "thermische_desinfektion": rng.random(anzahl) < 0.01,
+    }
+
+def schreibe_wetter_csv(pfad: str, aufloesung_s: int, seed: int = SEED) -> str:
+    """Wetter-CSV im Format der Messdaten (Zeitstempel;Rohwert in m°C)."""
+    zeiten = pd.DatetimeIndex(zeitachse(aufloesung_s))
+    temps = aussentemperatur(zeiten.size, aufloesung_s, seed)
+    pd.DataFrame({
+        "Zeit": zeiten.strftime("%d.%m.%Y %H:%M:%S" if aufloesung_s < 60 else "%d.%m.%Y %H:%M"),
+        "Temp": np.round(temps * 1000).astype(np.int64),
+    }).to_csv(pfad, sep=";", index=False, encoding="latin1")
+    return pfad
+
+# ---------- Benchmark-Fälle ----------
+@dataclass
+class Fall:
+    """Ein Messfall: vorbereiten() erzeugt die Daten und liefert die zu messende Funktion."""
+    name: str
+    groesse: str
+    elemente: int
+    vorbereiten: Callable[[], Callable[[], object]]
+
+    @property
+    def schluessel(self) -> str:
+        return f"{self.name}[{self.groesse}]"
+
+def _kennlinie_argumente() -> list:
+    k = STANDARD_KENNLINIE
+    return [
+        k["sollwert_raumtemperatur"], k["kurve_steilheit"], k["kurve_fixpunkt"],
+        k["kurve_exponent"], k["min_vorlauftemp"], k["max_vorlauftemp"],
+        k["nachtabsenkung_delta"], k["raumtemp_komp_freigabe"],
+        k["norm_raumtemperatur"], k["raumtemp_komp_prozent"],
+    ]
+
+def faelle(stufe: str = "klein", arbeitsverzeichnis: Optional[str] = None) -> List[Fall]:
+    """Alle Messfälle einer Stufe (Zeitreihen je Auflösung, Flotten je Anlagenzahl)."""
+    konfiguration = STUFEN[stufe]
+    arbeitsverzeichnis = arbeitsverzeichnis or tempfile.gettempdir()
+    kennlinie = _kennlinie_argumente()
+    liste: List[Fall] = []
+
+    # Skalare Funktionen: ein Anlagenjahr in Stundenwerten, ein Aufruf je Wert
+    n_h = SEKUNDEN_PRO_JAHR // 3600
+
+    def heizkennlinie_skalar():
+        ta = aussentemperatur(n_h, 3600).tolist()
+        return lambda: [
+            berechnung_heizkennlinie(t, 21.0, *kennlinie, current_hour=i % 24) for i, t in enumerate(ta)
+        ]
+    liste.append(Fall("heizkennlinie_skalar", "1h", n_h, heizkennlinie_skalar))
+
+    def waermeleistung_skalar():
+        # Die skalare Funktion lehnt ΔT ≤ 0 ab
+        tv = np.maximum(vorlauftemperatur(n_h), 40.5).tolist()
+        return lambda: [berechnung_waermeleistung(v, 40.0, 2.5) for v in tv]
+    liste.append(Fall("waermeleistung_skalar", "1h", n_h, waermeleistung_skalar))
+
+    # Vektorisierte Zeitreihen: ein Anlagenjahr je Auflösung
+    for groesse in konfiguration["aufloesungen"]:
+        aufloesung = AUFLOESUNGEN[groesse]
+        n = SEKUNDEN_PRO_JAHR // aufloesung
+
+        def heizkennlinie_batch(n=n, aufloesung=aufloesung, max_fehler=None):
+            ta = aussentemperatur(n, aufloesung)
+            stunden = (np.arange(n) * aufloesung // 3600) % 24
+            return lambda: berechnung_heizkennlinie_batch(
+                ta, 21.0, *kennlinie, stunden=stunden, max_fehler=max_fehler
+            )
+        liste.append(Fall("heizkennlinie_batch", groesse, n, heizkennlinie_batch))
+        liste.append(Fall(
+            "heizkennlinie_tabelle", groesse, n,
+            lambda n=n, aufloesung=aufloesung: heizkennlinie_batch(n, aufloesung, 0.01)
+        ))
+
+        def waermeleistung_array(n=n):
+            tv = vorlauftemperatur(n)
+            return lambda: berechnung_waermeleistung_array(tv, 40.0, 2.5)
+        liste.append(Fall("waermeleistung_array", groesse, n, waermeleistung_array))
+
+        def csv_heizlast(aufloesung=aufloesung, groesse=groesse):
+            pfad = os.path.join(arbeitsverzeichnis, f"wetter_{groesse}.csv")
+            if not os.path.exists(pfad):
+                schreibe_wetter_csv(pfad, aufloesung)
+            return lambda: berechne_heizlast_und_vorlauftemperatur(
+                pfad, 300.0, 20.0, 0.5, 30.0, cache_verzeichnis=None
+            )
+        liste.append(Fall("csv_heizlast", groesse, n, csv_heizlast))
+
+    # PID-Schleife über ein Jahr Stundenwerte (Python-Schleife über die Zeit)
+    def pid_zeitreihe():
+        parameter = regler_parameter()
+        sollwerte = berechnung_heizkennlinie_batch(
+            aussentemperatur(n_h, 3600), 21.0, *kennlinie, stunden=np.arange(n_h) % 24
+        )
+        return lambda: simuliere_regelventil(parameter, sollwerte)
+    liste.append(Fall("pid_zeitreihe", "1h", n_h, pid_zeitreihe))
+
+    # Dieselbe Rekursion als skalarer Kern (Numba, falls installiert, sonst reines Python)
+    for groesse in konfiguration["aufloesungen"]:
+        aufloesung = AUFLOESUNGEN[groesse]
+        n = SEKUNDEN_PRO_JAHR // aufloesung
+
+        def pid_kern(n=n, aufloesung=aufloesung):
+            parameter = regler_parameter()
+            sollwerte = berechnung_heizkennlinie_batch(
+                aussentemperatur(n, aufloesung), 21.0, *kennlinie, stunden=(np.arange(n) * aufloesung // 3600) % 24
+            )
+            simuliere_regelventil_kern(parameter, sollwerte[:10])  # ggf. kompilieren
+            return lambda: simuliere_regelventil_kern(parameter, sollwerte)
+        liste.append(Fall("pid_kern", groesse, n, pid_kern))
+
+    # Flotten: je Anlage ein Tag bzw. eine Sprungantwort
+    for anlagen in konfiguration["anlagen"]:
+        groesse = f"{anlagen}_anlagen"
+
+        def mittelwert_skalar(anlagen=anlagen):
+            ablesungen = aussentemperatur(anlagen * 9, 3600 * 8).reshape(anlagen, 3, 3)
+            daten = [{tag + 1: werte[tag].tolist() for tag in range(3)} for werte in ablesungen]
+            return lambda: [berechnung_3_tage_mittelwert(d) for d in daten]
+        liste.append(Fall("3_tage_mittelwert", groesse, anlagen, mittelwert_skalar))
+
+        def mittelwert_array(anlagen=anlagen):
+            ablesungen = aussentemperatur(anlagen * 3 * 365, 3600 * 8).reshape(anlagen, -1)
+            return lambda: [gleitender_mittelwert(reihe) for reihe in ablesungen]
+        liste.append(Fall("gleitender_mittelwert_jahr", groesse, anlagen * 3 * 365, mittelwert_array))
+
+        def steuerung_skalar(anlagen=anlagen):
+            signale = meldungen(anlagen * 24)
+            jetzt = [datetime(2024, 1, 15, stunde) for stunde in range(24)] * anlagen
+            argumente = list(zip(
+                signale["stoerung"].tolist(), signale["schalter"].tolist(),
+                signale["wartungsmeldung"].tolist(), signale["thermische_desinfektion"].tolist(), jetzt
+            ))
+            return lambda: [anlagensteuerung_bhkw(*a) for a in argumente]
+        liste.append(Fall("anlagensteuerung_skalar", groesse, anlagen * 24, steuerung_skalar))
+
+        def steuerung_batch(anlagen=anlagen):
+            n = anlagen * 1440
+            signale = meldungen(n)
+            stunden = (np.arange(n) // 60) % 24
+            return lambda: statuscodes_batch(**signale, stunden=stunden)
+        liste.append(Fall("statuscodes_batch", groesse, anlagen * 1440, steuerung_batch))
+
+        def pid_flotte(anlagen=anlagen):
+            parameter = regler_parameter(anlagen)
+            return lambda: simuliere_regelventil(parameter, sollwertprofil())
+        liste.append(Fall("pid_flotte", groesse, anlagen * 400, pid_flotte))
+
+        def einschwing_skalar(anlagen=anlagen):
+            temps = simuliere_regelventil(regler_parameter(anlagen), sollwertprofil())["T_ist"]
+            return lambda: [berechne_einschwingzeit(reihe, 200, 45.0) for reihe in temps]
+        liste.append(Fall("einschwingzeit_skalar", groesse, anlagen * 400, einschwing_skalar))
+
+        def einschwing_batch(anlagen=anlagen):
+            temps = simuliere_regelventil(regler_parameter(anlagen), sollwertprofil())["T_ist"]
+            return lambda: einschwingzeit(temps, 45.0, 200)
+        liste.append(Fall("einschwingzeit_batch", groesse, anlagen * 400, einschwing_batch))
+
+    return liste
+
+# ---------- Messung ----------
+def messe(fall: Fall, min_laufzeit: float = 0.05, wiederholungen: int = 5) -> dict:
+    """
+    Misst die beste Laufzeit je Aufruf. Kurze Fälle werden wie bei timeit
+    mehrfach hintereinander aufgerufen, bis eine Wiederholung mindestens
+    min_laufzeit dauert. Der Spitzenspeicher wird in einem getrennten Lauf
+    per tracemalloc ermittelt (numpy meldet seine Puffer dort an).
+    """
+    funktion = fall.vorbereiten()
+
+    start = time.perf_counter()
+    funktion()
+    erster = time.perf_counter() - start
+    aufrufe = max(1, int(np.ceil(min_laufzeit / max(erster, 1e-9))))
+
+    zeiten = [erster]
+    for _ in range(wiederholungen if erster < 10 * min_laufzeit else 1):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(aufrufe):
+            funktion()
+        zeiten.append((time.perf_counter() - start) / aufrufe)
+
+    gc.collect()
+    tracemalloc.start()
+    funktion()
+    _, spitze = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    beste = min(zeiten)
+    return {
+        "sekunden": beste,
+        "durchsatz": fall.elemente / beste if beste > 0 else float("inf"),
+        "spitze_mb": spitze / 2**20,
+        "elemente": fall.elemente,
+        "aufrufe": aufrufe * (len(zeiten) - 1) + 1,
+    }
+
+def vergleiche(ergebnisse: Dict[str, dict], baseline: Dict[str, dict], schwelle: float = SCHWELLE) -> Dict[str, str]:
+    """Bewertet jede Messung gegen die Baseline: OK, REGRESSION, schneller oder neu."""
+    urteile = {}
+    for schluessel, messung in ergebnisse.items():
+        alt = baseline.get(schluessel)
+        if alt is None:
+            urteile[schluessel] = "neu"
+        elif messung["sekunden"] > alt["sekunden"] * (1 + schwelle):
+            urteile[schluessel] = "REGRESSION"
+        elif messung["sekunden"] < alt["sekunden"] * (1 - schwelle):
+            urteile[schluessel] = "schneller"
+        else:
+            urteile[schluessel] = "OK"
+    return urteile
+
+def umgebung() -> dict:
+    """Versionen und Rechner, damit Baselines vergleichbar bleiben."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "rechner": platform.node(),
+        "prozessor": platform.processor() or platform.machine(),
+        "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def lies_baseline(pfad: str) -> Dict[str, dict]:
+    if not os.path.exists(pfad):
+        return {}
+    with open(pfad, encoding="utf-8") as datei:
+        return json.load(datei)["messungen"]
+
+def schreibe_baseline(pfad: str, ergebnisse: Dict[str, dict]) -> None:
+    with open(pfad, "w", encoding="utf-8") as datei:
+        json.dump({"umgebung": umgebung(), "messungen": ergebnisse}, datei, indent=2)
+
+def fuehre_aus(
+    stufe: str = "klein",
+    filter_text: str = "",
+    baseline_pfad: str = BASELINE,
+    schwelle: float = SCHWELLE,
+    speichern: bool = False
+) -> bool:
+    """
+    Führt alle Fälle aus, gibt eine Tabelle aus und vergleicht mit der
+    Baseline. Rückgabe: True, wenn keine Regression gefunden wurde.
+    """
+    arbeitsverzeichnis = tempfile.mkdtemp(prefix="bhkw_benchmark_")
+    baseline = lies_baseline(baseline_pfad)
+    ergebnisse: Dict[str, dict] = {}
+    try:
+        print(f"{'Fall':<42}{'Zeit [ms]':>11}{'Durchsatz [1/s]':>17}{'Spitze [MB]':>13}  Baseline")
+        for fall in faelle(stufe, arbeitsverzeichnis):
+            if filter_text not in fall.schluessel:
+                continue
+            messung = messe(fall)
+            ergebnisse[fall.schluessel] = messung
+            urteil = vergleiche({fall.schluessel: messung}, baseline, schwelle)[fall.schluessel]
+            if fall.schluessel in baseline:
+                urteil += f" ({messung['sekunden'] / baseline[fall.schluessel]['sekunden']:.2f}×)"
+            print(
+                f"{fall.schluessel:<42}{messung['sekunden'] * 1e3:>11.3f}{messung['durchsatz']:>17,.0f}"
+                f"{messung['spitze_mb']:>13.1f}  {urteil}"
+            )
+    finally:
+        shutil.rmtree(arbeitsverzeichnis, ignore_errors=True)
+
+    if speichern:
+        schreibe_baseline(baseline_pfad, dict(baseline, **ergebnisse))
+        print(f"\nBaseline gespeichert: {baseline_pfad}")
+    regressionen = [s for s, u in vergleiche(ergebnisse, baseline, schwelle).items() if u == "REGRESSION"]
+    if regressionen:
+        print(f"\n{len(regressionen)} Regression(en): {', '.join(regressionen)}")
+    return not regressionen
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmarks der Rechenkerne in python-projekt")
+    parser.add_argument("--stufe", choices=sorted(STUFEN), default="klein")
+    parser.add_argument("--filter", default="", help="nur Fälle, deren Name den Text enthält")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--schwelle", type=float, default=SCHWELLE)
+    parser.add_argument("--speichern", action="store_true", help="Messwerte als neue Baseline ablegen")
+    args = parser.parse_args()
+
+    sys.exit(0 if fuehre_aus(args.stufe, args.filter, args.baseline, args.schwelle, args.speichern) else 1)
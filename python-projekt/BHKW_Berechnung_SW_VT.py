@@ -1,10 +1,29 @@
 
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import Optional
 from datetime import datetime
 
+from BHKW_Heizkennlinie import heizkennlinie, heizkurve
+from BHKW_Metriken import instrumentiert
+from BHKW_Plot import rendere_zeitreihen
+
+# Standard-Heizkennlinie (Werte wie im Beispiel unten); Grundlage für
+# Simulation, Regeldienst und Flotte
+STANDARD_KENNLINIE = dict(
+    sollwert_raumtemperatur=22.0,
+    kurve_steilheit=1.5,
+    kurve_fixpunkt=25.0,
+    kurve_exponent=1.2,
+    min_vorlauftemp=15.0,
+    max_vorlauftemp=85.0,
+    nachtabsenkung_delta=5.0,
+    raumtemp_komp_freigabe=False,
+    norm_raumtemperatur=20.0,
+    raumtemp_komp_prozent=10.0,
+)
+
 # Heizkennlinien-Funktion mit optionaler Stundenzuordnung
+@instrumentiert("heizkennlinie")
 def berechnung_heizkennlinie(
     messwert_außentemperatur: float,
     messwert_raumtemperatur: float,
@@ -18,29 +37,42 @@ def berechnung_heizkennlinie(
     raumtemp_komp_freigabe: bool,
     norm_raumtemperatur: float,
     raumtemp_komp_prozent: float,
-    current_hour: Optional[int] = None
+    current_hour: Optional[int] = None,
+    max_fehler: Optional[float] = None
 ) -> float:
     """
     Berechnet die Soll-Vorlauftemperatur anhand einer Heizkennlinie
     und zusätzlicher Raumtemperaturkompensation sowie Nachtabsenkung.
 
+    Oberhalb der Norm-Raumtemperatur liefert die Heizkurve den Fixpunkt.
+    Mit max_fehler (K) wird die Heizkurve aus einer vorberechneten Tabelle
+    (BHKW_Heizkennlinie) interpoliert statt mit ** gerechnet.
+
     Rückgabe:
         Soll-Vorlauftemperatur in °C (auf min begrenzt, max optional begrenzt)
     """
 
-    # 1. Aktuelle Stunde ermitteln
-    jetzt = datetime.now()
-    stunde = jetzt.hour
+    # 1. Aktuelle Stunde ermitteln (übergebene Stunde hat Vorrang vor der Uhr)
+    if current_hour is None:
+        stunde = datetime.now().hour
+    else:
+        stunde = current_hour
 
     # 2. Nachtabsenkung aktiv von 22:00 bis 06:00?
     ist_nacht = (stunde >= 22) or (stunde < 6)
 
     # 3. Basis: Heizkurve (K * (T_norm - T_außen)**exponent + B)
-    basis_vorlauf = (
-        kurve_steilheit
-        * (norm_raumtemperatur - messwert_außentemperatur) ** kurve_exponent
-        + kurve_fixpunkt
-    )
+    if max_fehler is not None:
+        basis_vorlauf = heizkennlinie(
+            kurve_steilheit, kurve_fixpunkt, kurve_exponent, norm_raumtemperatur,
+            max_fehler=max_fehler
+        ).wert(messwert_außentemperatur)
+    else:
+        basis_vorlauf = (
+            kurve_steilheit
+            * max(norm_raumtemperatur - messwert_außentemperatur, 0.0) ** kurve_exponent
+            + kurve_fixpunkt
+        )
 
     # 4. Nachtabsenkung abziehen (falls aktiv)
     if ist_nacht:
@@ -61,6 +93,88 @@ def berechnung_heizkennlinie(
 
     return soll_vorlauftemp
 
+def stunden_aus_zeitstempeln(zeitstempel) -> np.ndarray:
+    """
+    Liefert die Stunde des Tages (0–23) für ein Array von Zeitstempeln.
+
+    Akzeptiert alles, was sich in ein datetime64-Array umwandeln lässt
+    (z.B. numpy-Arrays, pandas.DatetimeIndex, Listen von datetime).
+    """
+    zeiten = np.asarray(zeitstempel, dtype="datetime64[s]")
+    tage = zeiten.astype("datetime64[D]")
+    return ((zeiten - tage) // np.timedelta64(1, "h")).astype(np.int64)
+
+# Vektorisierte Heizkennlinie für ganze Zeitreihen
+def berechnung_heizkennlinie_batch(
+    messwerte_außentemperatur: np.ndarray,
+    messwerte_raumtemperatur,
+    sollwert_raumtemperatur: float,
+    kurve_steilheit: float,
+    kurve_fixpunkt: float,
+    kurve_exponent: float,
+    min_vorlauftemp: float,
+    max_vorlauftemp: Optional[float],
+    nachtabsenkung_delta: float,
+    raumtemp_komp_freigabe: bool,
+    norm_raumtemperatur: float,
+    raumtemp_komp_prozent: float,
+    stunden: Optional[np.ndarray] = None,
+    zeitstempel: Optional[np.ndarray] = None,
+    max_fehler: Optional[float] = None
+) -> np.ndarray:
+    """
+    Berechnet die Soll-Vorlauftemperatur für eine ganze Zeitreihe in einem
+    Durchgang (gleiche Logik wie berechnung_heizkennlinie).
+
+    Die Nachtabsenkung wird pro Messwert anhand von `stunden` (0–23) oder
+    `zeitstempel` bestimmt. Fehlen beide, wird die Uhr genau einmal gelesen
+    und die aktuelle Stunde für alle Werte verwendet.
+    messwerte_raumtemperatur darf ein Array oder ein einzelner Wert sein.
+    max_fehler wie bei berechnung_heizkennlinie.
+
+    Rückgabe:
+        Array der Soll-Vorlauftemperaturen in °C
+    """
+
+    ta = np.asarray(messwerte_außentemperatur, dtype=np.float64)
+
+    # 1. Stunde je Messwert ermitteln
+    if stunden is not None:
+        stunde = np.asarray(stunden)
+    elif zeitstempel is not None:
+        stunde = stunden_aus_zeitstempeln(zeitstempel)
+    else:
+        stunde = np.full(ta.shape, datetime.now().hour)
+
+    # 2. Basis: Heizkurve (K * (T_norm - T_außen)**exponent + B)
+    if max_fehler is not None:
+        soll_vorlauftemp = np.asarray(heizkennlinie(
+            kurve_steilheit, kurve_fixpunkt, kurve_exponent, norm_raumtemperatur,
+            max_fehler=max_fehler
+        )(ta), dtype=np.float64)
+    else:
+        soll_vorlauftemp = np.subtract(norm_raumtemperatur, ta)
+        np.maximum(soll_vorlauftemp, 0.0, out=soll_vorlauftemp)
+        np.power(soll_vorlauftemp, kurve_exponent, out=soll_vorlauftemp)
+        soll_vorlauftemp *= kurve_steilheit
+        soll_vorlauftemp += kurve_fixpunkt
+
+    # 3. Nachtabsenkung von 22:00 bis 06:00 abziehen
+    ist_nacht = (stunde >= 22) | (stunde < 6)
+    soll_vorlauftemp -= np.where(ist_nacht, nachtabsenkung_delta, 0.0)
+
+    # 4. Raumtemperaturkompensation (nur bei Freigabe)
+    if raumtemp_komp_freigabe:
+        diff_raummess = sollwert_raumtemperatur - np.asarray(
+            messwerte_raumtemperatur, dtype=np.float64
+        )
+        soll_vorlauftemp += diff_raummess * (raumtemp_komp_prozent / 100)
+
+    # 5. Begrenzung auf min und optional auf max
+    np.clip(soll_vorlauftemp, min_vorlauftemp, max_vorlauftemp, out=soll_vorlauftemp)
+
+    return soll_vorlauftemp
+
 # Funktion zur Visualisierung der reinen Heizkennlinie
 def plot_heizkennlinie(
     kurve_steilheit: float,
@@ -68,23 +182,23 @@ def plot_heizkennlinie(
     kurve_exponent: float,
     min_vorlauftemp: float,
     max_vorlauftemp: Optional[float],
-    norm_raumtemperatur: float
+    norm_raumtemperatur: float,
+    datei: Optional[str] = None
 ) -> None:
     """
     Plottet die Heizkennlinie (ohne Nachtabsenkung und Raumkompensation)
     über einen Außentemperatur-Bereich von -10 bis +20 °C.
 
     max_vorlauftemp optional: bei None kein oberes Limit.
+    datei optional: Zieldatei (.png/.svg), dann ohne Display statt plt.show().
     """
 
     # Außentemperaturen von -10 bis +20 °C
     ta_range = np.linspace(-10, 20, 100)
 
-    # Heizkurve berechnen
-    vl_range = (
-        kurve_steilheit
-        * (norm_raumtemperatur - ta_range) ** kurve_exponent
-        + kurve_fixpunkt
+    # Heizkurve berechnen (oberhalb T_norm: Fixpunkt)
+    vl_range = heizkurve(
+        ta_range, kurve_steilheit, kurve_fixpunkt, kurve_exponent, norm_raumtemperatur
     )
 
     # Auf minimale Vorlauftemperatur beschneiden
@@ -93,6 +207,17 @@ def plot_heizkennlinie(
     if max_vorlauftemp is not None:
         vl_clipped = np.minimum(vl_clipped, max_vorlauftemp)
 
+    if datei is not None:
+        rendere_zeitreihen(
+            datei, ta_range, {"Heizkennlinie": vl_clipped},
+            titel="Heizkennlinie ohne Zusatzkompensation",
+            xlabel="Außentemperatur (°C)", ylabel="Vorlauftemperatur (°C)"
+        )
+        return
+
+    # pyplot erst hier laden: der Import kostet ein Vielfaches der Berechnung
+    import matplotlib.pyplot as plt
+
     # Plot erstellen
     plt.plot(ta_range, vl_clipped, label="Heizkennlinie")
     plt.xlabel("Außentemperatur (°C)")
@@ -123,25 +248,22 @@ if __name__ == "__main__":
     ]
     hours = list(range(1, len(Außentemp) + 1))
 
-    # 2. Vorlauftemperaturen simulieren
-    vl_temps = [
-        berechnung_heizkennlinie(
-            ta,
-            Raumtemp_aktuell,
-            Raumtemp_soll,
-            K_steil,
-            K_fix,
-            K_exp,
-            MIN_VL,
-            MAX_VL,
-            NACHT_DELTA,
-            RT_KOMP_FG,
-            NORM_RT,
-            RT_KOMP_P,
-            current_hour=(hour-1)
-        )
-        for hour, ta in zip(hours, Außentemp)
-    ]
+    # 2. Vorlauftemperaturen simulieren (alle Stunden in einem Durchgang)
+    vl_temps = berechnung_heizkennlinie_batch(
+        np.array(Außentemp),
+        Raumtemp_aktuell,
+        Raumtemp_soll,
+        K_steil,
+        K_fix,
+        K_exp,
+        MIN_VL,
+        MAX_VL,
+        NACHT_DELTA,
+        RT_KOMP_FG,
+        NORM_RT,
+        RT_KOMP_P,
+        stunden=np.array(hours) - 1
+    )
 
     # 3. Ausgabe der Simulation
     for hour, (ta, tvl) in enumerate(zip(Außentemp, vl_temps), start=1):
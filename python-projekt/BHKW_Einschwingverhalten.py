@@ -0,0 +1,144 @@
+import numpy as np
+from typing import Optional
+
+# Kennwerte einer Sprungantwort je Trajektorie
+SPRUNGANTWORT_DTYPE = np.dtype([
+    ("einschwingzeit", np.float64),
+    ("ueberschwingen", np.float64),
+    ("anstiegszeit", np.float64),
+    ("bleibende_regelabweichung", np.float64),
+])
+
+def _lauflaengen_rueckwaerts(maske: np.ndarray) -> np.ndarray:
+    """
+    Länge der True-Folge, die an jeder Position beginnt (zeilenweise).
+
+    Beispiel: [T, T, F, T] -> [2, 1, 0, 1]. Ein linearer Durchgang über
+    np.maximum.accumulate, ohne Python-Schleife.
+    """
+    umgedreht = maske[:, ::-1]
+    index = np.arange(umgedreht.shape[1])
+    letzte_luecke = np.maximum.accumulate(np.where(umgedreht, -1, index), axis=1)
+    return (index - letzte_luecke)[:, ::-1]
+
+def _erster_treffer(maske: np.ndarray) -> np.ndarray:
+    """Index des ersten True je Zeile, -1 falls keiner vorhanden."""
+    if maske.shape[1] == 0:
+        return np.full(maske.shape[0], -1, dtype=np.intp)
+    erster = np.argmax(maske, axis=1)
+    return np.where(maske[np.arange(maske.shape[0]), erster], erster, -1)
+
+def einschwingzeit(
+    temps: np.ndarray,
+    zielwert,
+    start_index: int = 0,
+    toleranz: float = 0.5,
+    stabil_dauer: int = 30,
+    ende_index: Optional[int] = None
+) -> np.ndarray:
+    """
+    Erster Index ab start_index, ab dem der Verlauf für stabil_dauer Werte
+    (bzw. bis ende_index) innerhalb zielwert ± toleranz bleibt.
+
+    :param temps: Verlauf, Form (T,) oder (N, T) für N Trajektorien.
+    :param zielwert: Skalar oder ein Wert je Trajektorie.
+    :return:
+        Absoluter Index je Trajektorie (int64), -1 wenn keine stabile
+        Einschwingung gefunden wurde. Bei 1-D-Eingabe ein 0-d-Array.
+    """
+    verlauf = np.asarray(temps, dtype=np.float64)
+    zeilen = np.atleast_2d(verlauf)
+    ende = zeilen.shape[1] if ende_index is None else ende_index
+    fenster = zeilen[:, start_index:ende]
+    ziel = np.reshape(np.asarray(zielwert, dtype=np.float64), (-1, 1))
+
+    im_band = np.abs(fenster - ziel) <= toleranz
+    # Zum Fensterende hin genügt ein verkürzter Stabilitätsbereich
+    benoetigt = np.minimum(stabil_dauer, fenster.shape[1] - np.arange(fenster.shape[1]))
+    stabil = im_band & (_lauflaengen_rueckwaerts(im_band) >= benoetigt)
+
+    index = _erster_treffer(stabil)
+    index = np.where(index >= 0, index + start_index, -1)
+    return index if verlauf.ndim > 1 else index[0]
+
+def analysiere_sprungantwort(
+    temps: np.ndarray,
+    zielwert,
+    start_index: int = 0,
+    anfangswert=None,
+    toleranz: float = 0.5,
+    stabil_dauer: int = 30,
+    ende_index: Optional[int] = None,
+    dt: float = 1.0
+) -> np.ndarray:
+    """
+    Kennwerte der Sprungantwort im Fenster [start_index, ende_index).
+
+    Ermittelt je Trajektorie:
+      • einschwingzeit: Zeit ab start_index bis zur stabilen Einschwingung
+        (siehe einschwingzeit), NaN wenn nicht erreicht
+      • ueberschwingen: maximales Überschwingen in % der Sprunghöhe
+      • anstiegszeit: Zeit von 10 % auf 90 % der Sprunghöhe
+      • bleibende_regelabweichung: zielwert minus Mittelwert der letzten
+        stabil_dauer Werte im Fenster
+
+    :param temps: Verlauf, Form (T,) oder (N, T).
+    :param anfangswert: Wert vor dem Sprung; Standard ist temps[start_index].
+    :return:
+        Strukturiertes Array (SPRUNGANTWORT_DTYPE) der Länge N
+        (0-d bei 1-D-Eingabe). Zeiten in Einheiten von dt.
+    """
+    verlauf = np.asarray(temps, dtype=np.float64)
+    zeilen = np.atleast_2d(verlauf)
+    ende = zeilen.shape[1] if ende_index is None else ende_index
+    fenster = zeilen[:, start_index:ende]
+    anzahl = fenster.shape[0]
+    if fenster.shape[1] == 0:
+        # Leeres Fenster (start_index hinter dem Ende): keine Kennwerte bestimmbar
+        ergebnis = np.full(anzahl, np.nan, dtype=SPRUNGANTWORT_DTYPE)
+        return ergebnis if verlauf.ndim > 1 else ergebnis[0]
+
+    ziel = np.broadcast_to(np.asarray(zielwert, dtype=np.float64), (anzahl,))
+    if anfangswert is None:
+        anfang = fenster[:, 0]
+    else:
+        anfang = np.broadcast_to(np.asarray(anfangswert, dtype=np.float64), (anzahl,))
+    sprung = ziel - anfang
+
+    ergebnis = np.empty(anzahl, dtype=SPRUNGANTWORT_DTYPE)
+
+    # 1. Einschwingzeit relativ zum Fensteranfang
+    index = einschwingzeit(zeilen, ziel, start_index, toleranz, stabil_dauer, ende)
+    ergebnis["einschwingzeit"] = np.where(index >= 0, (index - start_index) * dt, np.nan)
+
+    # 2. Auf die Sprunghöhe normierter Verlauf (0 = Anfang, 1 = Ziel)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normiert = (fenster - anfang[:, None]) / sprung[:, None]
+    kein_sprung = sprung == 0
+
+    # 3. Überschwingen
+    ueberschwingen = np.maximum(np.max(normiert, axis=1) - 1.0, 0.0) * 100.0
+    ergebnis["ueberschwingen"] = np.where(kein_sprung, np.nan, ueberschwingen)
+
+    # 4. Anstiegszeit 10 % -> 90 %
+    t10 = _erster_treffer(normiert >= 0.1)
+    t90 = _erster_treffer(normiert >= 0.9)
+    erreicht = (t10 >= 0) & (t90 >= 0) & ~kein_sprung
+    ergebnis["anstiegszeit"] = np.where(erreicht, (t90 - t10) * dt, np.nan)
+
+    # 5. Bleibende Regelabweichung am Fensterende
+    ergebnis["bleibende_regelabweichung"] = ziel - fenster[:, -stabil_dauer:].mean(axis=1)
+
+    return ergebnis if verlauf.ndim > 1 else ergebnis[0]
+
+
+if __name__ == "__main__":
+    # Beispiel: gedämpfte Schwingung nach einem Sprung von 40 auf 45 °C
+    t = np.arange(400)
+    verlauf = 45.0 - 5.0 * np.exp(-t / 40.0) * np.cos(t / 15.0)
+
+    kennwerte = analysiere_sprungantwort(verlauf, 45.0, anfangswert=40.0)
+    print(f"Einschwingzeit: {kennwerte['einschwingzeit']:.0f} s")
+    print(f"Überschwingen: {kennwerte['ueberschwingen']:.1f} %")
+    print(f"Anstiegszeit: {kennwerte['anstiegszeit']:.0f} s")
+    print(f"Bleibende Regelabweichung: {kennwerte['bleibende_regelabweichung']:.3f} K")
@@ -0,0 +1,125 @@
+import numpy as np
+from datetime import datetime
+from enum import IntEnum
+from typing import Optional
+
+from BHKW_Berechnung_SW_VT import stunden_aus_zeitstempeln
+from BHKW_Gleitender_Mittelwert import HEIZGRENZE
+from BHKW_Metriken import instrumentiert
+
+# Betriebszeit des BHKW: von BETRIEB_START (inklusive) bis BETRIEB_ENDE (exklusive)
+BETRIEB_START = 6
+BETRIEB_ENDE = 22
+
+class Statuscode(IntEnum):
+    """Grund der Schaltentscheidung, in Prioritätsreihenfolge der Prüfung."""
+    EIN = 0
+    STOERUNG = 1
+    WARTUNG = 2
+    DESINFEKTION = 3
+    SCHALTER_AUS = 4
+    AUSSERHALB_BETRIEBSZEIT = 5
+
+STATUSTEXTE = {
+    Statuscode.EIN: "BHKW ein: in Ordnung",
+    Statuscode.STOERUNG: "BHKW aus: Störung erkannt",
+    Statuscode.WARTUNG: "BHKW aus: Wartung erforderlich",
+    Statuscode.DESINFEKTION: "BHKW aus: Thermische Desinfektion aktiv",
+    Statuscode.SCHALTER_AUS: "BHKW aus: Schalter ist ausgeschaltet",
+    Statuscode.AUSSERHALB_BETRIEBSZEIT: "BHKW aus: außerhalb der Betriebszeit",
+}
+
+@instrumentiert("status")
+def statuscode(
+    Stoerung: bool,
+    Schalter: bool,
+    Wartungsmeldung: bool,
+    Thermische_Desinfektion: bool,
+    jetzt: Optional[datetime] = None,
+    betrieb_start: int = BETRIEB_START,
+    betrieb_ende: int = BETRIEB_ENDE
+) -> Statuscode:
+    """
+    Schaltentscheidung für einen Zeitpunkt als Statuscode.
+
+    Prioritäten: Störung, Wartung, thermische Desinfektion, Schalter,
+    Betriebszeit. `jetzt` ersetzt die Systemuhr (z.B. bei Wiedergabe
+    historischer Daten).
+    """
+    if Stoerung:
+        return Statuscode.STOERUNG
+    if Wartungsmeldung:
+        return Statuscode.WARTUNG
+    if Thermische_Desinfektion:
+        return Statuscode.DESINFEKTION
+    if not Schalter:
+        return Statuscode.SCHALTER_AUS
+    stunde = (jetzt or datetime.now()).hour
+    if betrieb_start <= stunde < betrieb_ende:
+        return Statuscode.EIN
+    return Statuscode.AUSSERHALB_BETRIEBSZEIT
+
+def statuscodes_batch(
+    stoerung,
+    schalter,
+    wartungsmeldung,
+    thermische_desinfektion,
+    zeitstempel=None,
+    stunden=None,
+    betrieb_start=BETRIEB_START,
+    betrieb_ende=BETRIEB_ENDE
+) -> np.ndarray:
+    """
+    Vektorisierte Variante von statuscode für ganze Zeitreihen.
+
+    Die Signale sind Bool-Arrays (oder Skalare) gleicher Länge; die Stunde
+    kommt aus `stunden` (0–23) oder `zeitstempel`. Fehlen beide, wird die
+    Uhr einmal gelesen. betrieb_start/betrieb_ende dürfen ebenfalls Arrays sein.
+
+    Rückgabe:
+        int8-Array mit Statuscode-Werten.
+    """
+    if stunden is None:
+        if zeitstempel is not None:
+            stunden = stunden_aus_zeitstempeln(zeitstempel)
+        else:
+            stunden = datetime.now().hour
+    stunden = np.asarray(stunden)
+
+    stoerung, schalter, wartungsmeldung, thermische_desinfektion, stunden = np.broadcast_arrays(
+        stoerung, schalter, wartungsmeldung, thermische_desinfektion, stunden
+    )
+
+    # Von der niedrigsten zur höchsten Priorität überschreiben
+    in_betrieb = (stunden >= betrieb_start) & (stunden < betrieb_ende)
+    codes = np.where(
+        in_betrieb, np.int8(Statuscode.EIN), np.int8(Statuscode.AUSSERHALB_BETRIEBSZEIT)
+    )
+    codes[~schalter.astype(bool)] = Statuscode.SCHALTER_AUS
+    codes[thermische_desinfektion.astype(bool)] = Statuscode.DESINFEKTION
+    codes[wartungsmeldung.astype(bool)] = Statuscode.WARTUNG
+    codes[stoerung.astype(bool)] = Statuscode.STOERUNG
+    return codes
+
+def schaltbefehle_batch(codes, aussentemp_mittelwerte, heizgrenze: float = HEIZGRENZE) -> np.ndarray:
+    """
+    AN/AUS-Entscheidung wie ansteuerung_bhkw: True (AN), wenn der Statuscode
+    EIN ist und der Mehrtages-Mittelwert die Heizgrenze nicht überschreitet.
+    """
+    return (np.asarray(codes) == Statuscode.EIN) & (np.asarray(aussentemp_mittelwerte) <= heizgrenze)
+
+def statustexte(codes) -> np.ndarray:
+    """Übersetzt Statuscodes in die Statustexte (nur für Ausgabe/Berichte)."""
+    texte = np.array([STATUSTEXTE[code] for code in Statuscode], dtype=object)
+    return texte[np.asarray(codes)]
+
+
+if __name__ == "__main__":
+    # Beispiel: ein Tag in Stundenschritten, Wartung von 10 bis 12 Uhr
+    zeiten = np.arange("2024-01-15T00", "2024-01-16T00", dtype="datetime64[h]")
+    wartung = (zeiten >= np.datetime64("2024-01-15T10")) & (zeiten < np.datetime64("2024-01-15T12"))
+
+    codes = statuscodes_batch(False, True, wartung, False, zeitstempel=zeiten)
+    an = schaltbefehle_batch(codes, np.full(zeiten.size, 12.0))
+    for zeit, text, ein in zip(zeiten, statustexte(codes), an):
+        print(f"{zeit}: {'AN ' if ein else 'AUS'} – {text}")
@@ -0,0 +1,261 @@
+import numpy as np
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from BHKW_Entscheidung import BETRIEB_ENDE, BETRIEB_START, Statuscode, statuscodes_batch
+from BHKW_Heizlast import heizlast
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Fahrplan je Anlage und Stunde; Energien in Wh je Schritt
+FAHRPLAN_DTYPE = np.dtype([
+    ("an", np.bool_),
+    ("speicher", np.float64),     # Speicherinhalt am Schrittende
+    ("ungedeckt", np.float64),    # nicht gedeckter Wärmebedarf
+    ("ueberschuss", np.float64),  # Wärme, die bei vollem Speicher nicht abgenommen wird
+])
+
+# Gewichte der Zielfunktion: je Start bzw. je kWh. Ein Start wiegt so viel
+# wie 0,5 kWh ungedeckter Bedarf oder 5 kWh Überschuss.
+KOSTEN_START = 5.0
+KOSTEN_UNGEDECKT = 10.0
+KOSTEN_UEBERSCHUSS = 1.0
+
+# Stützstellen des Speicherinhalts für die dynamische Programmierung (1 % der Kapazität)
+SPEICHERSTUFEN = 101
+
+def speicherkapazitaet(volumen: float, delta_T: float, dichte: float = 1000, cp: float = 4180) -> float:
+    """Nutzbare Kapazität (Wh) eines Pufferspeichers mit Volumen (m³) und Temperaturspreizung (K)."""
+    return volumen * dichte * cp * delta_T / 3600.0
+
+def _speicherschritt(E, an, P_th, Q_bedarf, kapazitaet, dt: float):
+    """Speicherbilanz eines Schritts: (neuer Inhalt, ungedeckt, Überschuss), alles in Wh."""
+    E_roh = E + (an * P_th - Q_bedarf) * dt
+    ungedeckt = np.maximum(-E_roh, 0.0)
+    ueberschuss = np.maximum(E_roh - kapazitaet, 0.0)
+    return np.clip(E_roh, 0.0, kapazitaet), ungedeckt, ueberschuss
+
+def _interpoliere(V, E, kapazitaet):
+    """Lineare Interpolation von V (B, K) auf dem gleichmäßigen Raster 0..kapazitaet an E (B, n)."""
+    B, K = V.shape
+    position = E * ((K - 1) / kapazitaet)[:, None]
+    links = np.minimum(position.astype(np.intp), K - 2)
+    gewicht = position - links
+    # Flache Indizes: deutlich schneller als take_along_axis
+    links += (np.arange(B) * K)[:, None]
+    V = V.ravel()
+    links_werte = V.take(links)
+    return links_werte + (V.take(links + 1) - links_werte) * gewicht
+
+def fahrplan_simulieren(
+    an,
+    Q_bedarf,
+    P_th,
+    kapazitaet,
+    speicher_start,
+    dt: float = 1.0
+) -> np.ndarray:
+    """
+    Bewertet einen beliebigen AN/AUS-Plan (B, T) mit der Speicherbilanz.
+
+    :return: Strukturiertes Array (FAHRPLAN_DTYPE) der Form (B, T).
+    """
+    an = np.atleast_2d(an)
+    B, T = an.shape
+    Q_bedarf = np.broadcast_to(np.asarray(Q_bedarf, dtype=np.float64), (B, T))
+    P_th, kapazitaet = (np.broadcast_to(np.asarray(x, dtype=np.float64), (B,)) for x in (P_th, kapazitaet))
+    E = np.broadcast_to(np.asarray(speicher_start, dtype=np.float64), (B,)).copy()
+
+    plan = np.empty((B, T), dtype=FAHRPLAN_DTYPE)
+    plan["an"] = an
+    for t in range(T):
+        E, plan["ungedeckt"][:, t], plan["ueberschuss"][:, t] = _speicherschritt(
+            E, an[:, t], P_th, Q_bedarf[:, t], kapazitaet, dt
+        )
+        plan["speicher"][:, t] = E
+    return plan
+
+def anzahl_starts(an, laeuft=False) -> np.ndarray:
+    """Anzahl der Starts je Anlage in einem Plan (B, T); laeuft: Zustand vor dem ersten Schritt."""
+    an = np.atleast_2d(an)
+    vorher = np.concatenate([np.broadcast_to(laeuft, (an.shape[0],))[:, None], an[:, :-1]], axis=1)
+    return np.count_nonzero(an & ~vorher, axis=1)
+
+def fahrplan_optimieren(
+    Q_bedarf,
+    P_th,
+    kapazitaet,
+    speicher_start,
+    freigabe=True,
+    laeuft=False,
+    speicher_ende=None,
+    dt: float = 1.0,
+    kosten_start: float = KOSTEN_START,
+    kosten_ungedeckt: float = KOSTEN_UNGEDECKT,
+    kosten_ueberschuss: float = KOSTEN_UEBERSCHUSS,
+    stufen: int = SPEICHERSTUFEN
+) -> np.ndarray:
+    """
+    AN/AUS-Fahrplan eines BHKW mit Pufferspeicher über einen Prognosehorizont.
+
+    Minimiert Starts, ungedeckten Bedarf und Überschusswärme per
+    dynamischer Programmierung über (Speicherinhalt, lief im Vorschritt),
+    rückwärts über die Zeit und vektorisiert über alle Speicherstufen und
+    Anlagen. Der Plan selbst wird vorwärts mit der exakten Speicherbilanz
+    bestimmt; die Rasterung wirkt nur auf die Bewertung der Folgezustände.
+    Aufwand O(T · stufen · B): für 48 h wenige Millisekunden je Anlage,
+    für einige Hundert Anlagen zusammen unter einer Sekunde.
+
+    :param Q_bedarf: Wärmebedarf (W), Form (T,) oder (B, T), z.B. aus heizlast().
+    :param P_th: Thermische Leistung des BHKW im Betrieb (W), Skalar oder je Anlage.
+    :param kapazitaet: Nutzbare Speicherkapazität (Wh), siehe speicherkapazitaet.
+    :param speicher_start: Aktueller Speicherinhalt (Wh).
+    :param freigabe: Bool (T,) oder (B, T): darf das BHKW in diesem Schritt laufen?
+    :param laeuft: Läuft das BHKW bereits (Weiterlaufen zählt nicht als Start)?
+    :param speicher_ende: Soll-Inhalt am Horizontende (Wh); fehlende Wärme wird wie
+        ungedeckter Bedarf bewertet. Standard: kein Zielwert.
+    :param dt: Schrittweite in Stunden.
+    :return: Strukturiertes Array (FAHRPLAN_DTYPE) der Form (B, T).
+    """
+    Q_bedarf = np.atleast_2d(np.asarray(Q_bedarf, dtype=np.float64))
+    B = max(Q_bedarf.shape[0], *(np.size(x) for x in (P_th, kapazitaet, speicher_start, laeuft)))
+    T = Q_bedarf.shape[1]
+    Q_bedarf = np.broadcast_to(Q_bedarf, (B, T))
+    P_th, kapazitaet, speicher_start = (
+        np.broadcast_to(np.asarray(x, dtype=np.float64), (B,)) for x in (P_th, kapazitaet, speicher_start)
+    )
+    if np.any(kapazitaet <= 0):
+        raise ValueError("Speicherkapazität muss größer als 0 sein.")
+    freigabe = np.broadcast_to(np.asarray(freigabe, dtype=bool), (B, T))
+    laeuft = np.broadcast_to(np.asarray(laeuft, dtype=bool), (B,))
+
+    # Kosten je Wh statt je kWh
+    k_ungedeckt, k_ueberschuss = kosten_ungedeckt / 1000.0, kosten_ueberschuss / 1000.0
+    E_raster = np.linspace(0.0, 1.0, stufen)[None, :] * kapazitaet[:, None]
+
+    # V[t, u, :]: minimale Restkosten ab Schritt t, wenn im Schritt davor u (0 = aus, 1 = an)
+    V = np.empty((T + 1, 2, B, stufen))
+    if speicher_ende is None:
+        V[T] = 0.0
+    else:
+        ziel = np.broadcast_to(np.asarray(speicher_ende, dtype=np.float64), (B,))[:, None]
+        V[T] = k_ungedeckt * np.maximum(ziel - E_raster, 0.0)
+
+    def folgekosten(t, E, an):
+        """Stufenkosten plus Restkosten ab t+1 für die Entscheidung `an` in den Zuständen E (B, n)."""
+        E_neu, ungedeckt, ueberschuss = _speicherschritt(
+            E, an, P_th[:, None], Q_bedarf[:, t, None], kapazitaet[:, None], dt
+        )
+        kosten = k_ungedeckt * ungedeckt + k_ueberschuss * ueberschuss + _interpoliere(V[t + 1, int(an)], E_neu, kapazitaet)
+        if an:
+            kosten = np.where(freigabe[:, t, None], kosten, np.inf)
+        return kosten
+
+    for t in range(T - 1, -1, -1):
+        aus, an = folgekosten(t, E_raster, False), folgekosten(t, E_raster, True)
+        V[t, 0] = np.minimum(aus, an + kosten_start)
+        V[t, 1] = np.minimum(aus, an)
+
+    # Vorwärts: Entscheidungen am exakten Speicherinhalt
+    plan_an = np.empty((B, T), dtype=bool)
+    E, vorher = speicher_start.copy(), laeuft.copy()
+    for t in range(T):
+        aus, an = folgekosten(t, E[:, None], False)[:, 0], folgekosten(t, E[:, None], True)[:, 0]
+        plan_an[:, t] = an + np.where(vorher, 0.0, kosten_start) < aus
+        E = _speicherschritt(E, plan_an[:, t], P_th, Q_bedarf[:, t], kapazitaet, dt)[0]
+        vorher = plan_an[:, t]
+    return fahrplan_simulieren(plan_an, Q_bedarf, P_th, kapazitaet, speicher_start, dt)
+
+def fahrplan_aus_prognose(
+    prognose_csv: str,
+    UA: float,
+    T_in_set: float,
+    P_th: float,
+    kapazitaet: float,
+    speicher_start: float,
+    jetzt: Optional[datetime] = None,
+    horizont: int = 48,
+    Stoerung: bool = False,
+    Schalter: bool = True,
+    Wartungsmeldung: bool = False,
+    Thermische_Desinfektion: bool = False,
+    laeuft: bool = False,
+    betrieb_start: int = BETRIEB_START,
+    betrieb_ende: int = BETRIEB_ENDE,
+    **lade_optionen
+) -> "pd.DataFrame":
+    """
+    Fahrplan für die nächsten `horizont` Stunden aus einer Prognose-CSV
+    (Format wie die Wetterdaten).
+
+    Bedarf: heizlast() aus der prognostizierten Außentemperatur. Freigabe:
+    Statuscode EIN wie bei ansteuerung_bhkw, d.h. die aktuellen Signale
+    gelten für den ganzen Horizont, die Betriebszeit je Stunde. Statt des
+    rückblickenden 3-Tage-Mittels entscheidet der prognostizierte Bedarf.
+    Ausgabe je Stunde: "T_out", "Q_heiz", "an", "speicher", "ungedeckt", "ueberschuss".
+    """
+    import pandas as pd
+    from BHKW_Wetterdaten import lade_aussentemperatur_stuendlich
+
+    df = lade_aussentemperatur_stuendlich(prognose_csv, **lade_optionen)
+    anfang = pd.Timestamp(jetzt or datetime.now()).floor("h")
+    df = df.loc[anfang:].iloc[:horizont].copy()
+    if df.empty:
+        raise ValueError(f"Prognose {prognose_csv} enthält keine Werte ab {anfang}.")
+    # Lücken am Rand (vor dem ersten Messwert) wie 'kein Bedarf bekannt' behandeln
+    df["Q_heiz"] = heizlast(df["T_out"].fillna(T_in_set).to_numpy(), UA, T_in_set)
+
+    codes = statuscodes_batch(
+        Stoerung, Schalter, Wartungsmeldung, Thermische_Desinfektion,
+        zeitstempel=df.index.to_numpy(), betrieb_start=betrieb_start, betrieb_ende=betrieb_ende
+    )
+    plan = fahrplan_optimieren(
+        df["Q_heiz"].to_numpy(), P_th, kapazitaet, speicher_start,
+        freigabe=codes == Statuscode.EIN, laeuft=laeuft, speicher_ende=speicher_start
+    )[0]
+    for name in FAHRPLAN_DTYPE.names:
+        df[name] = plan[name]
+    return df
+
+
+if __name__ == "__main__":
+    import time
+
+    # Zwei Wintertage, Bedarf aus heizlast() wie in Heizkreis-Heizlast-VL (UA = 300 W/K)
+    stunden = np.arange(48) % 24
+    T_out = 2.0 - 5.0 * np.cos(2 * np.pi * (stunden - 3) / 24)
+    Q_bedarf = heizlast(T_out, 300.0, 20.0)
+    P_th = 12_000.0
+    kapazitaet = speicherkapazitaet(1.0, 20.0)  # 1 m³, 20 K Spreizung ≈ 23 kWh
+    start = kapazitaet / 2
+    freigabe = (stunden >= BETRIEB_START) & (stunden < BETRIEB_ENDE)
+
+    def bericht(titel, plan):
+        print(f"{titel:>26}: {anzahl_starts(plan['an'])[0]:2d} Starts, {plan['an'].sum():2d} h Betrieb, "
+              f"ungedeckt {plan['ungedeckt'].sum() / 1000:5.1f} kWh, Überschuss {plan['ueberschuss'].sum() / 1000:5.1f} kWh, "
+              f"Speicher am Ende {plan['speicher'][0, -1] / 1000:4.1f} kWh")
+
+    # Bisher: AN während der ganzen Betriebszeit (3-Tage-Mittel ≤ 18 °C)
+    bericht("Betriebszeit (bisher)", fahrplan_simulieren(freigabe, Q_bedarf, P_th, kapazitaet, start))
+
+    # Speicherthermostat: ein unter 20 %, aus bei vollem Speicher (nur in der Betriebszeit)
+    an, E, vorher = np.zeros(48, dtype=bool), start, False
+    for t in range(48):
+        an[t] = freigabe[t] and (E < 0.2 * kapazitaet or (vorher and E < kapazitaet))
+        E = float(_speicherschritt(E, an[t], P_th, Q_bedarf[t], kapazitaet, 1.0)[0])
+        vorher = an[t]
+    bericht("Speicherthermostat", fahrplan_simulieren(an, Q_bedarf, P_th, kapazitaet, start))
+
+    bericht("Prognose-Fahrplan (DP)", fahrplan_optimieren(Q_bedarf, P_th, kapazitaet, start, freigabe, speicher_ende=start))
+
+    # Laufzeit: 500 Anlagen mit unterschiedlicher Leistung und Speichergröße, 48 h
+    rng = np.random.default_rng(1)
+    B = 500
+    Q_flotte = Q_bedarf[None, :] * rng.uniform(0.5, 1.5, (B, 1))
+    start_zeit = time.perf_counter()
+    plaene = fahrplan_optimieren(
+        Q_flotte, rng.uniform(8e3, 20e3, B), rng.uniform(10e3, 60e3, B), 20e3, freigabe, speicher_ende=20e3
+    )
+    print(f"{B} Anlagen × 48 h: {(time.perf_counter() - start_zeit) * 1000:.0f} ms, "
+          f"Ø {anzahl_starts(plaene['an']).mean():.1f} Starts")
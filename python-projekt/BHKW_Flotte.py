@@ -0,0 +1,285 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Tuple
+
+from BHKW_Berechnung_SW_VT import STANDARD_KENNLINIE, berechnung_heizkennlinie_batch, stunden_aus_zeitstempeln
+from BHKW_Entscheidung import BETRIEB_ENDE, BETRIEB_START, schaltbefehle_batch, statuscodes_batch
+from BHKW_Gleitender_Mittelwert import HEIZGRENZE
+from BHKW_Regelventil import PARAMETER_DTYPE, pid_schritt, regler_parameter
+from BHKW_Waermeleistung import berechnung_waermeleistung_array
+
+# Konfiguration je Anlage; max_vorlauftemp = inf bedeutet kein oberes Limit,
+# raumtemp_komp_prozent = 0 schaltet die Raumtemperaturkompensation ab
+FLOTTE_DTYPE = np.dtype([
+    ("sollwert_raumtemperatur", np.float64),
+    ("kurve_steilheit", np.float64),
+    ("kurve_fixpunkt", np.float64),
+    ("kurve_exponent", np.float64),
+    ("min_vorlauftemp", np.float64),
+    ("max_vorlauftemp", np.float64),
+    ("nachtabsenkung_delta", np.float64),
+    ("norm_raumtemperatur", np.float64),
+    ("raumtemp_komp_prozent", np.float64),
+    ("betrieb_start", np.int8),
+    ("betrieb_ende", np.int8),
+    ("heizgrenze", np.float64),
+    ("UA", np.float64),
+    ("T_in_set", np.float64),
+    ("V_dot", np.float64),
+    ("T_ruecklauf", np.float64),
+    ("regler", PARAMETER_DTYPE),
+])
+
+# Messwerte je Anlage (und Zeitpunkt); T_raum/T_vorlauf_ist dürfen NaN sein
+MESSWERT_DTYPE = np.dtype([
+    ("T_aussen", np.float64),
+    ("T_raum", np.float64),
+    ("T_vorlauf_ist", np.float64),
+    ("aussentemp_mittelwert", np.float64),
+    ("stoerung", np.bool_),
+    ("schalter", np.bool_),
+    ("wartungsmeldung", np.bool_),
+    ("thermische_desinfektion", np.bool_),
+])
+
+FLOTTE_ERGEBNIS_DTYPE = np.dtype([
+    ("status", np.int8),
+    ("an", np.bool_),
+    ("T_vorlauf_soll", np.float64),
+    ("Q_heiz", np.float64),
+    ("waermeleistung", np.float64),
+    ("stellwert", np.float64),
+])
+
+def flotte(anzahl: int, **werte) -> np.ndarray:
+    """
+    Erzeugt `anzahl` Anlagenkonfigurationen (FLOTTE_DTYPE) mit den
+    Standardwerten aus STANDARD_KENNLINIE, BHKW_Entscheidung und
+    BHKW_Regelventil. Felder von FLOTTE_DTYPE und Reglerparameter
+    (z.B. Kp) können als Skalar oder Array der Länge `anzahl` überschrieben
+    werden. T_ruecklauf gilt für Anlage und Ventilstrecke.
+    """
+    k = STANDARD_KENNLINIE
+    standard = {
+        "sollwert_raumtemperatur": k["sollwert_raumtemperatur"],
+        "kurve_steilheit": k["kurve_steilheit"],
+        "kurve_fixpunkt": k["kurve_fixpunkt"],
+        "kurve_exponent": k["kurve_exponent"],
+        "min_vorlauftemp": k["min_vorlauftemp"],
+        "max_vorlauftemp": np.inf if k["max_vorlauftemp"] is None else k["max_vorlauftemp"],
+        "nachtabsenkung_delta": k["nachtabsenkung_delta"],
+        "norm_raumtemperatur": k["norm_raumtemperatur"],
+        "raumtemp_komp_prozent": k["raumtemp_komp_prozent"] if k["raumtemp_komp_freigabe"] else 0.0,
+        "betrieb_start": BETRIEB_START,
+        "betrieb_ende": BETRIEB_ENDE,
+        "heizgrenze": HEIZGRENZE,
+        "UA": 300.0,
+        "T_in_set": 20.0,
+        "V_dot": 0.5,
+        "T_ruecklauf": 30.0,
+    }
+    regler_werte = {
+        name: werte.pop(name)
+        for name in PARAMETER_DTYPE.names
+        if name in werte and name != "T_ruecklauf"
+    }
+    anlagen = np.empty(anzahl, dtype=FLOTTE_DTYPE)
+    for name in standard:
+        anlagen[name] = werte.pop(name, standard[name])
+    if werte:
+        raise ValueError(f"Unbekannte Anlagenparameter: {', '.join(sorted(werte))}")
+    anlagen["regler"] = regler_parameter(anzahl, T_ruecklauf=anlagen["T_ruecklauf"], **regler_werte)
+    return anlagen
+
+def messwerte(form, **werte) -> np.ndarray:
+    """
+    Leeres Messwert-Array (MESSWERT_DTYPE) der Form `form`, z.B. (N,) für
+    einen Zeitpunkt oder (N, T) für einen Zeitraum. Vorbelegung: Temperaturen
+    NaN, Mittelwert unter der Heizgrenze, Anlage störungsfrei und eingeschaltet.
+    """
+    werte_neu = np.zeros(form, dtype=MESSWERT_DTYPE)
+    werte_neu["T_aussen"] = np.nan
+    werte_neu["T_raum"] = np.nan
+    werte_neu["T_vorlauf_ist"] = np.nan
+    werte_neu["aussentemp_mittelwert"] = -np.inf
+    werte_neu["schalter"] = True
+    for name, wert in werte.items():
+        werte_neu[name] = wert
+    return werte_neu
+
+def auswerten(
+    anlagen: np.ndarray,
+    werte: np.ndarray,
+    zeitstempel,
+    zustand: Optional[np.ndarray] = None,
+    dt: float = 1.0,
+    cp: float = 4180,
+    rho: float = 1000
+) -> np.ndarray:
+    """
+    Wertet alle Anlagen in einem Aufruf aus: Statuscode und AN/AUS,
+    Soll-Vorlauftemperatur, Heizlast und Wärmeleistung.
+
+    :param anlagen: Konfiguration (FLOTTE_DTYPE), Länge N.
+    :param werte: Messwerte (MESSWERT_DTYPE), Form (N,) für einen Zeitpunkt
+        oder (N, T) für einen Zeitraum.
+    :param zeitstempel: Ein Zeitpunkt bzw. T Zeitstempel (datetime64-fähig).
+    :param zustand: Optionaler Reglerzustand (ZUSTAND_DTYPE, Länge N) für
+        einen Zeitpunkt; dann wird für jede Anlage ein PID-Schritt gerechnet
+        (Istwert T_vorlauf_ist) und der Zustand fortgeschrieben.
+    :return:
+        Strukturiertes Array (FLOTTE_ERGEBNIS_DTYPE) in der Form von `werte`.
+        Die Wärmeleistung (kW) folgt aus T_vorlauf_ist bzw., wo dieser
+        fehlt, aus der Soll-Vorlauftemperatur; stellwert ist ohne zustand NaN.
+    """
+    zeitraum = werte.ndim == 2
+    # Konfiguration als Spalte (N, 1), damit sie gegen (N, T) broadcastet
+    p = {name: anlagen[name][:, None] if zeitraum else anlagen[name] for name in FLOTTE_DTYPE.names}
+    stunden = stunden_aus_zeitstempeln(np.atleast_1d(zeitstempel))
+    if not zeitraum:
+        stunden = stunden[0]
+
+    ergebnis = np.empty(werte.shape, dtype=FLOTTE_ERGEBNIS_DTYPE)
+
+    # 1. Statuscode und AN/AUS je Anlage
+    codes = statuscodes_batch(
+        werte["stoerung"], werte["schalter"], werte["wartungsmeldung"],
+        werte["thermische_desinfektion"], stunden=stunden,
+        betrieb_start=p["betrieb_start"], betrieb_ende=p["betrieb_ende"],
+    )
+    ergebnis["status"] = codes
+    ergebnis["an"] = schaltbefehle_batch(codes, werte["aussentemp_mittelwert"], p["heizgrenze"])
+
+    # 2. Soll-Vorlauftemperatur (Kennlinienparameter je Anlage); fehlende
+    #    Raumtemperatur bedeutet keine Kompensation
+    T_raum = np.where(np.isnan(werte["T_raum"]), p["sollwert_raumtemperatur"], werte["T_raum"])
+    ergebnis["T_vorlauf_soll"] = berechnung_heizkennlinie_batch(
+        werte["T_aussen"], T_raum, p["sollwert_raumtemperatur"], p["kurve_steilheit"],
+        p["kurve_fixpunkt"], p["kurve_exponent"], p["min_vorlauftemp"], p["max_vorlauftemp"],
+        p["nachtabsenkung_delta"], True, p["norm_raumtemperatur"], p["raumtemp_komp_prozent"],
+        stunden=stunden,
+    )
+
+    # 3. Heizlast (W) und Wärmeleistung (kW) des Heizkreises
+    ergebnis["Q_heiz"] = np.maximum(p["UA"] * (p["T_in_set"] - werte["T_aussen"]), 0.0)
+    vorlauf = np.where(np.isnan(werte["T_vorlauf_ist"]), ergebnis["T_vorlauf_soll"], werte["T_vorlauf_ist"])
+    ergebnis["waermeleistung"], _ = berechnung_waermeleistung_array(
+        vorlauf, p["T_ruecklauf"], p["V_dot"], rho, cp, ungueltig=0.0
+    )
+
+    # 4. Optional ein PID-Schritt je Anlage
+    if zustand is not None and not zeitraum:
+        zustand["T_ist"] = vorlauf
+        ergebnis["stellwert"] = pid_schritt(anlagen["regler"], zustand, ergebnis["T_vorlauf_soll"], dt)
+    else:
+        ergebnis["stellwert"] = np.nan
+    return ergebnis
+
+# ---------- Parallele Auswertung mit Shared Memory ----------
+Freigabe = Tuple[str, tuple, np.dtype]
+
+def _teilen(array: np.ndarray) -> Tuple[SharedMemory, Freigabe]:
+    """Kopiert ein Array in einen Shared-Memory-Block."""
+    speicher = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=speicher.buf)[...] = array
+    return speicher, (speicher.name, array.shape, array.dtype)
+
+def _werte_block_aus(auftrag: tuple) -> None:
+    """Worker: wertet die Anlagen [anfang, ende) direkt im Shared Memory aus."""
+    freigaben, zeitstempel, anfang, ende, optionen = auftrag
+    speicher = [SharedMemory(name=name) for name, _, _ in freigaben]
+    try:
+        anlagen, werte, ergebnis = (
+            np.ndarray(form, dtype, buffer=s.buf) for s, (_, form, dtype) in zip(speicher, freigaben)
+        )
+        ergebnis[anfang:ende] = auswerten(anlagen[anfang:ende], werte[anfang:ende], zeitstempel, **optionen)
+        # Views vor dem Schließen freigeben, sonst bleibt der Puffer exportiert
+        del anlagen, werte, ergebnis
+    finally:
+        for s in speicher:
+            s.close()
+
+def auswerten_parallel(
+    anlagen: np.ndarray,
+    werte: np.ndarray,
+    zeitstempel,
+    max_worker: Optional[int] = None,
+    teile: Optional[int] = None,
+    **optionen
+) -> np.ndarray:
+    """
+    Wie auswerten (ohne Reglerzustand), aber über Prozesse verteilt: die
+    Anlagen werden in `teile` zusammenhängende Blöcke geteilt, Konfiguration,
+    Messwerte und Ergebnis liegen in Shared Memory und werden nicht zu den
+    Workern kopiert.
+    """
+    anzahl = anlagen.shape[0]
+    max_worker = max_worker or os.cpu_count() or 1
+    teile = min(teile or max_worker, anzahl)
+    if max_worker <= 1 or teile <= 1:
+        return auswerten(anlagen, werte, zeitstempel, **optionen)
+
+    grenzen = np.linspace(0, anzahl, teile + 1).astype(int)
+    speicher: List[SharedMemory] = []
+    try:
+        freigaben = []
+        for array in (anlagen, werte, np.empty(werte.shape, dtype=FLOTTE_ERGEBNIS_DTYPE)):
+            s, freigabe = _teilen(array)
+            speicher.append(s)
+            freigaben.append(freigabe)
+        zeitstempel = np.asarray(zeitstempel, dtype="datetime64[s]")
+        auftraege = [
+            (freigaben, zeitstempel, anfang, ende, optionen)
+            for anfang, ende in zip(grenzen[:-1], grenzen[1:])
+        ]
+        with ProcessPoolExecutor(max_workers=min(max_worker, teile)) as pool:
+            list(pool.map(_werte_block_aus, auftraege))
+        _, form, dtype = freigaben[2]
+        return np.ndarray(form, dtype, buffer=speicher[2].buf).copy()
+    finally:
+        for s in speicher:
+            s.close()
+            s.unlink()
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import datetime
+
+    from BHKW_Regelventil import regler_zustand
+
+    # Beispiel: 3000 Anlagen mit gestreuten Kennlinien und Betriebszeiten
+    rng = np.random.default_rng(0)
+    N = 3000
+    anlagen = flotte(
+        N,
+        kurve_steilheit=rng.uniform(0.8, 2.0, N),
+        kurve_exponent=rng.uniform(1.0, 1.4, N),
+        betrieb_start=rng.integers(5, 8, N),
+        UA=rng.uniform(150.0, 600.0, N),
+        Kp=rng.uniform(2.0, 4.0, N),
+    )
+
+    # 1. Ein Regeltakt für alle Anlagen
+    jetzt = datetime(2024, 1, 15, 7, 30)
+    takt = messwerte(
+        N, T_aussen=rng.normal(2.0, 3.0, N), T_vorlauf_ist=rng.normal(55.0, 5.0, N),
+        aussentemp_mittelwert=rng.normal(5.0, 2.0, N), stoerung=rng.random(N) < 0.01,
+    )
+    zustand = regler_zustand(N)
+    start = time.perf_counter()
+    ergebnis = auswerten(anlagen, takt, jetzt, zustand)
+    print(f"Regeltakt für {N} Anlagen: {(time.perf_counter() - start) * 1e3:.1f} ms, "
+          f"{ergebnis['an'].sum()} AN, Ø Soll-Vorlauf {ergebnis['T_vorlauf_soll'].mean():.1f} °C")
+
+    # 2. Eine Woche in Stundenwerten, über Prozesse verteilt
+    zeiten = np.arange("2024-01-15T00", "2024-01-22T00", dtype="datetime64[h]")
+    T_aussen = 2.0 - 5.0 * np.cos(2 * np.pi * (np.arange(zeiten.size) - 3) / 24) + rng.normal(0, 1, (N, 1))
+    woche = messwerte((N, zeiten.size), T_aussen=T_aussen, aussentemp_mittelwert=5.0)
+    start = time.perf_counter()
+    ergebnis = auswerten_parallel(anlagen, woche, zeiten)
+    print(f"Woche für {N} Anlagen: {(time.perf_counter() - start) * 1e3:.0f} ms, "
+          f"Wärmemenge {ergebnis['waermeleistung'].sum():.0f} kWh, "
+          f"Laufzeit Ø {ergebnis['an'].sum(axis=1).mean():.1f} h je Anlage")
@@ -0,0 +1,310 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple, Union
+
+# scipy ist optional: ohne scipy werden die Gleichungssysteme dicht gelöst
+# (nur für kleine Modelle sinnvoll)
+try:
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import splu
+except ImportError:
+    sp = None
+
+# Jede Zone besteht aus zwei Knoten: Raumluft (mit Möblierung) und
+# Gebäudemasse (Wände, Decken). Wärmeleitwerte H in W/K, Kapazitäten C in J/K.
+ZONE_DTYPE = np.dtype([
+    ("C_luft", np.float64),          # Raumluft und Einrichtung
+    ("C_masse", np.float64),         # speicherwirksame Bauteile
+    ("H_aussen", np.float64),        # Luft ↔ außen (Fenster, Lüftung)
+    ("H_masse", np.float64),         # Luft ↔ Bauteiloberflächen
+    ("H_masse_aussen", np.float64),  # Bauteile ↔ außen (opake Hülle)
+    ("Q_max", np.float64),           # installierte Heizleistung in W (inf = unbegrenzt)
+    ("T_soll", np.float64),          # Raumsollwert am Tag in °C
+])
+
+# Wärmeleitwert zwischen der Raumluft zweier Zonen desselben Gebäudes
+KOPPLUNG_DTYPE = np.dtype([
+    ("zone_a", np.int64),
+    ("zone_b", np.int64),
+    ("H", np.float64),
+])
+
+# Etwa 100 m² Wohnfläche, mittlerer Dämmstandard: H_gesamt ≈ 98 W/K
+STANDARD_ZONE = dict(
+    C_luft=1.0e6,
+    C_masse=3.0e7,
+    H_aussen=40.0,
+    H_masse=1500.0,
+    H_masse_aussen=60.0,
+    Q_max=10_000.0,
+    T_soll=20.0,
+)
+
+# Abbruch der Heizleistungssuche: Änderung unter TOLERANZ (K) oder nach MAX_ITERATIONEN
+TOLERANZ = 1e-4
+MAX_ITERATIONEN = 200
+
+Gebaeude = Tuple[np.ndarray, np.ndarray]
+
+def zonen(anzahl: int = 1, **werte) -> np.ndarray:
+    """
+    Erzeugt `anzahl` Zonen (ZONE_DTYPE), vorbelegt mit STANDARD_ZONE.
+    Felder können als Skalar oder Array der Länge `anzahl` überschrieben
+    werden, z.B. zonen(3, Q_max=[5e3, 5e3, 2e3]).
+    """
+    ergebnis = np.empty(anzahl, dtype=ZONE_DTYPE)
+    for name in ZONE_DTYPE.names:
+        ergebnis[name] = werte.pop(name, STANDARD_ZONE[name])
+    if werte:
+        raise ValueError(f"Unbekannte Zonenparameter: {', '.join(sorted(werte))}")
+    return ergebnis
+
+def kopplungen(zone_a, zone_b, H) -> np.ndarray:
+    """Kopplungen (KOPPLUNG_DTYPE) zwischen Zonenpaaren, Indizes innerhalb des Gebäudes."""
+    zone_a, zone_b, H = np.broadcast_arrays(np.atleast_1d(zone_a), np.atleast_1d(zone_b), np.atleast_1d(H))
+    ergebnis = np.empty(zone_a.size, dtype=KOPPLUNG_DTYPE)
+    ergebnis["zone_a"], ergebnis["zone_b"], ergebnis["H"] = zone_a, zone_b, H
+    return ergebnis
+
+def zonenkette(anzahl: int, H: float = 120.0, **werte) -> Gebaeude:
+    """Gebäude aus `anzahl` nebeneinanderliegenden Zonen (z.B. Geschosse oder Reihenhausteile)."""
+    return zonen(anzahl, **werte), kopplungen(np.arange(anzahl - 1), np.arange(1, anzahl), H)
+
+def nachtabsenkung_aktiv(stunden) -> np.ndarray:
+    """Gleiches Zeitfenster wie in berechnung_heizkennlinie: 22:00 bis 06:00."""
+    stunden = np.asarray(stunden)
+    return (stunden >= 22) | (stunden < 6)
+
+class Gebaeudemodell:
+    """
+    RC-Netzwerk eines oder vieler Gebäude mit beliebig vielen Zonen,
+    implizites Euler-Verfahren mit festem Zeitschritt dt (s).
+
+    Alle Gebäude bilden ein gemeinsames blockdiagonales, dünn besetztes
+    Gleichungssystem, das einmal LU-zerlegt wird; ein Zeitschritt kostet
+    eine Vorwärts-/Rückwärtseinsetzung und einige dünne Matrix-Vektor-
+    Produkte, unabhängig davon, ob 1 oder Hunderte Zonen gerechnet werden.
+
+    Geheizt wird ideal: jede Zone erhält die Leistung, die ihre Raumluft
+    am Schrittende genau auf den Sollwert bringt, begrenzt auf [0, Q_max].
+    Die Leistungen gekoppelter Zonen werden gemeinsam iterativ bestimmt
+    (projiziertes Jacobi-Verfahren auf der Antwortmatrix der Zonen).
+    Damit wirken Speichermasse und Nachtabsenkung: nach der Absenkung
+    kühlt das Gebäude langsam aus, morgens entsteht eine Aufheizspitze.
+    """
+
+    def __init__(
+        self,
+        gebaeude: Union[Gebaeude, Sequence[Gebaeude]],
+        dt: float = 3600.0,
+        T_start: Optional[float] = None
+    ):
+        """
+        :param gebaeude: (zonen, kopplungen) eines Gebäudes oder eine Liste davon.
+        :param T_start: Anfangstemperatur aller Knoten; Standard: Sollwert der Zone.
+        """
+        if isinstance(gebaeude, tuple):
+            gebaeude = [gebaeude]
+        zonen_liste = [np.atleast_1d(z) for z, _ in gebaeude]
+        self.dt = dt
+        self.zonen = np.concatenate(zonen_liste)
+        self.anzahl_zonen = np.array([z.size for z in zonen_liste])
+        self.versatz = np.concatenate([[0], np.cumsum(self.anzahl_zonen)[:-1]])
+        self.gebaeude_index = np.repeat(np.arange(len(zonen_liste)), self.anzahl_zonen)
+        Z = self.zonen.size
+
+        # Knoten 0..Z-1: Raumluft, Z..2Z-1: Gebäudemasse
+        luft = np.arange(Z)
+        von, nach, H = [luft], [Z + luft], [self.zonen["H_masse"]]
+        for b, (_, k) in enumerate(gebaeude):
+            k = np.atleast_1d(k)
+            if k.size == 0:
+                continue
+            if k["zone_a"].max() >= self.anzahl_zonen[b] or k["zone_b"].max() >= self.anzahl_zonen[b]:
+                raise ValueError(f"Kopplung verweist auf eine Zone außerhalb von Gebäude {b}.")
+            von.append(self.versatz[b] + k["zone_a"])
+            nach.append(self.versatz[b] + k["zone_b"])
+            H.append(k["H"])
+        von, nach, H = np.concatenate(von), np.concatenate(nach), np.concatenate(H)
+
+        self._g = np.concatenate([self.zonen["H_aussen"], self.zonen["H_masse_aussen"]])
+        self._C_dt = np.concatenate([self.zonen["C_luft"], self.zonen["C_masse"]]) / dt
+
+        # (C/dt + L) T_neu = C/dt T_alt + g T_außen + Q, L: Leitwertmatrix inkl. Außenleitwerten
+        n = 2 * Z
+        diagonale = self._C_dt + self._g
+        np.add.at(diagonale, von, H)
+        np.add.at(diagonale, nach, H)
+        zeilen = np.concatenate([np.arange(n), von, nach])
+        spalten = np.concatenate([np.arange(n), nach, von])
+        werte = np.concatenate([diagonale, -H, -H])
+        if sp is not None:
+            self._loese = splu(sp.csc_matrix((werte, (zeilen, spalten)), shape=(n, n))).solve
+        else:
+            matrix = np.zeros((n, n))
+            np.add.at(matrix, (zeilen, spalten), werte)
+            inverse = np.linalg.inv(matrix)
+            self._loese = inverse.__matmul__
+
+        self._antwort = self._zonenantwort()
+        self._G = self._antwort[:Z]
+        self._zeilensumme = np.asarray(self._G.sum(axis=1)).ravel()
+        self.T = np.full(n, np.nan)
+        self.T[:Z] = self.zonen["T_soll"] if T_start is None else T_start
+        self.T[Z:] = self.T[:Z]
+        self.Q = np.zeros(Z)
+
+    def _zonenantwort(self):
+        """
+        Antwortmatrix (2Z×Z): Änderung aller Knotentemperaturen am
+        Schrittende je W Heizleistung in einer Zone; ungleich null nur
+        innerhalb desselben Gebäudes. Die ersten Z Zeilen (Raumluft) bilden
+        die Matrix G der Heizleistungssuche.
+
+        Da die Gebäude entkoppelt sind, trägt eine rechte Seite die
+        Einheitsleistung für Zone k aller Gebäude gleichzeitig: es genügen
+        so viele Lösungen, wie das größte Gebäude Zonen hat.
+        """
+        Z = self.zonen.size
+        n = 2 * Z
+        eigene_anzahl = self.anzahl_zonen[self.gebaeude_index]
+        # Höchstens ~64 MB für die rechten Seiten eines Blocks
+        block = max(1, min(self.anzahl_zonen.max(), 8_000_000 // n))
+        zeilen, spalten, werte = [], [], []
+        for anfang in range(0, self.anzahl_zonen.max(), block):
+            k = np.arange(anfang, min(anfang + block, self.anzahl_zonen.max()))
+            rechts = np.zeros((n, k.size))
+            b, c = np.nonzero(self.anzahl_zonen[:, None] > k[None, :])
+            rechts[self.versatz[b] + k[c], c] = 1.0
+            antwort = self._loese(rechts)
+            z, c = np.nonzero(eigene_anzahl[:, None] > k[None, :])
+            spalte = self.versatz[self.gebaeude_index[z]] + k[c]
+            # Raumluft- und Massenknoten der Zone z
+            zeilen += [z, Z + z]
+            spalten += [spalte, spalte]
+            werte += [antwort[z, c], antwort[Z + z, c]]
+        zeilen, spalten, werte = np.concatenate(zeilen), np.concatenate(spalten), np.concatenate(werte)
+        if sp is not None:
+            return sp.csr_matrix((werte, (zeilen, spalten)), shape=(n, Z))
+        antwort = np.zeros((n, Z))
+        antwort[zeilen, spalten] = werte
+        return antwort
+
+    def _ideale_heizung(self, T_frei: np.ndarray, T_soll: np.ndarray) -> np.ndarray:
+        """Heizleistungen in [0, Q_max], die die Raumluft auf T_soll bringen (Startwert: letzter Schritt)."""
+        Q = self.Q
+        Q_max = self.zonen["Q_max"]
+        for _ in range(MAX_ITERATIONEN):
+            T_luft = T_frei + self._G @ Q
+            # Schrittweite über die Zeilensumme: konvergiert auch bei starker Kopplung
+            Q_neu = np.clip(Q + (T_soll - T_luft) / self._zeilensumme, 0.0, Q_max)
+            aenderung = np.max(np.abs(Q_neu - Q) * self._zeilensumme, initial=0.0)
+            Q = Q_neu
+            if aenderung < TOLERANZ:
+                break
+        return Q
+
+    def schritt(self, T_out, T_soll=None, Q_intern=0.0) -> np.ndarray:
+        """
+        Ein Zeitschritt dt für alle Gebäude.
+
+        :param T_out: Außentemperatur, Skalar oder je Gebäude.
+        :param T_soll: Raumsollwerte je Zone (Standard: zonen["T_soll"]).
+        :param Q_intern: Innere Gewinne in W, Skalar oder je Zone.
+        :return: Heizleistung je Zone in W (Zustand self.T wird fortgeschrieben).
+        """
+        Z = self.zonen.size
+        T_out = np.broadcast_to(np.asarray(T_out, dtype=np.float64), self.anzahl_zonen.shape)[self.gebaeude_index]
+        rechts = self._C_dt * self.T
+        rechts[:Z] += self._g[:Z] * T_out + Q_intern
+        rechts[Z:] += self._g[Z:] * T_out
+
+        # Eine Lösung ohne Heizung; die Heizleistung wirkt linear über die Antwortmatrix
+        T_frei = self._loese(rechts)
+        self.Q = self._ideale_heizung(T_frei[:Z], self.zonen["T_soll"] if T_soll is None else T_soll)
+        self.T = T_frei + self._antwort @ self.Q
+        return self.Q
+
+    def simuliere(
+        self,
+        T_out,
+        stunden=None,
+        nachtabsenkung_delta: float = 0.0,
+        Q_intern=0.0,
+        zonenwerte: bool = False
+    ) -> dict:
+        """
+        Simuliert alle Gebäude über die Zeitreihe der Außentemperatur.
+
+        :param T_out: Form (T,) für alle Gebäude oder (B, T) je Gebäude.
+        :param stunden: Stunde des Tages je Schritt (0–23); mit
+            nachtabsenkung_delta wird der Raumsollwert von 22:00 bis 06:00
+            um diesen Betrag (K) abgesenkt.
+        :param zonenwerte: zusätzlich Raumluft und Heizleistung je Zone (Z, T).
+        :return:
+            dict mit "Q_heiz" (W) und "T_raum" (°C, Mittel der Zonen) je
+            Gebäude als (B, T), bei zonenwerte auch "Q_zonen" und "T_luft".
+        """
+        B, Z = self.anzahl_zonen.size, self.zonen.size
+        T_out = np.asarray(T_out, dtype=np.float64)
+        T_out = np.broadcast_to(T_out if T_out.ndim == 2 else T_out[None, :], (B, T_out.shape[-1]))
+        schritte = T_out.shape[1]
+        nacht = np.zeros(schritte, dtype=bool) if stunden is None else nachtabsenkung_aktiv(stunden)
+
+        ergebnis = {"Q_heiz": np.empty((B, schritte)), "T_raum": np.empty((B, schritte))}
+        if zonenwerte:
+            ergebnis["Q_zonen"] = np.empty((Z, schritte))
+            ergebnis["T_luft"] = np.empty((Z, schritte))
+        T_soll_tag = self.zonen["T_soll"]
+        T_soll_nacht = T_soll_tag - nachtabsenkung_delta
+        for t in range(schritte):
+            Q = self.schritt(T_out[:, t], T_soll_nacht if nacht[t] else T_soll_tag, Q_intern)
+            ergebnis["Q_heiz"][:, t] = np.bincount(self.gebaeude_index, Q, minlength=B)
+            ergebnis["T_raum"][:, t] = np.bincount(self.gebaeude_index, self.T[:Z], minlength=B)
+            if zonenwerte:
+                ergebnis["Q_zonen"][:, t] = Q
+                ergebnis["T_luft"][:, t] = self.T[:Z]
+        ergebnis["T_raum"] /= self.anzahl_zonen[:, None]
+        return ergebnis
+
+
+if __name__ == "__main__":
+    import time
+
+    # 1. Stationär: Heizlast = (H_aussen + Reihenschaltung Masse) * ΔT
+    z = zonen(1)
+    H_gesamt = z["H_aussen"][0] + 1 / (1 / z["H_masse"][0] + 1 / z["H_masse_aussen"][0])
+    modell = Gebaeudemodell((z, kopplungen([], [], [])))
+    Q = modell.simuliere(np.full(24 * 60, -10.0))["Q_heiz"][0, -1]
+    print(f"Stationär bei -10 °C: {Q:.1f} W (analytisch {H_gesamt * 30.0:.1f} W)")
+
+    # 2. Nachtabsenkung im Januar: drei gekoppelte Zonen, UA ≈ 300 W/K wie in Heizkreis-Heizlast-VL
+    stunden = np.arange(7 * 24) % 24
+    T_out = -2.0 - 4.0 * np.cos(2 * np.pi * (stunden - 3) / 24)
+    ohne = Gebaeudemodell(zonenkette(3)).simuliere(T_out, stunden, 0.0)
+    mit = Gebaeudemodell(zonenkette(3)).simuliere(T_out, stunden, 4.0)
+    print(f"Ohne Absenkung: Ø {ohne['Q_heiz'].mean():.0f} W, Spitze {ohne['Q_heiz'].max():.0f} W")
+    print(f"Mit 4 K Absenkung: Ø {mit['Q_heiz'].mean():.0f} W, Spitze {mit['Q_heiz'].max():.0f} W, "
+          f"Raum um 06:00 {mit['T_raum'][0, 6 * 24 + 5]:.1f} °C")
+
+    # 3. Batch über viele Gebäude entspricht Einzelrechnungen
+    rng = np.random.default_rng(0)
+    gebaeude = [zonenkette(int(n), H=rng.uniform(50, 300), C_masse=rng.uniform(1e7, 5e7, int(n)))
+                for n in rng.integers(1, 8, 20)]
+    batch = Gebaeudemodell(gebaeude).simuliere(T_out, stunden, 3.0)["Q_heiz"]
+    einzeln = np.concatenate([Gebaeudemodell(g).simuliere(T_out, stunden, 3.0)["Q_heiz"] for g in gebaeude])
+    print(f"Batch vs. einzeln: max. Abweichung {np.abs(batch - einzeln).max():.2e} W")
+
+    # 4. Laufzeit für eine Heizperiode (212 Tage) in Stundenschritten
+    stunden = np.arange(212 * 24) % 24
+    T_out = 3.0 - 8.0 * np.cos(2 * np.pi * np.arange(stunden.size) / (365 * 24)) \
+        - 4.0 * np.cos(2 * np.pi * (stunden - 3) / 24)
+    for titel, gebaeude in (
+        ("1 Gebäude, 1 Zone", zonenkette(1)),
+        ("1 Gebäude, 300 Zonen", zonenkette(300, Q_max=3000.0)),
+        ("500 Gebäude à 12 Zonen", [zonenkette(12) for _ in range(500)]),
+    ):
+        start = time.perf_counter()
+        modell = Gebaeudemodell(gebaeude)
+        ergebnis = modell.simuliere(T_out, stunden, 3.0)
+        print(f"{titel:>24}: {time.perf_counter() - start:5.2f} s, "
+              f"Wärmebedarf Ø {ergebnis['Q_heiz'].sum(axis=1).mean() / 1000:.0f} kWh je Gebäude")
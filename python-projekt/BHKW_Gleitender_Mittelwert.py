@@ -0,0 +1,128 @@
+import math
+import numpy as np
+
+from BHKW_Metriken import instrumentiert
+
+# Heizgrenze: bis zu diesem Mehrtages-Mittelwert der Außentemperatur wird geheizt
+HEIZGRENZE = 18.0
+
+class GleitenderMittelwert:
+    """
+    Gleitender Mittelwert der Außentemperatur über `tage` Tage mit je
+    `messungen_pro_tag` Messwerten (Standard: 3 Tage à 07:00, 14:00, 21:00).
+
+    Ringpuffer mit laufender Summe: jeder neue Messwert kostet O(1). Die
+    Summe wird nach jedem Pufferumlauf neu gebildet, damit sich
+    Rundungsfehler über lange Laufzeiten nicht aufsummieren.
+
+    Solange weniger als tage * messungen_pro_tag Werte vorliegen, ist der
+    Mittelwert NaN – außer bei teilfenster=True, dann wird über die
+    vorhandenen Werte gemittelt.
+    """
+
+    __slots__ = ("fenster", "teilfenster", "_puffer", "_pos", "_anzahl", "_summe")
+
+    def __init__(self, tage: int = 3, messungen_pro_tag: int = 3, teilfenster: bool = False):
+        if tage < 1 or messungen_pro_tag < 1:
+            raise ValueError("tage und messungen_pro_tag müssen mindestens 1 sein.")
+        self.fenster = tage * messungen_pro_tag
+        self.teilfenster = teilfenster
+        self._puffer = [0.0] * self.fenster
+        self._pos = 0
+        self._anzahl = 0
+        self._summe = 0.0
+
+    @property
+    def voll(self) -> bool:
+        """True, sobald das Fenster vollständig gefüllt ist."""
+        return self._anzahl == self.fenster
+
+    @property
+    def mittelwert(self) -> float:
+        """Aktueller Mittelwert (NaN, solange das Fenster nicht gefüllt ist)."""
+        if self._anzahl == 0 or (self._anzahl < self.fenster and not self.teilfenster):
+            return math.nan
+        return self._summe / self._anzahl
+
+    @instrumentiert("mittelwert")
+    def hinzufuegen(self, wert: float) -> float:
+        """Nimmt einen Messwert auf und gibt den neuen Mittelwert zurück."""
+        pos = self._pos
+        self._summe += wert - self._puffer[pos]
+        self._puffer[pos] = wert
+        pos += 1
+        if pos == self.fenster:
+            pos = 0
+            self._summe = math.fsum(self._puffer)
+        self._pos = pos
+        if self._anzahl < self.fenster:
+            self._anzahl += 1
+        return self.mittelwert
+
+    def hinzufuegen_array(self, werte) -> np.ndarray:
+        """
+        Nimmt viele Messwerte auf einmal auf.
+
+        Rückgabe:
+            Mittelwert nach jedem einzelnen Messwert (wie wiederholtes
+            hinzufuegen, aber vektorisiert).
+        """
+        werte = np.asarray(werte, dtype=np.float64)
+        if werte.size == 0:
+            return werte.copy()
+
+        # Bisheriger Pufferinhalt in zeitlicher Reihenfolge vor die neuen Werte
+        if self._anzahl < self.fenster:
+            alt = np.array(self._puffer[:self._anzahl])
+        else:
+            alt = np.array(self._puffer[self._pos:] + self._puffer[:self._pos])
+        verlauf = np.concatenate([alt, werte])
+        mittel = gleitender_mittelwert(verlauf, self.fenster, 1, self.teilfenster)[alt.size:]
+
+        # Zustand fortschreiben: die letzten Werte bilden den neuen Puffer
+        rest = verlauf[-self.fenster:]
+        self._anzahl = rest.size
+        self._pos = rest.size % self.fenster
+        self._puffer = rest.tolist() + [0.0] * (self.fenster - rest.size)
+        self._summe = math.fsum(self._puffer)
+        return mittel
+
+def gleitender_mittelwert(
+    werte,
+    tage: int = 3,
+    messungen_pro_tag: int = 3,
+    teilfenster: bool = False
+) -> np.ndarray:
+    """
+    Gleitender Mittelwert über tage * messungen_pro_tag Werte für eine
+    ganze Messreihe (kumulative Summe, O(n)). Die Messreihe darf keine
+    NaN enthalten.
+
+    Rückgabe:
+        Array gleicher Länge; die ersten Werte sind NaN, bis das Fenster
+        gefüllt ist (bei teilfenster=True Mittel über die vorhandenen Werte).
+    """
+    werte = np.asarray(werte, dtype=np.float64)
+    fenster = tage * messungen_pro_tag
+    summen = np.cumsum(werte)
+    summen[fenster:] -= summen[:-fenster].copy()
+    anzahl = np.minimum(np.arange(1, werte.size + 1), fenster)
+    mittel = summen / anzahl
+    if not teilfenster:
+        mittel[:fenster - 1] = np.nan
+    return mittel
+
+def heizperiode_aktiv(mittelwert, heizgrenze: float = HEIZGRENZE):
+    """True (bzw. Bool-Array), wenn der Mittelwert die Heizgrenze nicht überschreitet."""
+    return np.less_equal(mittelwert, heizgrenze)
+
+
+if __name__ == "__main__":
+    # Beispiel-Daten: pro Tag drei Messwerte (07:00, 14:00, 21:00)
+    messwerte = [15.2, 20.1, 17.4, 16.0, 21.3, 18.7, 14.8, 19.5, 17.0, 12.1, 15.3, 13.8]
+
+    mittelwert = GleitenderMittelwert(tage=3, messungen_pro_tag=3)
+    for wert in messwerte:
+        print(f"Messwert {wert:5.1f} °C → 3-Tage-Mittel: {mittelwert.hinzufuegen(wert):.2f} °C")
+
+    print(gleitender_mittelwert(messwerte))
@@ -0,0 +1,197 @@
+import math
+import numpy as np
+from functools import lru_cache
+
+# Untere Grenze des Betriebsbereichs der Außentemperatur (°C)
+TA_MIN = -30.0
+# Zulässiger Interpolationsfehler der Tabelle (K)
+MAX_FEHLER = 0.01
+# Obergrenze der Tabellengröße (Stützstellen)
+MAX_STUETZSTELLEN = 1 << 16
+
+def heizkurve(
+    aussentemperatur,
+    kurve_steilheit: float,
+    kurve_fixpunkt: float,
+    kurve_exponent: float,
+    norm_raumtemperatur: float
+):
+    """
+    Exakte Heizkurve K * (T_norm - T_außen)**exponent + B für Skalare
+    oder Arrays.
+
+    Oberhalb der Norm-Raumtemperatur wird (T_norm - T_außen) auf 0
+    begrenzt, die Kurve liefert dort den Fixpunkt B statt NaN bzw. einer
+    komplexen Zahl.
+    """
+    abstand = np.maximum(np.subtract(norm_raumtemperatur, aussentemperatur), 0.0)
+    return kurve_steilheit * abstand ** kurve_exponent + kurve_fixpunkt
+
+def _sehnenfehler(abstand: np.ndarray, kurve_exponent: float) -> float:
+    """
+    Größter Fehler der linearen Interpolation von x**exponent zwischen den
+    Stützstellen `abstand` (exakt, nicht abgeschätzt).
+
+    x**exponent ist auf x > 0 entweder konvex oder konkav; der größte
+    Abstand zur Sehne liegt daher dort, wo die Tangente parallel zur Sehne
+    ist: exponent * x**(exponent - 1) = Steigung.
+    """
+    if kurve_exponent == 1.0:
+        return 0.0
+    werte = abstand ** kurve_exponent
+    steigung = np.diff(werte) / np.diff(abstand)
+    beruehrpunkt = (steigung / kurve_exponent) ** (1.0 / (kurve_exponent - 1.0))
+    fehler = np.abs(
+        werte[:-1] + steigung * (beruehrpunkt - abstand[:-1]) - beruehrpunkt ** kurve_exponent
+    )
+    return float(fehler.max())
+
+class Heizkennlinie:
+    """
+    Heizkurve als vorberechnete Tabelle über den Betriebsbereich
+    ta_min ≤ T_außen ≤ T_norm.
+
+    Die Tabelle hat gleichabständige Stützstellen, der Tabellenplatz ergibt
+    sich also aus einer Multiplikation statt einer Suche. Die Anzahl wird
+    so lange verdoppelt, bis der exakt berechnete Interpolationsfehler
+    höchstens max_fehler beträgt (Attribut `fehlerschranke`). Werte unter
+    ta_min werden exakt gerechnet, Werte über T_norm liefern den Fixpunkt.
+
+    Bei Exponenten unter 1 ist die Kurve an T_norm unendlich steil; dort
+    werden für kleine max_fehler sehr viele Stützstellen nötig.
+    """
+
+    __slots__ = (
+        "kurve_steilheit", "kurve_fixpunkt", "kurve_exponent", "norm_raumtemperatur",
+        "ta_min", "fehlerschranke", "_spanne", "_kehrwert", "_werte", "_differenzen",
+        "_werte_liste", "_differenzen_liste",
+    )
+
+    def __init__(
+        self,
+        kurve_steilheit: float,
+        kurve_fixpunkt: float,
+        kurve_exponent: float,
+        norm_raumtemperatur: float,
+        ta_min: float = TA_MIN,
+        max_fehler: float = MAX_FEHLER
+    ):
+        if kurve_exponent <= 0:
+            raise ValueError("kurve_exponent muss größer als 0 sein.")
+        if max_fehler <= 0:
+            raise ValueError("max_fehler muss größer als 0 sein.")
+        if ta_min >= norm_raumtemperatur:
+            raise ValueError("ta_min muss unter der Norm-Raumtemperatur liegen.")
+
+        self.kurve_steilheit = kurve_steilheit
+        self.kurve_fixpunkt = kurve_fixpunkt
+        self.kurve_exponent = kurve_exponent
+        self.norm_raumtemperatur = norm_raumtemperatur
+        self.ta_min = ta_min
+        self._spanne = norm_raumtemperatur - ta_min
+
+        # Stützstellen über den Abstand T_norm - T_außen (0 … spanne)
+        anzahl = 16
+        while True:
+            abstand = np.linspace(0.0, self._spanne, anzahl + 1)
+            fehler = abs(kurve_steilheit) * _sehnenfehler(abstand, kurve_exponent)
+            if fehler <= max_fehler or anzahl >= MAX_STUETZSTELLEN:
+                break
+            anzahl *= 2
+        if fehler > max_fehler:
+            raise ValueError(
+                f"max_fehler={max_fehler} ist mit {MAX_STUETZSTELLEN} Stützstellen nicht erreichbar."
+            )
+
+        self.fehlerschranke = fehler
+        self._kehrwert = anzahl / self._spanne
+        self._werte = kurve_steilheit * abstand ** kurve_exponent + kurve_fixpunkt
+        # Letzte Differenz 0: der Randpunkt abstand == spanne braucht keinen Sonderfall
+        self._differenzen = np.append(np.diff(self._werte), 0.0)
+        self._werte_liste = self._werte.tolist()
+        self._differenzen_liste = self._differenzen.tolist()
+
+    @property
+    def stuetzstellen(self) -> int:
+        """Anzahl der Tabelleneinträge."""
+        return self._werte.size
+
+    def wert(self, aussentemperatur: float) -> float:
+        """Ein einzelner Wert ohne numpy-Overhead (z.B. im Regeltakt)."""
+        abstand = self.norm_raumtemperatur - aussentemperatur
+        if math.isnan(abstand):
+            return math.nan
+        if abstand <= 0.0:
+            return self.kurve_fixpunkt
+        if abstand > self._spanne:
+            return self.kurve_steilheit * abstand ** self.kurve_exponent + self.kurve_fixpunkt
+        position = abstand * self._kehrwert
+        i = int(position)
+        return self._werte_liste[i] + (position - i) * self._differenzen_liste[i]
+
+    def __call__(self, aussentemperatur):
+        """Heizkurve für Skalare oder Arrays (Ergebnis wie heizkurve)."""
+        ta = np.asarray(aussentemperatur, dtype=np.float64)
+        letzte = self._werte.size - 1
+
+        # Tabellenplatz und Interpolation in-place, ohne Zwischenarrays
+        position = np.subtract(self.norm_raumtemperatur, ta, out=np.empty_like(ta))
+        np.maximum(position, 0.0, out=position)
+        position *= self._kehrwert
+        ausserhalb = position > letzte
+        # NaN und ±inf auf Index 0: NaN setzt sich in der Interpolation fort,
+        # ±inf liegt außerhalb und wird unten exakt berechnet
+        i = np.where(np.isfinite(position), position, 0.0).astype(np.intp)
+        np.minimum(i, letzte, out=i)
+        ergebnis = position
+        ergebnis -= i
+        ergebnis *= self._differenzen.take(i)
+        ergebnis += self._werte.take(i)
+
+        if ausserhalb.any():
+            ergebnis[ausserhalb] = heizkurve(
+                ta[ausserhalb], self.kurve_steilheit, self.kurve_fixpunkt,
+                self.kurve_exponent, self.norm_raumtemperatur
+            )
+        return ergebnis if ergebnis.ndim else float(ergebnis)
+
+@lru_cache(maxsize=64)
+def _tabelle(*parameter: float) -> Heizkennlinie:
+    return Heizkennlinie(*parameter)
+
+def heizkennlinie(
+    kurve_steilheit: float,
+    kurve_fixpunkt: float,
+    kurve_exponent: float,
+    norm_raumtemperatur: float,
+    ta_min: float = TA_MIN,
+    max_fehler: float = MAX_FEHLER
+) -> Heizkennlinie:
+    """
+    Liefert die Tabelle für einen Parametersatz; gleiche Parameter teilen
+    sich eine einmal berechnete Tabelle.
+    """
+    return _tabelle(
+        float(kurve_steilheit), float(kurve_fixpunkt), float(kurve_exponent),
+        float(norm_raumtemperatur), float(ta_min), float(max_fehler)
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    kennlinie = heizkennlinie(1.5, 25.0, 1.2, 20.0)
+    print(f"{kennlinie.stuetzstellen} Stützstellen, Fehler ≤ {kennlinie.fehlerschranke:.4f} K")
+
+    ta = np.random.default_rng(0).uniform(-35.0, 25.0, 1_000_000)
+    start = time.perf_counter()
+    exakt = heizkurve(ta, 1.5, 25.0, 1.2, 20.0)
+    t_exakt = time.perf_counter() - start
+    start = time.perf_counter()
+    tabelle = kennlinie(ta)
+    t_tabelle = time.perf_counter() - start
+    print(f"exakt {t_exakt * 1e3:.1f} ms, Tabelle {t_tabelle * 1e3:.1f} ms, "
+          f"max. Abweichung {np.abs(tabelle - exakt).max():.4f} K")
+
+    for wert in (-40.0, -10.0, 5.0, 20.0, 25.0):
+        print(f"T_außen {wert:6.1f} °C → Heizkurve {kennlinie.wert(wert):6.2f} °C")
@@ -0,0 +1,255 @@
+import io
+import json
+import os
+import threading
+import numpy as np
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bytes, die die Nachführung höchstens auf einmal einliest
+LESEBLOCK = 16 << 20
+
+_STUNDE_NS = 3_600_000_000_000
+
+def heizlast(T_out, UA: float, T_in_set: float) -> np.ndarray:
+    """Heizlast (W) über den Wärmeverlustkoeffizienten UA (W/K), nie negativ."""
+    Q_heiz = UA * (T_in_set - np.asarray(T_out, dtype=np.float64))
+    return np.maximum(Q_heiz, 0.0, out=Q_heiz)
+
+def vorlauf_aus_heizlast(Q_heiz, V_dot: float, T_ruecklauf: float, cp: float = 4180, rho: float = 1000) -> np.ndarray:
+    """
+    Vorlauftemperatur (°C) aus Heizlast Q_heiz (W), Volumenstrom V_dot
+    (m³/h) und Rücklauftemperatur. T_ruecklauf darf eine Zeitreihe sein,
+    z.B. der tatsächliche Rücklauf aus simuliere_pufferspeicher.
+    """
+    m_dot = V_dot * rho / 3600.0
+    return np.asarray(Q_heiz, dtype=np.float64) / (m_dot * cp) + T_ruecklauf
+
+def berechne_heizlast_und_vorlauftemperatur(
+    weather_csv: str,
+    UA: float,
+    T_in_set: float,
+    V_dot: float,
+    T_ruecklauf: float,
+    cp: float = 4180,
+    rho: float = 1000,
+    **lade_optionen
+) -> "pd.DataFrame":
+    """
+    Stündliche Außentemperatur "T_out", Heizlast "Q_heiz" (W) und
+    Vorlauftemperatur "T_vorlauf" (°C) aus einer Wetter-CSV.
+
+    lade_optionen (chunkgroesse, zeitformat, cache_verzeichnis, ...) gehen
+    an lade_aussentemperatur_stuendlich. pandas wird erst hier geladen.
+    """
+    from BHKW_Wetterdaten import lade_aussentemperatur_stuendlich
+
+    # CSV blockweise einlesen (oder aus dem Cache laden), auf stündliche
+    # Frequenz bringen und fehlende Werte interpolieren
+    df = lade_aussentemperatur_stuendlich(weather_csv, **lade_optionen)
+
+    df["Q_heiz"] = heizlast(df["T_out"].to_numpy(), UA, T_in_set)
+    df["T_vorlauf"] = vorlauf_aus_heizlast(df["Q_heiz"].to_numpy(), V_dot, T_ruecklauf, cp, rho)
+    return df
+
+class HeizlastNachfuehrung:
+    """
+    Inkrementelle Variante von berechne_heizlast_und_vorlauftemperatur für
+    Wetter-CSVs, an die laufend Zeilen angehängt werden.
+
+    Gemerkt werden die Leseposition (Bytes), das Zeitformat, der
+    Rasteranker und der letzte Stundenwert. aktualisieren() liest nur die
+    seither angehängten vollständigen Zeilen und liefert nur neue
+    Stundenzeilen. Stunden ohne Messwert werden erst ausgegeben, wenn der
+    nächste Stundenwert da ist, und dann wie von interpolate() linear
+    gefüllt; alle bisher gelieferten Zeilen zusammen entsprechen damit
+    genau der Vollberechnung bis zum letzten Stundenwert.
+
+    Erwartet chronologisch angehängte Zeilen wie die Vollberechnung bei
+    sortierten Dateien: Zeilen vor dem letzten verarbeiteten Stundenwert
+    und Duplikate werden verworfen (es zählt der erste Wert). Wird die
+    Datei kürzer (neu angelegt), beginnt die Nachführung von vorn.
+    Der Zustand lässt sich mit speichern()/laden() zwischen
+    Prozessstarts (z.B. Cron) übernehmen.
+    """
+
+    def __init__(
+        self,
+        weather_csv: str,
+        UA: float,
+        T_in_set: float,
+        V_dot: float,
+        T_ruecklauf: float,
+        cp: float = 4180,
+        rho: float = 1000,
+        zeitformat: Optional[str] = None,
+        zeitspalte: int = 0,
+        tempspalte: int = 1,
+        sep: str = ";",
+        encoding: str = "latin1"
+    ):
+        self.weather_csv = weather_csv
+        self.UA, self.T_in_set = UA, T_in_set
+        self.V_dot, self.T_ruecklauf = V_dot, T_ruecklauf
+        self.cp, self.rho = cp, rho
+        self.zeitspalte, self.tempspalte = zeitspalte, tempspalte
+        self.sep, self.encoding = sep, encoding
+        self._zeitformat_vorgabe = zeitformat
+        self.zuruecksetzen()
+
+    def zuruecksetzen(self) -> None:
+        """Vergisst den Lesestand; der nächste Aufruf beginnt am Dateianfang."""
+        self.position = 0
+        self.kopf_gelesen = False
+        self.zeitformat = self._zeitformat_vorgabe
+        self.anker: Optional[int] = None
+        # Letzter gesehener Rasterzeitpunkt (auch mit NaN) und letzter bekannter Wert (ns, °C)
+        self.letzte_rasterzeit: Optional[int] = None
+        self.letzter_wert: Optional[tuple] = None
+
+    # ---------- Zustand ----------
+    def zustand(self) -> dict:
+        return {
+            "weather_csv": self.weather_csv,
+            "position": self.position,
+            "kopf_gelesen": self.kopf_gelesen,
+            "zeitformat": self.zeitformat,
+            "anker": self.anker,
+            "letzte_rasterzeit": self.letzte_rasterzeit,
+            "letzter_wert": self.letzter_wert,
+        }
+
+    def zustand_setzen(self, zustand: dict) -> None:
+        if zustand.get("weather_csv") != self.weather_csv:
+            raise ValueError(f"Zustand gehört zu {zustand.get('weather_csv')!r}, nicht zu {self.weather_csv!r}.")
+        self.position = int(zustand["position"])
+        self.kopf_gelesen = bool(zustand["kopf_gelesen"])
+        self.zeitformat = zustand["zeitformat"]
+        self.anker = zustand["anker"]
+        self.letzte_rasterzeit = zustand["letzte_rasterzeit"]
+        self.letzter_wert = None if zustand["letzter_wert"] is None else tuple(zustand["letzter_wert"])
+
+    def speichern(self, pfad: str) -> str:
+        """Schreibt den Zustand als JSON (atomar per os.replace)."""
+        temporaer = f"{pfad}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporaer, "w", encoding="utf-8") as datei:
+            json.dump(self.zustand(), datei)
+        os.replace(temporaer, pfad)
+        return pfad
+
+    def laden(self, pfad: str) -> bool:
+        """Übernimmt einen gespeicherten Zustand. Rückgabe False, wenn die Datei fehlt."""
+        try:
+            with open(pfad, encoding="utf-8") as datei:
+                zustand = json.load(datei)
+        except FileNotFoundError:
+            return False
+        self.zustand_setzen(zustand)
+        return True
+
+    # ---------- Einlesen ----------
+    def _neue_zeilen(self):
+        """
+        Seit dem letzten Aufruf angehängte vollständige Zeilen als
+        (Bytes-Block, Länge in der Datei). Position und Kopfzeile schreibt
+        erst der Aufrufer fort, wenn der Block verarbeitet ist.
+        """
+        groesse = os.path.getsize(self.weather_csv)
+        if groesse < self.position:
+            self.zuruecksetzen()
+        with open(self.weather_csv, "rb") as datei:
+            position = self.position
+            datei.seek(position)
+            while True:
+                daten = datei.read(LESEBLOCK)
+                if not daten:
+                    return
+                ende = daten.rfind(b"\n") + 1
+                if ende == 0:
+                    # Unvollständige letzte Zeile: beim nächsten Aufruf erneut lesen
+                    if len(daten) < LESEBLOCK:
+                        return
+                    raise ValueError(f"Zeile länger als {LESEBLOCK} Bytes in {self.weather_csv}.")
+                position += ende
+                datei.seek(position)
+                block = daten[:ende]
+                if not self.kopf_gelesen:
+                    block = block[block.find(b"\n") + 1:]
+                yield block, ende
+
+    def _stundenwerte(self, block: bytes):
+        """(Rasterzeitpunkte in ns, T_out) der Zeilen eines Blocks, die auf das Stundenraster fallen."""
+        import pandas as pd
+        from BHKW_Wetterdaten import erkenne_zeitformat, parse_zeitstempel, temperatur_aus_rohwerten
+
+        leer = np.empty(0, dtype=np.int64), np.empty(0)
+        if not block.strip():
+            return leer
+        zeilen = pd.read_csv(
+            io.BytesIO(block), sep=self.sep, header=None, usecols=[self.zeitspalte, self.tempspalte],
+            dtype=str, encoding=self.encoding,
+        )
+        zeit_roh = zeilen.iloc[:, 0].str.strip()
+        if self.zeitformat is None:
+            self.zeitformat = erkenne_zeitformat(zeit_roh.head(100))
+            if self.zeitformat is None:
+                raise ValueError(f"Unbekanntes Zeitformat in {self.weather_csv}: {zeit_roh.iloc[0]!r}")
+        zeiten = parse_zeitstempel(zeit_roh, self.zeitformat)
+        gueltig = zeiten.notna().to_numpy()
+        if not gueltig.any():
+            return leer
+        ns = pd.DatetimeIndex(zeiten[gueltig]).as_unit("ns").asi8
+        werte = temperatur_aus_rohwerten(zeilen.iloc[:, 1])[gueltig]
+        if self.anker is None:
+            self.anker = int(ns[0])
+
+        # Wie asfreq("h") mit Duplikaten keep="first": nur Rasterzeilen nach der letzten
+        auswahl = (ns - self.anker) % _STUNDE_NS == 0
+        if self.letzte_rasterzeit is not None:
+            auswahl &= ns > self.letzte_rasterzeit
+        ns, werte = ns[auswahl], werte[auswahl]
+        ns, erste = np.unique(ns, return_index=True)
+        return ns, werte[erste]
+
+    def aktualisieren(self) -> "pd.DataFrame":
+        """
+        Liest neu angehängte Zeilen und liefert die neuen Stundenzeilen mit
+        "T_out", "Q_heiz" und "T_vorlauf" (wie berechne_heizlast_und_vorlauftemperatur).
+        """
+        import pandas as pd
+
+        stuetz_ns, stuetz_werte = [], []
+        for block, laenge in self._neue_zeilen():
+            ns, werte = self._stundenwerte(block)
+            # Erst nach erfolgreichem Einlesen: ein fehlerhafter Block wird beim nächsten Aufruf erneut gelesen
+            self.position += laenge
+            self.kopf_gelesen = True
+            if ns.size:
+                self.letzte_rasterzeit = int(ns[-1])
+                bekannt = ~np.isnan(werte)
+                stuetz_ns.append(ns[bekannt])
+                stuetz_werte.append(werte[bekannt])
+
+        raster = np.empty(0, dtype=np.int64)
+        T_out = np.empty(0)
+        stuetz_ns = np.concatenate(stuetz_ns) if stuetz_ns else np.empty(0, dtype=np.int64)
+        if stuetz_ns.size:
+            stuetz_werte = np.concatenate(stuetz_werte)
+            if self.letzter_wert is None:
+                # Erste Ausgabe ab dem Anker; Stunden vor dem ersten Messwert bleiben NaN
+                anfang = self.anker
+            else:
+                anfang = self.letzter_wert[0] + _STUNDE_NS
+                stuetz_ns = np.concatenate([[self.letzter_wert[0]], stuetz_ns])
+                stuetz_werte = np.concatenate([[self.letzter_wert[1]], stuetz_werte])
+            raster = np.arange(anfang, stuetz_ns[-1] + 1, _STUNDE_NS, dtype=np.int64)
+            T_out = np.interp(raster, stuetz_ns, stuetz_werte, left=np.nan)
+            self.letzter_wert = (int(stuetz_ns[-1]), float(stuetz_werte[-1]))
+
+        index = pd.DatetimeIndex(raster.astype("datetime64[ns]"), name="DateTime")
+        df = pd.DataFrame({"T_out": T_out}, index=index)
+        df["Q_heiz"] = heizlast(T_out, self.UA, self.T_in_set)
+        df["T_vorlauf"] = vorlauf_aus_heizlast(df["Q_heiz"].to_numpy(), self.V_dot, self.T_ruecklauf, self.cp, self.rho)
+        return df
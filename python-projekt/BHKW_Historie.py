@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from BHKW_Heizlast import heizlast
+from BHKW_Waermeleistung import berechnung_waermeleistung_array
+
+# Standardspalten einer Anlage: Zeitstempel plus kompakte Messwerte.
+# "zeit" ist Pflicht und muss aufsteigend sein (Index für Bereichsabfragen).
+STANDARD_SPALTEN = {
+    "zeit": "datetime64[ms]",
+    "T_out": "float32",
+    "T_vorlauf": "float32",
+    "T_ruecklauf": "float32",
+    "volumenstrom": "float32",
+    "stellwert": "float32",
+    "status": "int8",
+    "an": "bool",
+}
+
+# Bei Änderungen am Dateiformat erhöhen
+HISTORIE_VERSION = 1
+META_DATEI = "meta.json"
+
+Zeitpunkt = object  # alles, was np.datetime64(..., "ms") versteht: datetime, str, datetime64
+
+def _fuellwert(dtype: np.dtype):
+    """Wert für nicht übergebene Spalten: NaN bei Gleitkomma, sonst 0/False."""
+    return np.nan if dtype.kind == "f" else dtype.type(0)
+
+class Historie:
+    """
+    Append-only Zeitreihenspeicher einer Anlage: je Spalte eine Binärdatei
+    mit festem dtype, gelesen per Memory-Map.
+
+    Abfragen liefern NumPy-Views auf die gemappten Dateien (keine Kopie),
+    die direkt an berechnung_waermeleistung_array, heizlast oder
+    analysiere_sprungantwort gehen können. Der Zeitbereich wird per
+    Binärsuche auf der Spalte "zeit" gefunden (O(log n)).
+
+    Die Anzahl gültiger Zeilen steht in meta.json und wird erst nach den
+    Spaltendaten (atomar per os.replace) fortgeschrieben: ein abgebrochenes
+    Anhängen hinterlässt höchstens ungenutzte Bytes am Dateiende, die beim
+    nächsten Anhängen überschrieben werden. Es darf nur ein Prozess
+    schreiben; lesende Prozesse sehen neue Zeilen nach aktualisieren()
+    (bereich() prüft das selbst).
+    """
+
+    def __init__(self, verzeichnis: str, spalten: Optional[Dict[str, str]] = None):
+        """
+        Öffnet die Historie in `verzeichnis` oder legt sie mit `spalten`
+        (Name -> dtype, Standard: STANDARD_SPALTEN) an. Bei einer
+        bestehenden Historie müssen angegebene Spalten übereinstimmen.
+        """
+        self.verzeichnis = Path(verzeichnis)
+        self._meta_pfad = self.verzeichnis / META_DATEI
+        if self._meta_pfad.exists():
+            self._meta_lesen()
+            if spalten is not None and {n: np.dtype(d) for n, d in spalten.items()} != self.spalten:
+                raise ValueError(f"Spalten passen nicht zur bestehenden Historie in {verzeichnis}.")
+        else:
+            spalten = dict(STANDARD_SPALTEN if spalten is None else spalten)
+            if np.dtype(spalten.get("zeit")) != np.dtype("datetime64[ms]"):
+                raise ValueError('Spalte "zeit" mit dtype datetime64[ms] ist Pflicht.')
+            self.verzeichnis.mkdir(parents=True, exist_ok=True)
+            self.spalten = {name: np.dtype(dtype) for name, dtype in spalten.items()}
+            self.anzahl = 0
+            for name in self.spalten:
+                self._datei(name).touch()
+            self._meta_schreiben()
+        self._maps: Dict[str, np.ndarray] = {}
+
+    # ---------- Metadaten ----------
+    def _datei(self, name: str) -> Path:
+        return self.verzeichnis / f"{name}.bin"
+
+    def _meta_lesen(self) -> None:
+        stat = self._meta_pfad.stat()
+        with open(self._meta_pfad, encoding="utf-8") as datei:
+            meta = json.load(datei)
+        if meta.get("version") != HISTORIE_VERSION:
+            raise ValueError(f"Unbekannte Historien-Version {meta.get('version')!r} in {self.verzeichnis}.")
+        self.spalten = {name: np.dtype(dtype) for name, dtype in meta["spalten"].items()}
+        self.anzahl = int(meta["anzahl"])
+        self._meta_stand = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _meta_schreiben(self) -> None:
+        meta = {
+            "version": HISTORIE_VERSION,
+            "spalten": {name: dtype.str for name, dtype in self.spalten.items()},
+            "anzahl": self.anzahl,
+        }
+        temporaer = self._meta_pfad.with_name(f"{META_DATEI}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporaer, "w", encoding="utf-8") as datei:
+            json.dump(meta, datei)
+        os.replace(temporaer, self._meta_pfad)
+        stat = self._meta_pfad.stat()
+        self._meta_stand = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def aktualisieren(self) -> bool:
+        """Liest meta.json neu, falls ein anderer Prozess angehängt hat. Rückgabe: True bei Änderung."""
+        stat = self._meta_pfad.stat()
+        if (stat.st_mtime_ns, stat.st_size, stat.st_ino) == self._meta_stand:
+            return False
+        anzahl = self.anzahl
+        self._meta_lesen()
+        if self.anzahl != anzahl:
+            self._maps.clear()
+        return True
+
+    def __len__(self) -> int:
+        return self.anzahl
+
+    # ---------- Schreiben ----------
+    def anhaengen(self, werte, sync: bool = False) -> int:
+        """
+        Hängt Zeilen an. `werte` ist ein dict (Name -> Skalar oder Array)
+        oder ein strukturiertes Array; "zeit" ist Pflicht, fehlende Spalten
+        werden mit NaN bzw. 0 gefüllt, Werte in den Spalten-dtype
+        umgewandelt. Die Zeitstempel müssen aufsteigend sein und dürfen
+        nicht vor dem letzten gespeicherten liegen.
+
+        :param sync: Spaltendateien vor dem Fortschreiben der Zeilenzahl mit
+            fsync auf den Datenträger bringen.
+        :return: Anzahl angehängter Zeilen.
+        """
+        namen = werte.dtype.names if isinstance(werte, np.ndarray) else tuple(werte)
+        unbekannt = set(namen) - set(self.spalten)
+        if unbekannt:
+            raise ValueError(f"Unbekannte Spalten: {', '.join(sorted(unbekannt))}")
+        if "zeit" not in namen:
+            raise ValueError('Spalte "zeit" fehlt.')
+
+        zeit = np.atleast_1d(np.asarray(werte["zeit"], dtype="datetime64[ms]"))
+        anzahl = zeit.size
+        if anzahl == 0:
+            return 0
+        if np.any(zeit[1:] < zeit[:-1]):
+            raise ValueError("Zeitstempel müssen aufsteigend sein.")
+        letzte = self.letzte_zeit()
+        if letzte is not None and zeit[0] < letzte:
+            raise ValueError(f"Zeitstempel {zeit[0]} liegt vor dem letzten gespeicherten ({letzte}).")
+
+        for name, dtype in self.spalten.items():
+            if name in namen:
+                spalte = np.broadcast_to(np.asarray(werte[name]).astype(dtype, copy=False), (anzahl,))
+            else:
+                spalte = np.full(anzahl, _fuellwert(dtype), dtype=dtype)
+            with open(self._datei(name), "r+b") as datei:
+                # Ab der letzten gültigen Zeile: Reste eines Abbruchs werden überschrieben
+                datei.seek(self.anzahl * dtype.itemsize)
+                datei.write(np.ascontiguousarray(spalte).tobytes())
+                if sync:
+                    datei.flush()
+                    os.fsync(datei.fileno())
+
+        self.anzahl += anzahl
+        self._meta_schreiben()
+        self._maps.clear()
+        return anzahl
+
+    # ---------- Lesen ----------
+    def spalte(self, name: str) -> np.ndarray:
+        """Ganze Spalte als schreibgeschützte Memory-Map (ohne Kopie)."""
+        karte = self._maps.get(name)
+        if karte is None:
+            dtype = self.spalten[name]
+            if self.anzahl == 0:
+                karte = np.empty(0, dtype=dtype)
+            else:
+                karte = np.memmap(self._datei(name), dtype=dtype, mode="r", shape=(self.anzahl,))
+            self._maps[name] = karte
+        return karte
+
+    def letzte_zeit(self) -> Optional[np.datetime64]:
+        return self.spalte("zeit")[-1] if self.anzahl else None
+
+    def index_bereich(self, start: Zeitpunkt = None, ende: Zeitpunkt = None) -> Tuple[int, int]:
+        """Zeilenindizes [i0, i1) für start <= zeit < ende (None = offen), per Binärsuche."""
+        zeit = self.spalte("zeit")
+        i0 = 0 if start is None else int(np.searchsorted(zeit, np.datetime64(start, "ms"), side="left"))
+        i1 = self.anzahl if ende is None else int(np.searchsorted(zeit, np.datetime64(ende, "ms"), side="left"))
+        return i0, max(i0, i1)
+
+    def bereich(
+        self,
+        start: Zeitpunkt = None,
+        ende: Zeitpunkt = None,
+        spalten: Optional[Sequence[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Alle (oder die angegebenen) Spalten für start <= zeit < ende als
+        Views auf die Memory-Maps.
+        """
+        self.aktualisieren()
+        i0, i1 = self.index_bereich(start, ende)
+        return {name: self.spalte(name)[i0:i1] for name in (spalten or self.spalten)}
+
+    # ---------- Auswertungen direkt auf den Views ----------
+    def waermeleistung(
+        self,
+        start: Zeitpunkt = None,
+        ende: Zeitpunkt = None,
+        dichte: float = 1000.0,
+        cp: float = 4184.0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(zeit, Wärmeleistung in kW) im Bereich; ΔT ≤ 0 liefert NaN."""
+        daten = self.bereich(start, ende, ("zeit", "T_vorlauf", "T_ruecklauf", "volumenstrom"))
+        leistung, _ = berechnung_waermeleistung_array(
+            daten["T_vorlauf"], daten["T_ruecklauf"], daten["volumenstrom"], dichte, cp
+        )
+        return daten["zeit"], leistung
+
+    def heizlast(
+        self,
+        UA: float,
+        T_in_set: float,
+        start: Zeitpunkt = None,
+        ende: Zeitpunkt = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(zeit, Heizlast in W) im Bereich aus der Spalte T_out."""
+        daten = self.bereich(start, ende, ("zeit", "T_out"))
+        return daten["zeit"], heizlast(daten["T_out"], UA, T_in_set)
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import time
+
+    from BHKW_Einschwingverhalten import analysiere_sprungantwort
+    from BHKW_Waermeleistung import energie_buckets
+
+    # Beispiel: 30 Tage Messwerte im 10-s-Raster, tageweise angehängt
+    ordner = tempfile.mkdtemp(prefix="bhkw_historie_")
+    historie = Historie(ordner)
+    rng = np.random.default_rng(0)
+    schritte_tag = 8640
+    beginn = np.datetime64("2024-01-01T00:00:00", "ms")
+    start = time.perf_counter()
+    for tag in range(30):
+        zeit = beginn + (tag * schritte_tag + np.arange(schritte_tag)) * np.timedelta64(10, "s")
+        stunde = (zeit - zeit.astype("datetime64[D]")).astype(np.int64) / 3.6e6
+        T_out = 2.0 - 6.0 * np.cos(2 * np.pi * (stunde - 3) / 24) + rng.normal(0, 0.3, schritte_tag)
+        T_vorlauf = 45.0 - 0.8 * T_out + rng.normal(0, 0.2, schritte_tag)
+        historie.anhaengen({
+            "zeit": zeit, "T_out": T_out, "T_vorlauf": T_vorlauf, "T_ruecklauf": 30.0,
+            "volumenstrom": 0.5, "stellwert": np.clip(2.0 * (T_vorlauf - 30.0), 0, 100),
+            "status": 0, "an": T_out < 15.0,
+        })
+    print(f"{len(historie)} Zeilen in {time.perf_counter() - start:.2f} s angehängt")
+    groesse = sum(datei.stat().st_size for datei in Path(ordner).glob("*.bin"))
+    print(f"Speicherbedarf: {groesse / 1e6:.1f} MB ({groesse / len(historie):.0f} Byte je Zeile)")
+
+    # Zweite Instanz wie ein Dashboard-Prozess: nur Memory-Map, keine Kopie
+    leser = Historie(ordner)
+    start = time.perf_counter()
+    zeit, leistung = leser.waermeleistung("2024-01-15", "2024-01-16")
+    dauer = time.perf_counter() - start
+    print(f"Tagesabfrage: {zeit.size} Werte in {dauer * 1e3:.2f} ms, Ø {np.nanmean(leistung):.2f} kW")
+    print(f"View auf die Memory-Map: {isinstance(leser.bereich('2024-01-15', '2024-01-16')['T_vorlauf'].base, np.memmap)}")
+
+    tage, energie = energie_buckets(*leser.waermeleistung("2024-01-01", "2024-01-08"))
+    for tag, kwh in zip(tage, energie):
+        print(f"{tag}: {kwh:6.1f} kWh")
+
+    _, last = leser.heizlast(300.0, 20.0, "2024-01-20T06:00", "2024-01-20T07:00")
+    print(f"Heizlast 20.01. 06–07 Uhr: Ø {last.mean():.0f} W")
+
+    daten = leser.bereich("2024-01-10T12:00", "2024-01-10T13:00", ("T_vorlauf",))
+    kennwerte = analysiere_sprungantwort(daten["T_vorlauf"], 38.5, 0, 40.0, toleranz=1.0, stabil_dauer=6, dt=10.0)
+    print(f"Einschwingzeit auf 38,5 °C ± 1 K: {kennwerte['einschwingzeit']:.0f} s, "
+          f"bleibende Abweichung {kennwerte['bleibende_regelabweichung']:.2f} K")
+
+    del leser, historie, daten, zeit, leistung, last
+    shutil.rmtree(ordner)
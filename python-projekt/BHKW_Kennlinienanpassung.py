@@ -0,0 +1,194 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from BHKW_Heizkennlinie import heizkurve
+from BHKW_Heizlast import vorlauf_aus_heizlast
+
+# Suchbereiche für Exponent und Norm-Raumtemperatur (°C)
+EXPONENT_BEREICH = (0.8, 2.0)
+NORM_BEREICH = (15.0, 25.0)
+# Gitterpunkte je Achse und Verfeinerungsrunden
+GITTERPUNKTE = 9
+RUNDEN = 8
+# Messwerte näher als TOLERANZ (K) an min/max gelten als begrenzt
+TOLERANZ = 0.05
+
+def _bewerte_gitter(
+    ta: np.ndarray,
+    vorlauf: np.ndarray,
+    frei: np.ndarray,
+    nacht: np.ndarray,
+    exponenten: np.ndarray,
+    normtemperaturen: np.ndarray,
+    min_vorlauftemp: float,
+    max_vorlauftemp: Optional[float],
+    nachtabsenkung_delta: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Für jede Kombination (Norm-Raumtemperatur, Exponent) sind Steilheit und
+    Fixpunkt linear: vorlauf = K * x + B mit x = (T_norm - T_außen)**exp.
+    K und B werden geschlossen per kleinster Quadrate aus den nicht
+    begrenzten Messwerten bestimmt, bewertet wird danach die Summe der
+    Fehlerquadrate der begrenzten Kurve über alle Messwerte.
+
+    Rückgabe:
+        (Fehlerquadratsumme, K, B) je Gitterpunkt als
+        Arrays (Norm-Raumtemperaturen, Exponenten).
+    """
+    # x = exp(exp * log(abstand)); der Logarithmus nur einmal je T_norm
+    abstand = np.maximum(normtemperaturen[:, None] - ta[None, :], 0.0)
+    with np.errstate(divide="ignore"):
+        log_abstand = np.log(abstand)
+    x = exponenten[None, :, None] * log_abstand[:, None, :]
+    np.exp(x, out=x)
+
+    # Nachtabsenkung zurückrechnen, damit die Basiskurve angepasst wird
+    y = vorlauf + nachtabsenkung_delta * nacht
+    xf, yf = x[:, :, frei], y[frei]
+    x_mittel = xf.mean(axis=2)
+    y_mittel = yf.mean()
+    kovarianz = xf @ yf / yf.size - x_mittel * y_mittel
+    varianz = np.einsum("ijk,ijk->ij", xf, xf) / yf.size - x_mittel * x_mittel
+    with np.errstate(divide="ignore", invalid="ignore"):
+        K = np.where(varianz > 1e-12, kovarianz / varianz, 0.0)
+    B = y_mittel - K * x_mittel
+
+    modell = x
+    modell *= K[:, :, None]
+    modell += B[:, :, None]
+    modell -= nachtabsenkung_delta * nacht
+    np.clip(modell, min_vorlauftemp, max_vorlauftemp, out=modell)
+    modell -= vorlauf
+    fehler = np.einsum("ijk,ijk->ij", modell, modell)
+    fehler[K < 0] = np.inf
+    return fehler, K, B
+
+def passe_heizkennlinie_an(
+    aussentemperatur,
+    vorlauftemperatur,
+    min_vorlauftemp: float,
+    max_vorlauftemp: Optional[float],
+    stunden=None,
+    nachtabsenkung_delta: float = 0.0,
+    exponent_bereich: Tuple[float, float] = EXPONENT_BEREICH,
+    norm_bereich: Tuple[float, float] = NORM_BEREICH,
+    gitterpunkte: int = GITTERPUNKTE,
+    runden: int = RUNDEN
+) -> dict:
+    """
+    Schätzt Steilheit, Fixpunkt, Exponent und Norm-Raumtemperatur der
+    Heizkennlinie aus historischen Außen- und Vorlauftemperaturen.
+
+    Exponent und Norm-Raumtemperatur werden auf einem Gitter gesucht, das in
+    jeder Runde um den besten Punkt herum verfeinert wird; Steilheit und
+    Fixpunkt folgen je Gitterpunkt geschlossen (alle Residuen vektorisiert).
+    Messwerte an min_vorlauftemp/max_vorlauftemp gelten als begrenzt und
+    gehen nur über die begrenzte Kurve in die Bewertung ein. Mit `stunden`
+    (0–23) wird die Nachtabsenkung von 22:00 bis 06:00 berücksichtigt.
+    NaN-Messwerte werden ignoriert.
+
+    Rückgabe:
+        dict mit kurve_steilheit, kurve_fixpunkt, kurve_exponent,
+        norm_raumtemperatur (wie in STANDARD_KENNLINIE), rmse (K) und
+        anzahl (verwendete Messwerte).
+    """
+    ta = np.asarray(aussentemperatur, dtype=np.float64)
+    vorlauf = np.asarray(vorlauftemperatur, dtype=np.float64)
+    if stunden is None:
+        nacht = np.zeros(ta.shape)
+    else:
+        stunden = np.broadcast_to(np.asarray(stunden), ta.shape)
+        nacht = ((stunden >= 22) | (stunden < 6)).astype(np.float64)
+
+    gueltig = ~(np.isnan(ta) | np.isnan(vorlauf))
+    ta, vorlauf, nacht = ta[gueltig], vorlauf[gueltig], nacht[gueltig]
+    frei = vorlauf > min_vorlauftemp + TOLERANZ
+    if max_vorlauftemp is not None:
+        frei &= vorlauf < max_vorlauftemp - TOLERANZ
+    if frei.sum() < 4:
+        raise ValueError("Zu wenige nicht begrenzte Messwerte für die Anpassung.")
+
+    e_min, e_max = exponent_bereich
+    n_min, n_max = norm_bereich
+    for _ in range(runden):
+        exponenten = np.linspace(e_min, e_max, gitterpunkte)
+        normtemperaturen = np.linspace(n_min, n_max, gitterpunkte)
+        fehler, K, B = _bewerte_gitter(
+            ta, vorlauf, frei, nacht, exponenten, normtemperaturen,
+            min_vorlauftemp, max_vorlauftemp, nachtabsenkung_delta
+        )
+        beste = np.unravel_index(np.argmin(fehler), fehler.shape)
+        exponent, norm = exponenten[beste[1]], normtemperaturen[beste[0]]
+
+        # Nächste Runde: ±2 Gitterschritte um den besten Punkt
+        e_schritt = 2 * (e_max - e_min) / (gitterpunkte - 1)
+        n_schritt = 2 * (n_max - n_min) / (gitterpunkte - 1)
+        e_min = max(exponent - e_schritt, exponent_bereich[0])
+        e_max = min(exponent + e_schritt, exponent_bereich[1])
+        n_min = max(norm - n_schritt, norm_bereich[0])
+        n_max = min(norm + n_schritt, norm_bereich[1])
+
+    return {
+        "kurve_steilheit": float(K[beste]),
+        "kurve_fixpunkt": float(B[beste]),
+        "kurve_exponent": float(exponent),
+        "norm_raumtemperatur": float(norm),
+        "rmse": float(np.sqrt(fehler[beste] / ta.size)),
+        "anzahl": int(ta.size),
+    }
+
+def _passe_an(datensatz: dict) -> dict:
+    return passe_heizkennlinie_an(**datensatz)
+
+def passe_gebaeude_an(datensaetze: List[dict], max_worker: Optional[int] = None) -> List[dict]:
+    """
+    Passt die Heizkennlinien vieler Gebäude parallel in Worker-Prozessen an
+    (je ein dict mit den Argumenten für passe_heizkennlinie_an).
+
+    Rückgabe:
+        Liste der Ergebnisse in Reihenfolge der Datensätze.
+    """
+    if len(datensaetze) <= 1:
+        return [_passe_an(datensatz) for datensatz in datensaetze]
+    max_worker = max_worker or min(len(datensaetze), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_worker) as pool:
+        return list(pool.map(_passe_an, datensaetze, chunksize=max(1, len(datensaetze) // (4 * max_worker))))
+
+
+if __name__ == "__main__":
+    import time
+
+    # Beispiel: 200 Gebäude mit je einem Jahr Stundenwerten und Messrauschen
+    rng = np.random.default_rng(0)
+    stunden = np.arange(8760) % 24
+    tage = np.arange(8760) / 24
+    datensaetze, wahr = [], []
+    for _ in range(200):
+        parameter = dict(
+            kurve_steilheit=rng.uniform(0.8, 2.0),
+            kurve_fixpunkt=rng.uniform(20.0, 30.0),
+            kurve_exponent=rng.uniform(1.0, 1.5),
+            norm_raumtemperatur=rng.uniform(18.0, 22.0),
+        )
+        ta = 8.0 - 10.0 * np.cos(2 * np.pi * tage / 365) + rng.normal(0, 3, tage.size)
+        vorlauf = heizkurve(ta, **parameter) - 5.0 * ((stunden >= 22) | (stunden < 6))
+        vorlauf = np.clip(vorlauf + rng.normal(0, 0.5, ta.size), 15.0, 85.0)
+        wahr.append(parameter)
+        datensaetze.append(dict(
+            aussentemperatur=ta, vorlauftemperatur=vorlauf, min_vorlauftemp=15.0,
+            max_vorlauftemp=85.0, stunden=stunden, nachtabsenkung_delta=5.0,
+        ))
+
+    start = time.perf_counter()
+    ergebnisse = passe_gebaeude_an(datensaetze)
+    print(f"{len(ergebnisse)} Gebäude in {time.perf_counter() - start:.1f} s angepasst")
+    for parameter, ergebnis in list(zip(wahr, ergebnisse))[:5]:
+        print(
+            f"K {parameter['kurve_steilheit']:.2f}→{ergebnis['kurve_steilheit']:.2f}  "
+            f"B {parameter['kurve_fixpunkt']:.1f}→{ergebnis['kurve_fixpunkt']:.1f}  "
+            f"exp {parameter['kurve_exponent']:.2f}→{ergebnis['kurve_exponent']:.2f}  "
+            f"T_norm {parameter['norm_raumtemperatur']:.1f}→{ergebnis['norm_raumtemperatur']:.1f}  "
+            f"RMSE {ergebnis['rmse']:.2f} K"
+        )
@@ -0,0 +1,225 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+# Nur Standardbibliothek auf Modulebene: jeder Unterbefehl lädt erst beim
+# Aufruf die Module, die er braucht (NumPy, aber kein matplotlib/pandas,
+# sofern nicht geplottet oder eine CSV gelesen wird). Für minütliche
+# Cron-Aufrufe ist der Import sonst teurer als die eigentliche Berechnung.
+
+def _ja_nein(text: str) -> bool:
+    wert = text.strip().lower()
+    if wert in ("1", "ja", "j", "true", "an", "on"):
+        return True
+    if wert in ("0", "nein", "n", "false", "aus", "off"):
+        return False
+    raise argparse.ArgumentTypeError(f"Erwartet ja/nein, erhalten: {text!r}")
+
+def _zeitpunkt(text: str) -> datetime:
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError as fehler:
+        raise argparse.ArgumentTypeError(str(fehler)) from None
+
+# ---------- Unterbefehle ----------
+def _heizkennlinie(args: argparse.Namespace) -> int:
+    from BHKW_Berechnung_SW_VT import STANDARD_KENNLINIE, berechnung_heizkennlinie
+
+    kennlinie = {
+        name: wert if getattr(args, name) is None else getattr(args, name)
+        for name, wert in STANDARD_KENNLINIE.items()
+    }
+    if args.ohne_max:
+        kennlinie["max_vorlauftemp"] = None
+    messwert_raum = kennlinie["sollwert_raumtemperatur"] if args.raumtemperatur is None else args.raumtemperatur
+
+    vorlauf = berechnung_heizkennlinie(
+        args.aussentemperatur, messwert_raum, **kennlinie,
+        current_hour=args.stunde, max_fehler=args.max_fehler
+    )
+    print(f"{vorlauf:.2f}")
+    if args.plot is not None:
+        from BHKW_Berechnung_SW_VT import plot_heizkennlinie
+
+        plot_heizkennlinie(
+            kennlinie["kurve_steilheit"], kennlinie["kurve_fixpunkt"], kennlinie["kurve_exponent"],
+            kennlinie["min_vorlauftemp"], kennlinie["max_vorlauftemp"], kennlinie["norm_raumtemperatur"],
+            datei=args.plot or None
+        )
+    return 0
+
+def _waermeleistung(args: argparse.Namespace) -> int:
+    from BHKW_Waermeleistung import berechnung_waermeleistung
+
+    try:
+        leistung = berechnung_waermeleistung(
+            args.vorlauftemperatur, args.ruecklauftemperatur, args.volumenstrom, args.dichte, args.cp
+        )
+    except ValueError as fehler:
+        print(f"Fehler: {fehler}", file=sys.stderr)
+        return 1
+    print(f"{leistung:.3f}")
+    return 0
+
+def _vorlauf(args: argparse.Namespace) -> int:
+    from BHKW_Heizlast import vorlauf_aus_heizlast
+
+    for Q, T_vl in zip(args.heizlast, vorlauf_aus_heizlast(args.heizlast, args.volumenstrom, args.ruecklauftemperatur)):
+        print(f"{Q:.0f} W → {T_vl:.2f} °C")
+    return 0
+
+def _heizlast(args: argparse.Namespace) -> int:
+    from BHKW_Heizlast import HeizlastNachfuehrung, berechne_heizlast_und_vorlauftemperatur
+
+    if args.folgen:
+        # Nur seit dem letzten Aufruf angehängte Zeilen; Ausgabedatei wird fortgeschrieben
+        nachfuehrung = HeizlastNachfuehrung(
+            args.csv, args.ua, args.raumtemperatur, args.volumenstrom, args.ruecklauftemperatur
+        )
+        nachfuehrung.laden(args.folgen)
+        df = nachfuehrung.aktualisieren()
+        if args.ausgabe:
+            df.to_csv(args.ausgabe, sep=";", mode="a", header=not os.path.exists(args.ausgabe))
+        else:
+            df.to_csv(sys.stdout, sep=";", float_format="%.2f")
+        nachfuehrung.speichern(args.folgen)
+        return 0
+
+    optionen = {} if args.cache is None else {"cache_verzeichnis": args.cache or None}
+    df = berechne_heizlast_und_vorlauftemperatur(
+        args.csv, args.ua, args.raumtemperatur, args.volumenstrom, args.ruecklauftemperatur, **optionen
+    )
+    if args.ausgabe:
+        df.to_csv(args.ausgabe, sep=";")
+        print(args.ausgabe)
+    else:
+        df.to_csv(sys.stdout, sep=";", float_format="%.2f")
+    return 0
+
+def _fahrplan(args: argparse.Namespace) -> int:
+    from BHKW_Fahrplan import fahrplan_aus_prognose, speicherkapazitaet
+
+    kapazitaet = speicherkapazitaet(args.speichervolumen, args.spreizung)
+    df = fahrplan_aus_prognose(
+        args.csv, args.ua, args.raumtemperatur, args.leistung * 1000.0, kapazitaet,
+        args.speicherstand / 100.0 * kapazitaet, jetzt=args.zeitpunkt, horizont=args.horizont,
+        Stoerung=args.stoerung, Schalter=args.schalter, Wartungsmeldung=args.wartung,
+        Thermische_Desinfektion=args.desinfektion, laeuft=args.laeuft
+    )
+    for zeit, zeile in df.iterrows():
+        print(f"{zeit:%Y-%m-%d %H:%M} {'AN ' if zeile['an'] else 'AUS'} "
+              f"Speicher {zeile['speicher'] / kapazitaet * 100:5.1f} %  Bedarf {zeile['Q_heiz'] / 1000:5.2f} kW")
+    return 0
+
+def _status(args: argparse.Namespace) -> int:
+    from BHKW_Entscheidung import STATUSTEXTE, statuscode
+
+    code = statuscode(args.stoerung, args.schalter, args.wartung, args.desinfektion, args.zeitpunkt)
+    print(f"{int(code)} {code.name}: {STATUSTEXTE[code]}")
+    return 0
+
+def _regelventil(args: argparse.Namespace) -> int:
+    import BHKW_Regelventil as rv
+
+    werte = {name: getattr(args, name) for name in ("Kp", "Ki", "Kd") if getattr(args, name) is not None}
+    ergebnis = rv.simuliere_regelventil(rv.regler_parameter(**werte), rv.sollwertprofil(args.schritte))[0]
+    temps = ergebnis["T_ist"]
+    for start in (0, 200):
+        if start >= args.schritte:
+            break
+        index = rv.berechne_einschwingzeit(temps, start, ergebnis["T_soll"][start])
+        text = "nicht eingeschwungen" if index is None else f"{index - start} s"
+        print(f"Sollwert {ergebnis['T_soll'][start]:.1f} °C ab {start} s: {text}")
+    print(f"Letzte Ventilöffnung: {ergebnis['stellwert'][-1]:.1f} %")
+    return 0
+
+def parser_erstellen() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bhkw", description="Berechnungen der BHKW-Steuerung")
+    befehle = parser.add_subparsers(dest="befehl", required=True)
+
+    p = befehle.add_parser("heizkennlinie", help="Soll-Vorlauftemperatur aus der Heizkennlinie")
+    p.add_argument("aussentemperatur", type=float)
+    p.add_argument("--raumtemperatur", type=float, help="Messwert (Standard: Sollwert)")
+    p.add_argument("--sollwert", dest="sollwert_raumtemperatur", type=float)
+    p.add_argument("--steilheit", dest="kurve_steilheit", type=float)
+    p.add_argument("--fixpunkt", dest="kurve_fixpunkt", type=float)
+    p.add_argument("--exponent", dest="kurve_exponent", type=float)
+    p.add_argument("--min", dest="min_vorlauftemp", type=float)
+    p.add_argument("--max", dest="max_vorlauftemp", type=float)
+    p.add_argument("--ohne-max", action="store_true", help="kein oberes Limit")
+    p.add_argument("--nachtabsenkung", dest="nachtabsenkung_delta", type=float)
+    p.add_argument("--raumkompensation", dest="raumtemp_komp_freigabe", type=_ja_nein)
+    p.add_argument("--norm", dest="norm_raumtemperatur", type=float)
+    p.add_argument("--kompensation-prozent", dest="raumtemp_komp_prozent", type=float)
+    p.add_argument("--stunde", type=int, help="Stunde 0–23 (Standard: aktuelle Uhrzeit)")
+    p.add_argument("--max-fehler", type=float, help="Tabelle mit diesem Fehler (K) statt **")
+    p.add_argument("--plot", nargs="?", const="", help="Kennlinie plotten (optional in Datei)")
+    p.set_defaults(funktion=_heizkennlinie)
+
+    p = befehle.add_parser("waermeleistung", help="Wärmeleistung (kW) eines Heizkreises")
+    p.add_argument("vorlauftemperatur", type=float)
+    p.add_argument("ruecklauftemperatur", type=float)
+    p.add_argument("volumenstrom", type=float, help="m³/h")
+    p.add_argument("--dichte", type=float, default=1000.0)
+    p.add_argument("--cp", type=float, default=4184.0)
+    p.set_defaults(funktion=_waermeleistung)
+
+    p = befehle.add_parser("vorlauf", help="Vorlauftemperatur aus Heizlast (W)")
+    p.add_argument("heizlast", type=float, nargs="+")
+    p.add_argument("--volumenstrom", type=float, default=0.5, help="m³/h")
+    p.add_argument("--ruecklauftemperatur", type=float, default=30.0)
+    p.set_defaults(funktion=_vorlauf)
+
+    p = befehle.add_parser("heizlast", help="Heizlast und Vorlauftemperatur aus einer Wetter-CSV")
+    p.add_argument("csv")
+    p.add_argument("--ua", type=float, default=300.0, help="W/K")
+    p.add_argument("--raumtemperatur", type=float, default=20.0)
+    p.add_argument("--volumenstrom", type=float, default=0.5, help="m³/h")
+    p.add_argument("--ruecklauftemperatur", type=float, default=30.0)
+    p.add_argument("--cache", help="Cache-Verzeichnis ('' = aus, Standard: BHKW_CACHE_DIR)")
+    p.add_argument("--ausgabe", help="Ergebnis-CSV (Standard: stdout)")
+    p.add_argument("--folgen", metavar="ZUSTAND", help="inkrementell: nur neue Zeilen, Lesestand in dieser JSON-Datei")
+    p.set_defaults(funktion=_heizlast)
+
+    p = befehle.add_parser("fahrplan", help="AN/AUS-Fahrplan aus einer Temperaturprognose (CSV)")
+    p.add_argument("csv")
+    p.add_argument("--ua", type=float, default=300.0, help="W/K")
+    p.add_argument("--raumtemperatur", type=float, default=20.0)
+    p.add_argument("--leistung", type=float, default=12.0, help="thermische Leistung des BHKW in kW")
+    p.add_argument("--speichervolumen", type=float, default=1.0, help="m³")
+    p.add_argument("--spreizung", type=float, default=20.0, help="nutzbare Temperaturspreizung des Speichers in K")
+    p.add_argument("--speicherstand", type=float, default=50.0, help="aktueller Speicherinhalt in %%")
+    p.add_argument("--horizont", type=int, default=48, help="Stunden")
+    p.add_argument("--laeuft", type=_ja_nein, default=False, help="BHKW läuft bereits")
+    p.add_argument("--stoerung", type=_ja_nein, default=False)
+    p.add_argument("--schalter", type=_ja_nein, default=True)
+    p.add_argument("--wartung", type=_ja_nein, default=False)
+    p.add_argument("--desinfektion", type=_ja_nein, default=False)
+    p.add_argument("--zeitpunkt", type=_zeitpunkt, help="ISO-Zeitpunkt (Standard: jetzt)")
+    p.set_defaults(funktion=_fahrplan)
+
+    p = befehle.add_parser("status", help="Schaltentscheidung des BHKW")
+    p.add_argument("--stoerung", type=_ja_nein, default=False)
+    p.add_argument("--schalter", type=_ja_nein, default=True)
+    p.add_argument("--wartung", type=_ja_nein, default=False)
+    p.add_argument("--desinfektion", type=_ja_nein, default=False)
+    p.add_argument("--zeitpunkt", type=_zeitpunkt, help="ISO-Zeitpunkt (Standard: jetzt)")
+    p.set_defaults(funktion=_status)
+
+    p = befehle.add_parser("regelventil", help="PID-Mischventil auf dem Sollwertprofil simulieren")
+    p.add_argument("--Kp", type=float)
+    p.add_argument("--Ki", type=float)
+    p.add_argument("--Kd", type=float)
+    p.add_argument("--schritte", type=int, default=400)
+    p.set_defaults(funktion=_regelventil)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parser_erstellen().parse_args(argv)
+    return args.funktion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# Obergrenzen der Latenz-Buckets in Sekunden (wie Prometheus-Histogramme, kumulativ)
+BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+PRAEFIX = "bhkw_stufe"
+
+# Ausgeschaltet kostet ein instrumentierter Aufruf nur die Weiterleitung und
+# eine Abfrage dieses Flags (Größenordnung 0,3 µs)
+_aktiv = os.environ.get("BHKW_METRIKEN", "") not in ("", "0")
+
+class Stufenstatistik:
+    """Aufrufe, Fehler und Latenz-Histogramm einer Stufe (Zeiten in ns)."""
+
+    __slots__ = ("aufrufe", "fehler", "summe_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.zuruecksetzen()
+
+    def zuruecksetzen(self) -> None:
+        self.aufrufe = 0
+        self.fehler = 0
+        self.summe_ns = 0
+        self.max_ns = 0
+        # Ein Zähler je Bucket plus einer für "über dem größten Bucket"
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def erfassen(self, dauer_ns: int, fehler: bool = False) -> None:
+        self.aufrufe += 1
+        self.fehler += fehler
+        self.summe_ns += dauer_ns
+        if dauer_ns > self.max_ns:
+            self.max_ns = dauer_ns
+        self.buckets[bisect_left(_BUCKETS_NS, dauer_ns)] += 1
+
+    def als_dict(self) -> dict:
+        kumulativ, summe = {}, 0
+        for grenze, anzahl in zip(BUCKETS, self.buckets):
+            summe += anzahl
+            kumulativ[str(grenze)] = summe
+        kumulativ["+Inf"] = self.aufrufe
+        return {
+            "aufrufe": self.aufrufe,
+            "fehler": self.fehler,
+            "summe_s": self.summe_ns / 1e9,
+            "mittel_s": self.summe_ns / 1e9 / self.aufrufe if self.aufrufe else 0.0,
+            "max_s": self.max_ns / 1e9,
+            "buckets": kumulativ,
+        }
+
+_BUCKETS_NS = [round(grenze * 1e9) for grenze in BUCKETS]
+_statistiken: Dict[str, Stufenstatistik] = {}
+
+def aktivieren() -> None:
+    """Schaltet die Erfassung ein (alternativ Umgebungsvariable BHKW_METRIKEN=1)."""
+    global _aktiv
+    _aktiv = True
+
+def deaktivieren() -> None:
+    global _aktiv
+    _aktiv = False
+
+def ist_aktiv() -> bool:
+    return _aktiv
+
+def zuruecksetzen() -> None:
+    """Verwirft alle bisher erfassten Werte."""
+    for eintrag in _statistiken.values():
+        eintrag.zuruecksetzen()
+
+def statistik(stufe: str) -> Stufenstatistik:
+    """Statistik einer Stufe (wird bei Bedarf angelegt)."""
+    eintrag = _statistiken.get(stufe)
+    if eintrag is None:
+        eintrag = _statistiken[stufe] = Stufenstatistik()
+    return eintrag
+
+def instrumentiert(stufe: str) -> Callable:
+    """
+    Dekorator: erfasst Aufrufe, Latenz und Ausnahmen der Funktion unter dem
+    Namen `stufe`, solange die Erfassung aktiv ist. Ausnahmen werden
+    gezählt und unverändert weitergereicht.
+    """
+    def dekorator(funktion: Callable) -> Callable:
+        erfassen = statistik(stufe).erfassen
+        uhr = time.perf_counter_ns
+
+        @functools.wraps(funktion)
+        def wrapper(*args, **kwargs):
+            if not _aktiv:
+                return funktion(*args, **kwargs)
+            start = uhr()
+            try:
+                ergebnis = funktion(*args, **kwargs)
+            except Exception:
+                erfassen(uhr() - start, True)
+                raise
+            erfassen(uhr() - start)
+            return ergebnis
+        return wrapper
+    return dekorator
+
+@contextmanager
+def messen(stufe: str):
+    """Wie instrumentiert, aber für einen Codeblock: `with messen("zyklus"): ...`."""
+    if not _aktiv:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    except Exception:
+        statistik(stufe).erfassen(time.perf_counter_ns() - start, True)
+        raise
+    statistik(stufe).erfassen(time.perf_counter_ns() - start)
+
+# ---------- Export ----------
+def als_json() -> dict:
+    """Alle Stufen als dict (Zeiten in Sekunden, Buckets kumulativ)."""
+    return {stufe: eintrag.als_dict() for stufe, eintrag in sorted(_statistiken.items())}
+
+def als_prometheus(praefix: str = PRAEFIX) -> str:
+    """Alle Stufen im Prometheus-Textformat (Zähler und Histogramm je Stufe)."""
+    zeilen = [
+        f"# HELP {praefix}_aufrufe_total Anzahl der Aufrufe je Stufe.",
+        f"# TYPE {praefix}_aufrufe_total counter",
+    ]
+    daten = als_json()
+    zeilen += [f'{praefix}_aufrufe_total{{stufe="{s}"}} {d["aufrufe"]}' for s, d in daten.items()]
+    zeilen += [
+        f"# HELP {praefix}_fehler_total Anzahl der Aufrufe mit Ausnahme je Stufe.",
+        f"# TYPE {praefix}_fehler_total counter",
+    ]
+    zeilen += [f'{praefix}_fehler_total{{stufe="{s}"}} {d["fehler"]}' for s, d in daten.items()]
+    zeilen += [
+        f"# HELP {praefix}_dauer_sekunden Laufzeit je Aufruf.",
+        f"# TYPE {praefix}_dauer_sekunden histogram",
+    ]
+    for s, d in daten.items():
+        for grenze, anzahl in d["buckets"].items():
+            zeilen.append(f'{praefix}_dauer_sekunden_bucket{{stufe="{s}",le="{grenze}"}} {anzahl}')
+        zeilen.append(f'{praefix}_dauer_sekunden_sum{{stufe="{s}"}} {d["summe_s"]:.9f}')
+        zeilen.append(f'{praefix}_dauer_sekunden_count{{stufe="{s}"}} {d["aufrufe"]}')
+    return "\n".join(zeilen) + "\n"
+
+def _atomar_schreiben(pfad: str, inhalt: str) -> str:
+    # Erst vollständig schreiben, dann umbenennen: Leser sehen nie eine halbe Datei
+    temporaer = f"{pfad}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporaer, "w", encoding="utf-8") as datei:
+        datei.write(inhalt)
+    os.replace(temporaer, pfad)
+    return pfad
+
+def schreibe_prometheus(pfad: str, praefix: str = PRAEFIX) -> str:
+    """Schreibt die Metriken als .prom-Datei (z.B. für den textfile-Collector des node_exporter)."""
+    return _atomar_schreiben(pfad, als_prometheus(praefix))
+
+def schreibe_json(pfad: str) -> str:
+    return _atomar_schreiben(pfad, json.dumps(als_json(), indent=2))
+
+
+if __name__ == "__main__":
+    import tempfile
+    from datetime import datetime
+
+    # Als Skript gestartet ist dieses Modul __main__; die Kette nutzt das importierte Modul
+    import BHKW_Metriken as metriken
+
+    from BHKW_Berechnung_SW_VT import berechnung_heizkennlinie
+    from BHKW_Entscheidung import statuscode
+    from BHKW_Gleitender_Mittelwert import GleitenderMittelwert
+    from BHKW_Regelventil import pid_schritt, regler_parameter, regler_zustand
+    from BHKW_Waermeleistung import berechnung_waermeleistung
+
+    def regelkette(zyklen: int) -> float:
+        """Ein vereinfachter Regelzyklus über alle Stufen; Rückgabe: Sekunden."""
+        mittelwert = GleitenderMittelwert(teilfenster=True)
+        parameter, zustand = regler_parameter(), regler_zustand()
+        start = time.perf_counter()
+        for i in range(zyklen):
+            statuscode(False, True, False, False, datetime(2024, 1, 15, i % 24))
+            mittelwert.hinzufuegen(5.0 + i % 7)
+            T_soll = berechnung_heizkennlinie(
+                5.0, 21.0, 22.0, 1.5, 25.0, 1.2, 15.0, 85.0, 5.0, False, 20.0, 10.0, current_hour=i % 24
+            )
+            pid_schritt(parameter, zustand, T_soll)
+            try:
+                berechnung_waermeleistung(40.0 + i % 30, 45.0, 2.5)
+            except ValueError:
+                pass
+        return time.perf_counter() - start
+
+    metriken.deaktivieren()
+    aus = regelkette(20_000)
+    metriken.aktivieren()
+    an = regelkette(20_000)
+    print(f"Regelkette: aus {aus / 20_000 * 1e6:.1f} µs/Zyklus, an {an / 20_000 * 1e6:.1f} µs/Zyklus")
+
+    ordner = tempfile.mkdtemp(prefix="bhkw_metriken_")
+    print(metriken.schreibe_json(os.path.join(ordner, "metriken.json")))
+    print(metriken.schreibe_prometheus(os.path.join(ordner, "bhkw.prom")))
+    for stufe, werte in metriken.als_json().items():
+        print(f"{stufe:>15}: {werte['aufrufe']} Aufrufe, {werte['fehler']} Fehler, "
+              f"Ø {werte['mittel_s'] * 1e6:.1f} µs, max {werte['max_s'] * 1e6:.1f} µs")
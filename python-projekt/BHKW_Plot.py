@@ -0,0 +1,169 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Zielbreite in Pixeln; pro Pixelspalte genügen Minimum und Maximum
+BREITE_PX = 1600
+
+def dezimiere_minmax(x, y, breite_px: int = BREITE_PX) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduziert eine Zeitreihe auf Minimum und Maximum je Pixelspalte.
+
+    Spitzen und Einbrüche bleiben sichtbar, weil je Spalte genau die
+    Extremwerte (in zeitlicher Reihenfolge) erhalten bleiben. NaN-Werte
+    werden ignoriert. Kürzere Reihen werden unverändert zurückgegeben.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    if n <= 2 * breite_px:
+        return x, y
+
+    k = -(-n // breite_px)
+    spalten = -(-n // k)
+    gepolstert = np.full(spalten * k, np.nan)
+    gepolstert[:n] = y
+    gepolstert = gepolstert.reshape(spalten, k)
+    leer = np.isnan(gepolstert)
+
+    basis = np.arange(spalten) * k
+    i_min = basis + np.argmin(np.where(leer, np.inf, gepolstert), axis=1)
+    i_max = basis + np.argmax(np.where(leer, -np.inf, gepolstert), axis=1)
+    index = np.sort(np.stack([i_min, i_max], axis=1), axis=1).ravel()
+    index = index[np.concatenate([[True], index[1:] != index[:-1]]) & (index < n)]
+    return x[index], y[index]
+
+def dezimiere_lttb(x, y, anzahl: int = BREITE_PX) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets: wählt `anzahl` Punkte, die den
+    Kurvenverlauf optisch am besten erhalten. Erster und letzter Punkt
+    bleiben immer erhalten. Die Reihe darf keine NaN enthalten.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    if anzahl >= n or anzahl < 3:
+        return x, y
+
+    if np.issubdtype(x.dtype, np.datetime64):
+        xf = x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    else:
+        xf = x.astype(np.float64)
+    grenzen = np.linspace(1, n - 1, anzahl - 1).astype(np.int64)
+    index = np.empty(anzahl, dtype=np.int64)
+    index[0], index[-1] = 0, n - 1
+
+    a = 0
+    for b in range(anzahl - 2):
+        anfang, ende = grenzen[b], grenzen[b + 1]
+        # Mittelpunkt des folgenden Buckets als dritter Dreieckspunkt
+        n_anfang = ende
+        n_ende = grenzen[b + 2] if b + 2 < anzahl - 1 else n
+        cx = xf[n_anfang:n_ende].mean()
+        cy = y[n_anfang:n_ende].mean()
+        flaeche = np.abs(
+            (xf[a] - cx) * (y[anfang:ende] - y[a])
+            - (xf[a] - xf[anfang:ende]) * (cy - y[a])
+        )
+        a = anfang + int(np.argmax(flaeche))
+        index[b + 1] = a
+    return x[index], y[index]
+
+def dezimiere(x, y, breite_px: int = BREITE_PX, verfahren: str = "minmax") -> Tuple[np.ndarray, np.ndarray]:
+    """Dezimiert mit "minmax" (Standard) oder "lttb" auf Bildschirmauflösung."""
+    if verfahren == "minmax":
+        return dezimiere_minmax(x, y, breite_px)
+    if verfahren == "lttb":
+        return dezimiere_lttb(x, y, 2 * breite_px)
+    raise ValueError(f"Unbekanntes Dezimierungsverfahren: {verfahren!r}")
+
+def rendere_zeitreihen(
+    datei: str,
+    x,
+    serien: Dict[str, Sequence[float]],
+    titel: str = "",
+    xlabel: str = "Zeit",
+    ylabel: str = "",
+    serien_rechts: Optional[Dict[str, Sequence[float]]] = None,
+    ylabel_rechts: str = "",
+    breite_px: int = BREITE_PX,
+    hoehe_px: int = 500,
+    verfahren: str = "minmax"
+) -> str:
+    """
+    Zeichnet eine oder mehrere Zeitreihen über derselben x-Achse in eine
+    Datei (Format aus der Endung, z.B. .png oder .svg).
+
+    Jede Reihe wird vorher auf die Bildbreite dezimiert. Gezeichnet wird
+    ohne pyplot und ohne Display (Agg-Canvas), daher auch in
+    Worker-Prozessen und auf Servern nutzbar. serien_rechts landen auf
+    einer zweiten y-Achse.
+
+    Rückgabe:
+        Pfad der geschriebenen Datei.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    dpi = 100
+    fig = Figure(figsize=(breite_px / dpi, hoehe_px / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    linien = []
+    for name, y in serien.items():
+        linien += ax.plot(*dezimiere(x, y, breite_px, verfahren), label=name)
+    if serien_rechts:
+        ax2 = ax.twinx()
+        farben = iter(["tab:green", "tab:red", "tab:purple", "tab:brown"])
+        for name, y in serien_rechts.items():
+            linien += ax2.plot(*dezimiere(x, y, breite_px, verfahren), label=name, color=next(farben, None))
+        ax2.set_ylabel(ylabel_rechts)
+
+    ax.set_title(titel)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+    ax.legend(linien, [linie.get_label() for linie in linien], loc="upper left")
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(datei)
+    return datei
+
+def _rendere_auftrag(auftrag: dict) -> str:
+    return rendere_zeitreihen(**auftrag)
+
+def rendere_berichte_parallel(auftraege: List[dict], max_worker: Optional[int] = None) -> List[str]:
+    """
+    Rendert viele Berichte (je ein dict mit den Argumenten für
+    rendere_zeitreihen) parallel in Worker-Prozessen.
+
+    Rückgabe:
+        Liste der geschriebenen Dateien in Auftragsreihenfolge.
+    """
+    if len(auftraege) <= 1:
+        return [_rendere_auftrag(auftrag) for auftrag in auftraege]
+    max_worker = max_worker or min(len(auftraege), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_worker) as pool:
+        return list(pool.map(_rendere_auftrag, auftraege))
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    # Beispiel: ein Jahr Ventilstellung in Sekundenauflösung für 4 Anlagen
+    zeiten = np.arange("2024-01-01", "2025-01-01", dtype="datetime64[s]")
+    rng = np.random.default_rng(0)
+    ordner = tempfile.mkdtemp(prefix="bhkw_plots_")
+    auftraege = []
+    for anlage in range(4):
+        ventil = np.clip(50 + np.cumsum(rng.normal(0, 0.05, zeiten.size)), 0, 100)
+        auftraege.append(dict(
+            datei=os.path.join(ordner, f"anlage_{anlage}.png"),
+            x=zeiten,
+            serien={"Ventilöffnung": ventil},
+            titel=f"Anlage {anlage}: Ventilöffnung",
+            ylabel="Ventilöffnung [%]",
+        ))
+    for datei in rendere_berichte_parallel(auftraege):
+        print(datei)
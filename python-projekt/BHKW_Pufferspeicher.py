@@ -0,0 +1,265 @@
+import numpy as np
+from typing import Optional
+
+# Wasser
+CP = 4180.0   # J/(kg·K)
+RHO = 1000.0  # kg/m³
+
+# Gleich hohe Schichten, Schicht 0 oben
+SCHICHTEN = 10
+
+# Speicher mit angeschlossenem BHKW (Ladekreis) und Heizkreis (Entladung)
+SPEICHER_DTYPE = np.dtype([
+    ("volumen", np.float64),      # m³
+    ("UA_verlust", np.float64),   # W/K, Wärmeverlust des ganzen Speichers
+    ("k_mischung", np.float64),   # W/K zwischen benachbarten Schichten (Leitung, Vermischung)
+    ("T_umgebung", np.float64),   # °C
+    ("P_th", np.float64),         # W, thermische Leistung des BHKW
+    ("V_lade", np.float64),       # m³/h, Volumenstrom BHKW-Ladekreis
+    ("V_kreis", np.float64),      # m³/h, Volumenstrom Heizkreis
+    ("T_ein", np.float64),        # °C oben: darunter startet das BHKW (ohne Fahrplan)
+    ("T_aus", np.float64),        # °C unten: darüber stoppt das BHKW (Speicher voll)
+])
+
+STANDARD_SPEICHER = dict(
+    volumen=1.0,
+    UA_verlust=3.0,
+    k_mischung=10.0,
+    T_umgebung=15.0,
+    P_th=12_000.0,
+    V_lade=0.5,
+    V_kreis=0.5,
+    T_ein=55.0,
+    T_aus=60.0,
+)
+
+# Je Speicher und Zeitschritt; Leistungen in W, gemittelt über den Schritt
+SPEICHER_ERGEBNIS_DTYPE = np.dtype([
+    ("an", np.bool_),
+    ("T_oben", np.float64),          # Entnahme für den Heizkreis (Kesselseite des Mischventils)
+    ("T_unten", np.float64),         # Rücklauf zum BHKW
+    ("T_bhkw_vorlauf", np.float64),  # Vorlauf vom BHKW in den Speicher
+    ("T_ruecklauf", np.float64),     # tatsächlicher Rücklauf aus dem Heizkreis
+    ("Q_bhkw", np.float64),
+    ("Q_geliefert", np.float64),
+    ("Q_ungedeckt", np.float64),
+])
+
+def speicher(anzahl: int = 1, **werte) -> np.ndarray:
+    """
+    Erzeugt `anzahl` Speicherkonfigurationen (SPEICHER_DTYPE), vorbelegt
+    mit STANDARD_SPEICHER; Felder als Skalar oder Array der Länge `anzahl`.
+    """
+    parameter = np.empty(anzahl, dtype=SPEICHER_DTYPE)
+    for name in SPEICHER_DTYPE.names:
+        parameter[name] = werte.pop(name, STANDARD_SPEICHER[name])
+    if werte:
+        raise ValueError(f"Unbekannte Speicherparameter: {', '.join(sorted(werte))}")
+    return parameter
+
+def speicher_zustand(anzahl: int = 1, schichten: int = SCHICHTEN, T_start=45.0, laeuft=False) -> np.ndarray:
+    """Anfangszustand: Schichttemperaturen (oben → unten) und ob das BHKW läuft."""
+    zustand = np.empty(anzahl, dtype=[("T", np.float64, (schichten,)), ("laeuft", np.bool_)])
+    zustand["T"] = np.broadcast_to(np.asarray(T_start, dtype=np.float64)[..., None], (anzahl, schichten)) \
+        if np.ndim(T_start) < 2 else T_start
+    zustand["laeuft"] = laeuft
+    return zustand
+
+def speicher_schritt(p: dict, T: np.ndarray, an, Q_bedarf, T_vorlauf, dt: float) -> tuple:
+    """
+    Ein expliziter Schritt für alle Speicher (Zeilen) und Schichten (Spalten) zugleich.
+
+    Ladung: das BHKW entnimmt unten und speist oben mit P_th ein.
+    Entladung: das Mischventil entnimmt oben so viel, dass der Heizkreis
+    mit T_vorlauf den Bedarf deckt; der Rücklauf des Heizkreises
+    (T_vorlauf - Q/(ṁ·cp)) geht unten zurück. Zwischen den Schichten:
+    Aufwind-Transport des Nettomassenstroms, Mischleitwert, Verluste; am
+    Ende schichten sich Temperaturinversionen per Sortierung um
+    (Auftrieb, energieerhaltend bei gleichen Schichtmassen).
+
+    :param p: Felder von SPEICHER_DTYPE als Arrays (N,), dazu "masse" je Schicht (kg).
+    :param T: Schichttemperaturen (N, L), werden nicht verändert.
+    :return: (T_neu, Ergebniswerte des Schritts als dict)
+    """
+    T_oben, T_unten = T[:, 0], T[:, -1]
+
+    # BHKW-Ladekreis
+    m_lade = np.where(an, p["V_lade"] * RHO / 3600.0, 0.0)
+    Q_bhkw = np.where(an, p["P_th"], 0.0)
+    T_bhkw = T_unten + np.divide(Q_bhkw, m_lade * CP, out=np.zeros_like(Q_bhkw), where=m_lade > 0)
+
+    # Heizkreis: Rücklauf aus dem Bedarf, Entnahme oben über das Mischventil
+    m_kreis = p["V_kreis"] * RHO / 3600.0
+    T_ruecklauf = T_vorlauf - Q_bedarf / (m_kreis * CP)
+    spreizung = T_oben - T_ruecklauf
+    # Reicht die Speichertemperatur nicht, ist das Ventil ganz offen (ṁ = ṁ_Kreis)
+    m_entnahme = np.where(
+        T_oben >= T_vorlauf,
+        np.divide(Q_bedarf, spreizung * CP, out=np.zeros_like(spreizung), where=spreizung > 0),
+        np.where(spreizung > 0, m_kreis, 0.0),
+    )
+    Q_geliefert = m_entnahme * CP * np.maximum(spreizung, 0.0)
+
+    # Energiebilanz je Schicht (W)
+    m_netto = m_lade - m_entnahme
+    abwaerts, aufwaerts = np.maximum(m_netto, 0.0)[:, None], np.maximum(-m_netto, 0.0)[:, None]
+    leistung = np.zeros_like(T)
+    leistung[:, 1:] += abwaerts * CP * (T[:, :-1] - T[:, 1:])
+    leistung[:, :-1] += aufwaerts * CP * (T[:, 1:] - T[:, :-1])
+    leistung[:, 0] += m_lade * CP * (T_bhkw - T_oben)
+    leistung[:, -1] += m_entnahme * CP * (T_ruecklauf - T_unten)
+    mischung = p["k_mischung"][:, None] * (T[:, :-1] - T[:, 1:])
+    leistung[:, :-1] -= mischung
+    leistung[:, 1:] += mischung
+    leistung -= (p["UA_verlust"] / T.shape[1])[:, None] * (T - p["T_umgebung"][:, None])
+
+    T_neu = T + leistung * (dt / (p["masse"] * CP))[:, None]
+    T_neu = -np.sort(-T_neu, axis=1)
+    werte = {
+        "T_bhkw_vorlauf": np.where(an, T_bhkw, np.nan),
+        "T_ruecklauf": T_ruecklauf,
+        "Q_bhkw": Q_bhkw,
+        "Q_geliefert": Q_geliefert,
+        "Q_ungedeckt": np.maximum(Q_bedarf - Q_geliefert, 0.0),
+    }
+    return T_neu, werte
+
+def simuliere_pufferspeicher(
+    parameter,
+    Q_bedarf,
+    T_vorlauf,
+    an=None,
+    zustand: Optional[np.ndarray] = None,
+    dt: float = 60.0,
+    schichtwerte: bool = False
+):
+    """
+    Simuliert N Schichtenspeicher gleichzeitig über alle Zeitschritte.
+
+    :param parameter: Strukturiertes Array (SPEICHER_DTYPE) der Länge N.
+    :param Q_bedarf: Wärmebedarf des Heizkreises (W), Form (T,) oder (N, T).
+    :param T_vorlauf: Soll-Vorlauftemperatur des Heizkreises (°C), z.B. aus
+        berechnung_heizkennlinie_batch, Form wie Q_bedarf oder Skalar.
+    :param an: BHKW-Fahrplan (T,) oder (N, T), z.B. aus fahrplan_optimieren
+        (stündlich, dann mit np.repeat auf dt bringen). Standard:
+        Zweipunktregelung über T_ein (oben) und T_aus (unten).
+    :param zustand: Anfangszustand (speicher_zustand), wird fortgeschrieben.
+    :param dt: Zeitschritt in s; intern wird so unterteilt, dass das
+        explizite Verfahren stabil bleibt.
+    :param schichtwerte: zusätzlich alle Schichttemperaturen (N, T, L) zurückgeben.
+    :return:
+        Strukturiertes Array (SPEICHER_ERGEBNIS_DTYPE) der Form (N, T),
+        bei schichtwerte ein Tupel (Ergebnis, Schichttemperaturen).
+    """
+    parameter = np.atleast_1d(parameter)
+    anzahl = parameter.shape[0]
+    Q_bedarf = np.asarray(Q_bedarf, dtype=np.float64)
+    schritte = Q_bedarf.shape[-1]
+    Q_bedarf = np.ascontiguousarray(np.broadcast_to(Q_bedarf, (anzahl, schritte)).T)
+    T_vorlauf = np.ascontiguousarray(
+        np.broadcast_to(np.asarray(T_vorlauf, dtype=np.float64), (anzahl, schritte)).T
+    )
+    if an is not None:
+        an = np.ascontiguousarray(np.broadcast_to(np.asarray(an, dtype=bool), (anzahl, schritte)).T)
+    if zustand is None:
+        zustand = speicher_zustand(anzahl)
+    schichten = zustand["T"].shape[1]
+
+    p = {name: np.ascontiguousarray(parameter[name]) for name in SPEICHER_DTYPE.names}
+    p["masse"] = p["volumen"] * RHO / schichten
+    # Stabilität: je Teilschritt höchstens eine Schichtmasse Durchfluss bzw. Ausgleich
+    durchsatz = (p["V_lade"] + p["V_kreis"]) * RHO / 3600.0 * CP \
+        + 2 * p["k_mischung"] + p["UA_verlust"] / schichten
+    teilschritte = max(1, int(np.ceil(np.max(durchsatz * dt / (p["masse"] * CP)))))
+    dt_teil = dt / teilschritte
+
+    T = zustand["T"].copy()
+    laeuft = zustand["laeuft"].copy()
+    ergebnis = np.empty((schritte, anzahl), dtype=SPEICHER_ERGEBNIS_DTYPE)
+    verlauf = np.empty((schritte, anzahl, schichten)) if schichtwerte else None
+    for t in range(schritte):
+        if an is None:
+            # Zweipunktregelung mit Hysterese
+            laeuft = (laeuft | (T[:, 0] < p["T_ein"])) & (T[:, -1] <= p["T_aus"])
+        else:
+            laeuft = an[t]
+        zeile = ergebnis[t]
+        zeile["an"] = laeuft
+        zeile["T_oben"], zeile["T_unten"] = T[:, 0], T[:, -1]
+        summen = None
+        for _ in range(teilschritte):
+            T, werte = speicher_schritt(p, T, laeuft, Q_bedarf[t], T_vorlauf[t], dt_teil)
+            summen = werte if summen is None else {name: summen[name] + werte[name] for name in werte}
+        for name, wert in summen.items():
+            zeile[name] = wert / teilschritte
+        if schichtwerte:
+            verlauf[t] = T
+
+    zustand["T"], zustand["laeuft"] = T, laeuft
+    ergebnis = ergebnis.T
+    if schichtwerte:
+        return ergebnis, verlauf.transpose(1, 0, 2)
+    return ergebnis
+
+def speicherinhalt(T, T_bezug: float = 0.0, volumen=1.0) -> np.ndarray:
+    """Wärmeinhalt (Wh) bezogen auf T_bezug aus Schichttemperaturen (..., L)."""
+    T = np.asarray(T, dtype=np.float64)
+    return np.asarray(volumen) * RHO * CP * (T - T_bezug).mean(axis=-1) / 3600.0
+
+
+if __name__ == "__main__":
+    import time
+
+    from BHKW_Berechnung_SW_VT import STANDARD_KENNLINIE, berechnung_heizkennlinie_batch
+    from BHKW_Heizlast import heizlast
+    from BHKW_Regelventil import regler_parameter, simuliere_regelventil
+    from BHKW_Waermeleistung import berechnung_waermeleistung_array
+
+    # Zwei Wintertage im Minutentakt: Bedarf aus heizlast(), Vorlauf aus der Heizkennlinie
+    minuten = np.arange(2 * 1440)
+    stunden = (minuten // 60) % 24
+    T_out = 2.0 - 5.0 * np.cos(2 * np.pi * (minuten / 60.0 - 3) / 24)
+    Q_bedarf = heizlast(T_out, 300.0, 20.0)
+    kennlinie = dict(STANDARD_KENNLINIE, kurve_steilheit=0.6)
+    T_vorlauf = berechnung_heizkennlinie_batch(
+        T_out, kennlinie["sollwert_raumtemperatur"], **kennlinie, stunden=stunden
+    )
+
+    p = speicher()
+    zustand = speicher_zustand()
+    inhalt_vorher = speicherinhalt(zustand["T"])[0]
+    ergebnis, schichten = simuliere_pufferspeicher(p, Q_bedarf, T_vorlauf, zustand=zustand, schichtwerte=True)
+    e = ergebnis[0]
+    bilanz = (e["Q_bhkw"].sum() - e["Q_geliefert"].sum()) / 60.0 \
+        - p["UA_verlust"][0] * (schichten[0] - p["T_umgebung"][0]).mean(axis=1).sum() / 60.0
+    print(f"BHKW-Starts: {np.count_nonzero(e['an'][1:] & ~e['an'][:-1])}, Betrieb {e['an'].mean() * 100:.0f} %")
+    print(f"Rücklauf zum BHKW: {e['T_unten'].min():.1f} … {e['T_unten'].max():.1f} °C (statt konstant 30 °C)")
+    print(f"Rücklauf Heizkreis: {e['T_ruecklauf'].min():.1f} … {e['T_ruecklauf'].max():.1f} °C, "
+          f"ungedeckt {e['Q_ungedeckt'].sum() / 60000:.2f} kWh")
+    print(f"Energiebilanz: Δ Inhalt {speicherinhalt(zustand['T'])[0] - inhalt_vorher:.1f} Wh, "
+          f"Zufuhr − Abgabe − Verlust ≈ {bilanz:.1f} Wh")
+
+    # Wärmeleistung mit den tatsächlichen Temperaturen statt T_ruecklauf = 30 °C
+    leistung, gueltig = berechnung_waermeleistung_array(e["T_bhkw_vorlauf"], e["T_unten"], p["V_lade"][0], cp=CP)
+    print(f"BHKW-Wärmeleistung aus Vorlauf/Rücklauf: {np.nanmean(leistung):.2f} kW (P_th {p['P_th'][0] / 1000:.1f} kW)")
+
+    # Mischventil: Speicher oben als Kesselseite, tatsächlicher Heizkreisrücklauf, eine Stunde im Sekundentakt
+    stunde = slice(8 * 60, 9 * 60)
+    ventil = simuliere_regelventil(
+        regler_parameter(), np.repeat(T_vorlauf[stunde], 60),
+        T_kessel=np.repeat(e["T_oben"][stunde], 60), T_ruecklauf=np.repeat(e["T_ruecklauf"][stunde], 60)
+    )[0]
+    print(f"Mischventil 08–09 Uhr: Regelabweichung Ø {np.abs(ventil['T_soll'] - ventil['T_ist'])[600:].mean():.2f} K, "
+          f"Ventil Ø {ventil['stellwert'].mean():.0f} %")
+
+    # Flotte: 200 Speicher, eine Woche im Minutentakt
+    anzahl, schritte = 200, 7 * 1440
+    rng = np.random.default_rng(0)
+    flotte = speicher(anzahl, volumen=rng.uniform(0.5, 2.0, anzahl), P_th=rng.uniform(8e3, 16e3, anzahl))
+    start = time.perf_counter()
+    simuliere_pufferspeicher(
+        flotte, np.resize(Q_bedarf, schritte) * rng.uniform(0.5, 1.2, (anzahl, 1)), np.resize(T_vorlauf, schritte)
+    )
+    dauer = time.perf_counter() - start
+    print(f"{anzahl} Speicher × {schritte} Minuten: {dauer:.2f} s "
+          f"(Heizperiode hochgerechnet {dauer * 212 * 1440 / schritte:.0f} s)")
@@ -0,0 +1,376 @@
+import asyncio
+import logging
+import math
+import struct
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from BHKW_Berechnung_SW_VT import STANDARD_KENNLINIE, berechnung_heizkennlinie
+from BHKW_Entscheidung import STATUSTEXTE, Statuscode, statuscode
+from BHKW_Heizkennlinie import MAX_FEHLER
+from BHKW_Metriken import instrumentiert
+from BHKW_Regelventil import pid_schritt, regler_parameter, regler_zustand, strecke_schritt
+
+log = logging.getLogger("bhkw.regeldienst")
+
+# --- Registerbelegung (Holding Register, Temperaturen in 0,1 °C) ---
+REG_T_AUSSEN = 0
+REG_T_RAUM = 1
+REG_T_VORLAUF_IST = 2
+REG_MELDUNGEN = 3          # Bit 0 Störung, 1 Schalter, 2 Wartung, 3 Desinfektion
+REG_STELLWERT = 10         # 0,1 %
+REG_T_VORLAUF_SOLL = 11
+REG_STATUS = 12
+REG_BHKW_AN = 13
+ANZAHL_REGISTER = 16
+
+BIT_STOERUNG, BIT_SCHALTER, BIT_WARTUNG, BIT_DESINFEKTION = 1, 2, 4, 8
+
+# --- Modbus/TCP (Funktionscodes 3 und 16) ---
+FC_LESEN = 3
+FC_SCHREIBEN = 16
+MBAP = struct.Struct(">HHHB")
+
+def _zu_register(wert: float, faktor: float = 10.0) -> int:
+    """Skaliert auf 0,1-Einheiten als vorzeichenbehaftetes 16-Bit-Register."""
+    return int(round(wert * faktor)) & 0xFFFF
+
+def _aus_register(register: int, faktor: float = 10.0) -> float:
+    return (register - 0x10000 if register & 0x8000 else register) / faktor
+
+class ModbusFehler(Exception):
+    """Modbus-Ausnahmeantwort oder ungültiger Rahmen."""
+
+class ModbusClient:
+    """
+    Minimaler asynchroner Modbus/TCP-Client (Lesen/Schreiben von Holding
+    Registern). Anfragen auf einer Verbindung werden nacheinander gestellt.
+    """
+
+    def __init__(self, host: str, port: int, unit: int = 1):
+        self.host, self.port, self.unit = host, port, unit
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._transaktion = 0
+        self._sperre = asyncio.Lock()
+
+    async def verbinden(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def trennen(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._writer = None
+
+    async def _anfrage(self, pdu: bytes) -> bytes:
+        async with self._sperre:
+            if self._writer is None:
+                await self.verbinden()
+            self._transaktion = (self._transaktion + 1) & 0xFFFF
+            try:
+                self._writer.write(MBAP.pack(self._transaktion, 0, len(pdu) + 1, self.unit) + pdu)
+                await self._writer.drain()
+                transaktion, _, laenge, _ = MBAP.unpack(await self._reader.readexactly(MBAP.size))
+                antwort = await self._reader.readexactly(laenge - 1)
+            except BaseException as fehler:
+                # Abgebrochene Anfrage (Timeout, Verbindungsfehler): die Antwort
+                # ist nicht mehr zuordenbar, also neu verbinden
+                self._writer.close()
+                self._writer = None
+                if isinstance(fehler, asyncio.IncompleteReadError):
+                    raise ModbusFehler("Verbindung während der Anfrage getrennt") from fehler
+                raise
+        if transaktion != self._transaktion:
+            raise ModbusFehler(f"Transaktion {transaktion} statt {self._transaktion}")
+        if len(antwort) < 2:
+            raise ModbusFehler(f"Antwort zu kurz: {antwort.hex()}")
+        if antwort[0] & 0x80:
+            raise ModbusFehler(f"Ausnahmecode {antwort[1]} für Funktion {antwort[0] & 0x7F}")
+        return antwort
+
+    async def lese_register(self, adresse: int, anzahl: int) -> List[int]:
+        antwort = await self._anfrage(struct.pack(">BHH", FC_LESEN, adresse, anzahl))
+        try:
+            return list(struct.unpack(f">{antwort[1] // 2}H", antwort[2:]))
+        except struct.error as fehler:
+            raise ModbusFehler(f"Unvollständige Leseantwort: {antwort.hex()}") from fehler
+
+    async def schreibe_register(self, adresse: int, werte: Sequence[int]) -> None:
+        pdu = struct.pack(f">BHHB{len(werte)}H", FC_SCHREIBEN, adresse, len(werte), 2 * len(werte), *werte)
+        await self._anfrage(pdu)
+
+class ModbusSimulator:
+    """
+    Lokaler Modbus/TCP-Ersatz für Tests: hält die Register und simuliert die
+    Anlage. Die Vorlauftemperatur folgt der geschriebenen Ventilstellung
+    über die Mischventil-Strecke aus BHKW_Regelventil; die Außentemperatur
+    kommt aus `aussentemperatur(zeit_s)`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        strecken_takt: float = 1.0,
+        aussentemperatur: Optional[Callable[[float], float]] = None,
+        verzoegerung: float = 0.0
+    ):
+        self.host, self.port = host, port
+        self.strecken_takt = strecken_takt
+        self.verzoegerung = verzoegerung
+        self.aussentemperatur = aussentemperatur or (lambda t: 2.0 - 6.0 * math.cos(2 * math.pi * t / 86400))
+        self.register = [0] * ANZAHL_REGISTER
+        self.register[REG_T_RAUM] = _zu_register(21.0)
+        self.register[REG_MELDUNGEN] = BIT_SCHALTER
+        self._parameter = regler_parameter()
+        self._zustand = regler_zustand()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._strecke: Optional[asyncio.Task] = None
+        self._verbindungen: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def starten(self) -> None:
+        self._server = await asyncio.start_server(self._verbindung, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._strecke = asyncio.create_task(self._strecke_simulieren())
+
+    async def stoppen(self) -> None:
+        self._strecke.cancel()
+        self._server.close()
+        for writer in list(self._verbindungen.values()):
+            writer.close()
+        await asyncio.gather(*self._verbindungen, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _strecke_simulieren(self) -> None:
+        zeit = 0.0
+        while True:
+            self.register[REG_T_AUSSEN] = _zu_register(self.aussentemperatur(zeit))
+            self._zustand["stellwert"] = self.register[REG_STELLWERT] / 10.0
+            T_ist = strecke_schritt(self._parameter, self._zustand)[0]
+            self.register[REG_T_VORLAUF_IST] = _zu_register(T_ist)
+            zeit += self.strecken_takt
+            await asyncio.sleep(self.strecken_takt)
+
+    async def _verbindung(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._verbindungen[asyncio.current_task()] = writer
+        try:
+            while True:
+                transaktion, protokoll, laenge, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                pdu = await reader.readexactly(laenge - 1)
+                if self.verzoegerung:
+                    await asyncio.sleep(self.verzoegerung)
+                antwort = self._bearbeiten(pdu)
+                writer.write(MBAP.pack(transaktion, protokoll, len(antwort) + 1, unit) + antwort)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            self._verbindungen.pop(asyncio.current_task(), None)
+            writer.close()
+
+    def _bearbeiten(self, pdu: bytes) -> bytes:
+        funktion = pdu[0]
+        if funktion == FC_LESEN:
+            adresse, anzahl = struct.unpack(">HH", pdu[1:5])
+            if adresse + anzahl > ANZAHL_REGISTER:
+                return bytes([funktion | 0x80, 2])
+            werte = self.register[adresse:adresse + anzahl]
+            return struct.pack(f">BB{anzahl}H", funktion, 2 * anzahl, *werte)
+        if funktion == FC_SCHREIBEN:
+            adresse, anzahl = struct.unpack(">HH", pdu[1:5])
+            if adresse + anzahl > ANZAHL_REGISTER:
+                return bytes([funktion | 0x80, 2])
+            self.register[adresse:adresse + anzahl] = struct.unpack(f">{anzahl}H", pdu[6:6 + 2 * anzahl])
+            return struct.pack(">BHH", funktion, adresse, anzahl)
+        return bytes([funktion | 0x80, 1])
+
+class ModbusQuelle:
+    """Sensorquelle: liest Temperaturen und Meldungen aus den Eingangsregistern."""
+
+    def __init__(self, client: ModbusClient):
+        self.client = client
+
+    async def lesen(self) -> Dict[str, float]:
+        r = await self.client.lese_register(REG_T_AUSSEN, REG_MELDUNGEN + 1)
+        meldungen = r[REG_MELDUNGEN]
+        return {
+            "T_aussen": _aus_register(r[REG_T_AUSSEN]),
+            "T_raum": _aus_register(r[REG_T_RAUM]),
+            "T_vorlauf_ist": _aus_register(r[REG_T_VORLAUF_IST]),
+            "Stoerung": bool(meldungen & BIT_STOERUNG),
+            "Schalter": bool(meldungen & BIT_SCHALTER),
+            "Wartungsmeldung": bool(meldungen & BIT_WARTUNG),
+            "Thermische_Desinfektion": bool(meldungen & BIT_DESINFEKTION),
+        }
+
+class ModbusZiel:
+    """Aktorziel: schreibt Stellwert, Soll-Vorlauf, Statuscode und AN/AUS."""
+
+    def __init__(self, client: ModbusClient):
+        self.client = client
+
+    async def schreiben(self, ausgaben: Dict[str, float]) -> None:
+        await self.client.schreibe_register(REG_STELLWERT, [
+            _zu_register(ausgaben["stellwert"]),
+            _zu_register(ausgaben["T_vorlauf_soll"]),
+            int(ausgaben["status"]),
+            int(ausgaben["an"]),
+        ])
+
+@dataclass
+class Zyklusstatistik:
+    """Laufzeitkennzahlen des Regeldienstes (Zeiten in Sekunden)."""
+    zyklen: int = 0
+    ueberschreitungen: int = 0
+    ausgelassene_zyklen: int = 0
+    io_fehler: int = 0
+    max_latenz: float = 0.0
+    letzte_latenz: float = 0.0
+
+class Regeldienst:
+    """
+    Echtzeit-Regelschleife mit festem Takt.
+
+    Jeder Zyklus liest alle Quellen nebenläufig, ermittelt Statuscode,
+    Soll-Vorlauftemperatur (Heizkennlinie aus vorberechneter Tabelle,
+    Fehler ≤ kennlinie["max_fehler"], Standard MAX_FEHLER) und den
+    nächsten PID-Stellwert und schreibt die Ausgaben an alle Ziele. Die
+    Zyklen laufen auf festen Zeitpunkten (start + k * takt), damit sich
+    keine Drift aufbaut.
+    Überschreitet ein Zyklus das Latenzbudget, wird das gezählt und
+    protokolliert; verpasste Zeitpunkte werden übersprungen.
+    """
+
+    def __init__(
+        self,
+        quellen: Sequence,
+        ziele: Sequence,
+        takt: float = 0.5,
+        latenzbudget: Optional[float] = None,
+        kennlinie: Optional[dict] = None,
+        regler: Optional[np.ndarray] = None,
+        uhr: Callable[[], datetime] = datetime.now
+    ):
+        self.quellen = list(quellen)
+        self.ziele = list(ziele)
+        self.takt = takt
+        self.latenzbudget = latenzbudget if latenzbudget is not None else 0.8 * takt
+        self.kennlinie = dict(STANDARD_KENNLINIE, **(kennlinie or {}))
+        self.regler = regler if regler is not None else regler_parameter()
+        self.zustand = regler_zustand()
+        self.uhr = uhr
+        self.statistik = Zyklusstatistik()
+        self.letzte_ausgaben: Dict[str, float] = {}
+
+    @instrumentiert("regelzyklus")
+    def berechnen(self, messwerte: Dict[str, float], zustand: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """
+        Reine Rechenstufe eines Zyklus (ohne I/O). Schreibt den
+        Reglerzustand `zustand` fort (Standard: self.zustand).
+        """
+        jetzt = self.uhr()
+        code = statuscode(
+            messwerte["Stoerung"],
+            messwerte["Schalter"],
+            messwerte["Wartungsmeldung"],
+            messwerte["Thermische_Desinfektion"],
+            jetzt,
+        )
+        k = self.kennlinie
+        T_soll = berechnung_heizkennlinie(
+            messwerte["T_aussen"],
+            messwerte["T_raum"],
+            k["sollwert_raumtemperatur"],
+            k["kurve_steilheit"],
+            k["kurve_fixpunkt"],
+            k["kurve_exponent"],
+            k["min_vorlauftemp"],
+            k["max_vorlauftemp"],
+            k["nachtabsenkung_delta"],
+            k["raumtemp_komp_freigabe"],
+            k["norm_raumtemperatur"],
+            k["raumtemp_komp_prozent"],
+            current_hour=jetzt.hour,
+            max_fehler=k.get("max_fehler", MAX_FEHLER),
+        )
+        if zustand is None:
+            zustand = self.zustand
+        zustand["T_ist"] = messwerte["T_vorlauf_ist"]
+        stellwert = pid_schritt(self.regler, zustand, T_soll, self.takt)[0]
+        return {
+            "stellwert": float(stellwert),
+            "T_vorlauf_soll": T_soll,
+            "status": int(code),
+            "an": code == Statuscode.EIN,
+        }
+
+    async def zyklus(self) -> None:
+        """Ein Zyklus: nebenläufig lesen, rechnen, nebenläufig schreiben."""
+        messwerte: Dict[str, float] = {}
+        for teil in await asyncio.gather(*(quelle.lesen() for quelle in self.quellen)):
+            messwerte.update(teil)
+        # Reglerzustand erst übernehmen, wenn der Stellwert geschrieben ist:
+        # bei Timeout oder I/O-Fehler laufen Integrator und last_error nicht weiter
+        zustand = self.zustand.copy()
+        ausgaben = self.berechnen(messwerte, zustand)
+        await asyncio.gather(*(ziel.schreiben(ausgaben) for ziel in self.ziele))
+        self.zustand = zustand
+        self.letzte_ausgaben = ausgaben
+
+    async def laufen(self, anzahl_zyklen: Optional[int] = None) -> Zyklusstatistik:
+        """Führt Zyklen im festen Takt aus (endlos, wenn anzahl_zyklen None ist)."""
+        loop = asyncio.get_running_loop()
+        naechster = loop.time()
+        while anzahl_zyklen is None or self.statistik.zyklen < anzahl_zyklen:
+            beginn = loop.time()
+            try:
+                await asyncio.wait_for(self.zyklus(), timeout=self.takt)
+            except (asyncio.TimeoutError, OSError, ModbusFehler) as fehler:
+                self.statistik.io_fehler += 1
+                log.warning("Zyklus %d fehlgeschlagen: %r", self.statistik.zyklen, fehler)
+            latenz = loop.time() - beginn
+
+            s = self.statistik
+            s.zyklen += 1
+            s.letzte_latenz = latenz
+            s.max_latenz = max(s.max_latenz, latenz)
+            if latenz > self.latenzbudget:
+                s.ueberschreitungen += 1
+                log.warning("Zyklus %d: Latenz %.1f ms über Budget %.1f ms",
+                            s.zyklen, latenz * 1000, self.latenzbudget * 1000)
+
+            naechster += self.takt
+            jetzt = loop.time()
+            if jetzt > naechster:
+                verpasst = math.ceil((jetzt - naechster) / self.takt)
+                s.ausgelassene_zyklen += verpasst
+                naechster += verpasst * self.takt
+            await asyncio.sleep(naechster - jetzt)
+        return self.statistik
+
+
+async def _beispiel(anzahl_zyklen: int = 20, takt: float = 0.1) -> None:
+    simulator = ModbusSimulator(strecken_takt=takt)
+    await simulator.starten()
+    client = ModbusClient(simulator.host, simulator.port)
+    await client.verbinden()
+    dienst = Regeldienst([ModbusQuelle(client)], [ModbusZiel(client)], takt=takt)
+    try:
+        statistik = await dienst.laufen(anzahl_zyklen)
+    finally:
+        await client.trennen()
+        await simulator.stoppen()
+
+    a = dienst.letzte_ausgaben
+    print(f"Zyklen: {statistik.zyklen}, Überschreitungen: {statistik.ueberschreitungen}, "
+          f"max. Latenz: {statistik.max_latenz * 1000:.2f} ms")
+    print(f"Soll-Vorlauf: {a['T_vorlauf_soll']:.1f} °C, Ventil: {a['stellwert']:.1f} %, "
+          f"{STATUSTEXTE[Statuscode(a['status'])]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_beispiel())
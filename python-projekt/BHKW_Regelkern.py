@@ -0,0 +1,370 @@
+import os
+import numpy as np
+from functools import lru_cache
+from typing import Optional
+
+import BHKW_Regelventil as rv
+from BHKW_Regelventil import ERGEBNIS_DTYPE, PARAMETER_DTYPE, ZUSTAND_DTYPE, regler_zustand
+
+def _regelschleife(p, z, sollwerte, dt, temps, ventil_oeffnung):
+    """
+    PID mit Totzone, Reset-Band und Stellwertbegrenzung plus
+    Mischventil-Strecke für eine Trajektorie, Schritt für Schritt.
+
+    Gleiche Rechenschritte in gleicher Reihenfolge wie pid_schritt und
+    strecke_schritt in BHKW_Regelventil, daher bitgleiche Ergebnisse.
+    p: Parameter in der Reihenfolge von PARAMETER_DTYPE, z: Zustand in der
+    Reihenfolge von ZUSTAND_DTYPE (wird fortgeschrieben).
+    """
+    Kp, Ki, Kd = p[0], p[1], p[2]
+    totzone, reset_band, max_delta = p[3], p[4], p[5]
+    traegheit, T_kessel, T_ruecklauf = p[6], p[7], p[8]
+    integral, last_error, stellwert, T_ist = z[0], z[1], z[2], z[3]
+
+    for t in range(len(sollwerte)):
+        error = sollwerte[t] - T_ist
+        if abs(error) < totzone:
+            error = 0.0
+        if abs(error) > reset_band:
+            integral = integral + error * dt
+        derivative = (error - last_error) / dt
+        last_error = error
+
+        # Begrenzungen als Verzweigungen statt min/max: in Numba und Python schneller
+        raw_stellwert = Kp * error + Ki * integral + Kd * derivative
+        if raw_stellwert < 0.0:
+            raw_stellwert = 0.0
+        elif raw_stellwert > 100.0:
+            raw_stellwert = 100.0
+        delta = raw_stellwert - stellwert
+        if delta < -max_delta:
+            delta = -max_delta
+        elif delta > max_delta:
+            delta = max_delta
+        stellwert = stellwert + delta
+
+        alpha = stellwert / 100.0
+        T_gemischt = alpha * T_kessel + (1 - alpha) * T_ruecklauf
+        T_ist = T_ist + (T_gemischt - T_ist) * traegheit
+
+        ventil_oeffnung[t] = stellwert
+        temps[t] = T_ist
+
+    z[0], z[1], z[2], z[3] = integral, last_error, stellwert, T_ist
+
+# Numba ist optional und wird erst beim ersten Aufruf geladen (der Import
+# allein kostet mehrere Zehntelsekunden): ohne Numba (oder mit BHKW_JIT=0)
+# läuft dieselbe Schleife als reines Python
+@lru_cache(maxsize=None)
+def _jit_kern():
+    """Mit Numba kompilierte _regelschleife oder None, wenn Numba fehlt."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    # cache=True: kompilierter Code landet in __pycache__, spätere Prozesse sparen das Kompilieren
+    return njit(cache=True, nogil=True)(_regelschleife)
+
+def jit_verfuegbar() -> bool:
+    """True, wenn Numba installiert und nicht per BHKW_JIT=0 abgeschaltet ist."""
+    return os.environ.get("BHKW_JIT", "1") != "0" and _jit_kern() is not None
+
+def simuliere_regelventil_kern(
+    parameter,
+    sollwerte,
+    zustand: Optional[np.ndarray] = None,
+    dt: float = rv.dt,
+    jit: Optional[bool] = None
+) -> np.ndarray:
+    """
+    Wie simuliere_regelventil, aber Trajektorie für Trajektorie in einer
+    skalaren Schleife über die Zeit, kompiliert mit Numba (falls
+    installiert) oder als reines Python.
+
+    Gedacht für lange Horizonte mit wenigen Trajektorien (z.B. eine
+    Heizperiode im Sekundentakt); für viele kurze Trajektorien ist die
+    vektorisierte simuliere_regelventil ohne Numba schneller.
+
+    :param jit: True erzwingt Numba, False das reine Python;
+        Standard: Numba, wenn verfügbar (jit_verfuegbar()).
+    :return:
+        Strukturiertes Array (ERGEBNIS_DTYPE) der Form (N, T), bitgleich
+        zu simuliere_regelventil.
+    """
+    if jit is None:
+        jit = jit_verfuegbar()
+    kern = _jit_kern() if jit else None
+    if jit and kern is None:
+        raise ImportError("Numba ist nicht installiert.")
+
+    parameter = np.atleast_1d(parameter)
+    anzahl = parameter.shape[0]
+    sollwerte = np.broadcast_to(np.asarray(sollwerte, dtype=np.float64), (anzahl, np.shape(sollwerte)[-1]))
+    schritte = sollwerte.shape[1]
+    if zustand is None:
+        zustand = regler_zustand(anzahl)
+
+    p = np.stack([parameter[name].astype(np.float64) for name in PARAMETER_DTYPE.names], axis=1)
+    z = np.stack([zustand[name].astype(np.float64) for name in ZUSTAND_DTYPE.names], axis=1)
+    ergebnis = np.empty((anzahl, schritte), dtype=ERGEBNIS_DTYPE)
+    ergebnis["T_soll"] = sollwerte
+
+    for i in range(anzahl):
+        if jit:
+            # Schreibt direkt in die Felder des Ergebnisses (strided, ohne Zwischenkopie)
+            kern(
+                p[i], z[i], ergebnis["T_soll"][i], float(dt), ergebnis["T_ist"][i], ergebnis["stellwert"][i]
+            )
+        else:
+            # Python-Floats und Listen: deutlich schneller als Einzelzugriffe auf NumPy-Arrays
+            z_i = z[i].tolist()
+            temps, ventil_oeffnung = [0.0] * schritte, [0.0] * schritte
+            _regelschleife(p[i].tolist(), z_i, sollwerte[i].tolist(), float(dt), temps, ventil_oeffnung)
+            z[i] = z_i
+            ergebnis["T_ist"][i] = temps
+            ergebnis["stellwert"][i] = ventil_oeffnung
+
+    for k, name in enumerate(ZUSTAND_DTYPE.names):
+        zustand[name] = z[:, k]
+    return ergebnis
+
+# Zulässiger Restfehler (K bzw. %) beim Festhalten eines eingeschwungenen Regelkreises (siehe _eingeschwungen)
+TOLERANZ_EREIGNIS = 1e-9
+# Schritte, die zwischen zwei Ruheprüfungen normal gerechnet werden: nach
+# einem Ereignis PRUEFBLOCK, danach verdoppelt bis MAX_PRUEFBLOCK (z.B. bei
+# Grenzzyklen um die Totzone, die nie zur Ruhe kommen)
+PRUEFBLOCK = 128
+MAX_PRUEFBLOCK = 2048
+# Erstes Fenster der geschlossenen Lösung in Ruhe; wird verdoppelt, solange die Totzone hält
+RUHEFENSTER = 64
+
+def _in_ruhe(p, z, dt: float) -> bool:
+    """
+    True, wenn ein Schritt mit Regelabweichung in der Totzone (error = 0)
+    den Regler nicht verändert: letzte Abweichung 0, Integral fest und der
+    Stellwert steht bereits auf dem, was P/I/D dann ergeben. Gleiche
+    Rechenschritte wie _regelschleife, damit der Vergleich exakt ist.
+    """
+    Kp, Ki, Kd, max_delta = p[0], p[1], p[2], p[5]
+    integral, last_error, stellwert = z[0], z[1], z[2]
+    if last_error != 0.0:
+        return False
+    raw_stellwert = Kp * 0.0 + Ki * integral + Kd * ((0.0 - last_error) / dt)
+    if raw_stellwert < 0.0:
+        raw_stellwert = 0.0
+    elif raw_stellwert > 100.0:
+        raw_stellwert = 100.0
+    delta = raw_stellwert - stellwert
+    if delta < -max_delta:
+        delta = -max_delta
+    elif delta > max_delta:
+        delta = max_delta
+    return stellwert + delta == stellwert
+
+def _eingeschwungen(p, z, sollwert: float, dt: float, toleranz: float) -> bool:
+    """
+    True, wenn ein Probeschritt mit diesem Sollwert das Integral nicht und
+    Abweichung, Stellwert und T_ist um höchstens toleranz·traegheit ändert
+    (toleranz = 0: bitgleicher Fixpunkt).
+
+    Die Strecke nähert sich ihrem Endwert etwa mit dem Faktor
+    (1 - traegheit) je Schritt; der beim Festhalten verworfene Rest ist
+    daher rund Änderung / traegheit, also höchstens etwa `toleranz`.
+    """
+    schranke = toleranz * p[6]
+    z_neu = list(z)
+    _regelschleife(p, z_neu, [sollwert], dt, [0.0], [0.0])
+    return z_neu[0] == z[0] and all(abs(z_neu[k] - z[k]) <= schranke for k in (1, 2, 3))
+
+def _ruhe_ueberspringen(p, z, sollwerte, anfang: int, grenze: int, temps, ventil_oeffnung) -> int:
+    """
+    Füllt Schritte ab `anfang` in Ruhe mit der geschlossenen Lösung der
+    Strecke, T_ist(k) = T_gemischt + (T_ist - T_gemischt)·(1 - traegheit)^k,
+    bis die Regelabweichung die Totzone verlässt oder `grenze` erreicht ist.
+    Rückgabe: Anzahl übersprungener Schritte.
+    """
+    totzone, traegheit = p[3], p[6]
+    alpha = z[2] / 100.0
+    T_gemischt = alpha * p[7] + (1 - alpha) * p[8]
+    t, fenster = anfang, RUHEFENSTER
+    while t < grenze:
+        n = min(fenster, grenze - t)
+        verlauf = T_gemischt + (z[3] - T_gemischt) * (1.0 - traegheit) ** np.arange(1, n + 1)
+        vorher = np.concatenate(([z[3]], verlauf[:-1]))
+        raus = np.flatnonzero(np.abs(sollwerte[t:t + n] - vorher) >= totzone)
+        k = int(raus[0]) if raus.size else n
+        if k:
+            temps[t:t + k] = verlauf[:k]
+            ventil_oeffnung[t:t + k] = z[2]
+            z[3] = float(verlauf[k - 1])
+        t += k
+        if k < n:
+            break
+        fenster *= 2
+    return t - anfang
+
+def simuliere_regelventil_ereignisse(
+    parameter,
+    sollwerte,
+    zustand: Optional[np.ndarray] = None,
+    dt: float = rv.dt,
+    T_kessel=None,
+    T_ruecklauf=None,
+    jit: Optional[bool] = None,
+    toleranz: float = TOLERANZ_EREIGNIS
+) -> np.ndarray:
+    """
+    Ereignisgesteuerte Variante von simuliere_regelventil_kern für
+    stückweise konstante oder langsam veränderliche Sollwerte.
+
+    Übersprungen werden zwei Arten von Ruhe, dazwischen rechnet der
+    normale Kern in Blöcken von PRUEFBLOCK Schritten:
+      • Fixpunkt: ein Schritt ändert den Zustand bitgleich nicht mehr
+        (eingeschwungen, auch mit Restabweichung innerhalb des Reset-Bands).
+        Bis zum nächsten Sollwertwechsel bleibt alles exakt konstant.
+      • Totzone: die Regelabweichung liegt in der Totzone und der Regler
+        steht still (siehe _in_ruhe); nur T_ist läuft geometrisch auf die
+        Mischtemperatur zu. Gefüllt wird aus der geschlossenen Lösung, bis
+        die Abweichung die Totzone verlässt (Sollwertsprung oder Störung).
+    Änderungen von T_kessel/T_ruecklauf beenden jede Ruhephase.
+
+    Das Ergebnis liegt auf demselben Zeitraster wie bei festem Schritt.
+    Abweichungen entstehen nur durch die geschlossene Lösung (Rundung) und
+    durch das Festhalten eines Regelkreises, der sich je Schritt um weniger
+    als toleranz·traegheit ändert (siehe _eingeschwungen); der verworfene
+    Rest liegt damit unabhängig von der Trägheit der Strecke in der
+    Größenordnung von `toleranz` (toleranz = 0: nur bitgleiche Fixpunkte).
+    Schwach gedämpfte Regelkreise (hohes Kp, sehr träge Strecke) verstärken
+    solche Reste über die folgenden Sprünge: mit TOLERANZ_EREIGNIS bleiben
+    die Abweichungen meist unter 1e-8 K bzw. %, bei Kp=8 und
+    traegheit=0.0005 erreichen sie etwa 5e-7. Grenzzyklen um die Totzone
+    kommen nie zur Ruhe und werden normal gerechnet. Der Gewinn ist ohne
+    Numba am größten; mit Numba ist die feste Schrittweite bereits so
+    billig, dass beide Varianten etwa gleich schnell sind.
+
+    :param T_kessel, T_ruecklauf: Optionale Zeitreihen (T,) oder (N, T) wie
+        bei simuliere_regelventil; jede Änderung ist ein Ereignis, daher
+        sollten sie stückweise konstant sein (z.B. Minutenwerte mit np.repeat).
+    :param toleranz: Zulässiger Restfehler beim Festhalten eines eingeschwungenen Regelkreises.
+    :return: Strukturiertes Array (ERGEBNIS_DTYPE) der Form (N, T).
+    """
+    if jit is None:
+        jit = jit_verfuegbar()
+    kern = _jit_kern() if jit else None
+    if jit and kern is None:
+        raise ImportError("Numba ist nicht installiert.")
+
+    parameter = np.atleast_1d(parameter)
+    anzahl = parameter.shape[0]
+    sollwerte = np.broadcast_to(np.asarray(sollwerte, dtype=np.float64), (anzahl, np.shape(sollwerte)[-1]))
+    schritte = sollwerte.shape[1]
+    if zustand is None:
+        zustand = regler_zustand(anzahl)
+
+    p = np.stack([parameter[name].astype(np.float64) for name in PARAMETER_DTYPE.names], axis=1)
+    z = np.stack([zustand[name].astype(np.float64) for name in ZUSTAND_DTYPE.names], axis=1)
+    verlaeufe = [
+        None if werte is None else np.broadcast_to(np.asarray(werte, dtype=np.float64), (anzahl, schritte))
+        for werte in (T_kessel, T_ruecklauf)
+    ]
+    ergebnis = np.empty((anzahl, schritte), dtype=ERGEBNIS_DTYPE)
+    ergebnis["T_soll"] = sollwerte
+
+    for i in range(anzahl):
+        soll, temps, ventil_oeffnung = ergebnis["T_soll"][i], ergebnis["T_ist"][i], ergebnis["stellwert"][i]
+        p_i, z_i = p[i].copy(), z[i].tolist()
+        # Ereignisse: Änderungen von T_kessel/T_ruecklauf (Indizes 7, 8 in PARAMETER_DTYPE)
+        wechsel = [schritte]
+        for verlauf in verlaeufe:
+            if verlauf is not None:
+                wechsel.append(np.flatnonzero(verlauf[i, 1:] != verlauf[i, :-1]) + 1)
+        wechsel = np.unique(np.concatenate([np.atleast_1d(w) for w in wechsel]))
+        sollwechsel = np.append(np.flatnonzero(soll[1:] != soll[:-1]) + 1, schritte)
+
+        t, block = 0, PRUEFBLOCK
+        while t < schritte:
+            for k, verlauf in zip((7, 8), verlaeufe):
+                if verlauf is not None:
+                    p_i[k] = verlauf[i, t]
+            grenze = int(wechsel[np.searchsorted(wechsel, t, side="right")])
+            if _eingeschwungen(p_i.tolist(), z_i, soll[t], float(dt), toleranz):
+                # Eingeschwungen (auch außerhalb der Totzone): bis zum nächsten Sollwertwechsel konstant
+                ende = min(grenze, int(sollwechsel[np.searchsorted(sollwechsel, t, side="right")]))
+                temps[t:ende], ventil_oeffnung[t:ende] = z_i[3], z_i[2]
+                t, block = ende, PRUEFBLOCK
+                continue
+            if abs(soll[t] - z_i[3]) < p_i[3] and _in_ruhe(p_i, z_i, dt):
+                uebersprungen = _ruhe_ueberspringen(p_i, z_i, soll, t, grenze, temps, ventil_oeffnung)
+                t += uebersprungen
+                # Kurze Ruhe (Durchgang eines Grenzzyklus durch die Totzone) zählt nicht als Ereignis
+                if uebersprungen >= PRUEFBLOCK:
+                    block = PRUEFBLOCK
+                if t >= grenze:
+                    continue
+            ende = min(t + block, grenze)
+            if jit:
+                z_arr = np.array(z_i)
+                kern(p_i, z_arr, soll[t:ende], float(dt), temps[t:ende], ventil_oeffnung[t:ende])
+                z_i = z_arr.tolist()
+            else:
+                block_temps, block_ventil = [0.0] * (ende - t), [0.0] * (ende - t)
+                _regelschleife(p_i.tolist(), z_i, soll[t:ende].tolist(), float(dt), block_temps, block_ventil)
+                temps[t:ende], ventil_oeffnung[t:ende] = block_temps, block_ventil
+            naechster_sollwechsel = sollwechsel[np.searchsorted(sollwechsel, t, side="right")]
+            block = PRUEFBLOCK if naechster_sollwechsel < ende else min(2 * block, MAX_PRUEFBLOCK)
+            t = ende
+        z[i] = z_i
+
+    for k, name in enumerate(ZUSTAND_DTYPE.names):
+        zustand[name] = z[:, k]
+    return ergebnis
+
+
+if __name__ == "__main__":
+    import time
+
+    from BHKW_Regelventil import regler_parameter, simuliere_regelventil, sollwertprofil
+
+    # 1. Bitgleichheit: vektorisiert, reines Python und (falls vorhanden) Numba
+    parameter = regler_parameter(3, Kp=[3.0, 1.5, 8.0], Ki=[0.1, 0.05, 0.3], Kd=[0.0, 0.5, 1.0])
+    sollwerte = sollwertprofil(4000) + np.sin(np.arange(4000) / 300.0)
+    referenz = simuliere_regelventil(parameter, sollwerte)
+    varianten = [False] + ([True] if _jit_kern() is not None else [])
+    for jit in varianten:
+        ergebnis = simuliere_regelventil_kern(parameter, sollwerte, jit=jit)
+        gleich = all(np.array_equal(ergebnis[name], referenz[name]) for name in ERGEBNIS_DTYPE.names)
+        print(f"{'Numba' if jit else 'Python'}: bitgleich zu simuliere_regelventil: {gleich}")
+
+    # 2. Heizperiode im Sekundentakt (212 Tage ≈ 18,3 Mio. Schritte), Sollwert folgt einem Tagesgang
+    schritte = 212 * 86_400
+    sollwerte = 45.0 + 5.0 * np.sin(2 * np.pi * np.arange(schritte) / 86_400.0)
+    if _jit_kern() is not None:
+        simuliere_regelventil_kern(regler_parameter(), sollwerte[:10], jit=True)  # Kompilieren/Cache laden
+        start = time.perf_counter()
+        ergebnis = simuliere_regelventil_kern(regler_parameter(), sollwerte, jit=True)[0]
+        print(f"Numba: {schritte:,} Schritte in {time.perf_counter() - start:.2f} s, "
+              f"Regelabweichung Ø {np.abs(ergebnis['T_soll'] - ergebnis['T_ist']).mean():.2f} K")
+    teil = 7 * 86_400
+    start = time.perf_counter()
+    simuliere_regelventil_kern(regler_parameter(), sollwerte[:teil], jit=False)
+    dauer = time.perf_counter() - start
+    print(f"Python: {teil:,} Schritte in {dauer:.2f} s (hochgerechnet {dauer * schritte / teil:.0f} s)")
+    start = time.perf_counter()
+    simuliere_regelventil(regler_parameter(), sollwerte[:86_400])
+    dauer = time.perf_counter() - start
+    print(f"Vektorisiert (N=1): 86,400 Schritte in {dauer:.2f} s (hochgerechnet {dauer * schritte / 86_400:.0f} s)")
+
+    # 3. Ereignisgesteuert: Sollwerte stundenweise konstant, 30 Tage im Sekundentakt
+    rng = np.random.default_rng(0)
+    sollwerte = np.repeat(rng.uniform(38.0, 50.0, 30 * 24), 3600)
+    parameter = regler_parameter(Kp=1.5, Ki=0.05, Kd=0.5)
+    for jit in varianten:
+        start = time.perf_counter()
+        fest = simuliere_regelventil_kern(parameter, sollwerte, jit=jit)[0]
+        dauer_fest = time.perf_counter() - start
+        start = time.perf_counter()
+        ereignisse = simuliere_regelventil_ereignisse(parameter, sollwerte, jit=jit)[0]
+        dauer_ereignisse = time.perf_counter() - start
+        abweichung = max(np.abs(fest[name] - ereignisse[name]).max() for name in ("T_ist", "stellwert"))
+        print(f"{'Numba' if jit else 'Python'}: fest {dauer_fest:.2f} s, ereignisgesteuert {dauer_ereignisse:.2f} s, "
+              f"max. Abweichung {abweichung:.1e}")
@@ -1,106 +1,249 @@
-import matplotlib.pyplot as plt
-
-# --- PID Parameter ---
-Kp = 3.0
-Ki = 0.1
-Kd = 0.0  
-
-# --- Regler-Einstellungen ---
-dt = 1.0
-sim_time = 400
-totzone = 0.3
-reset_band = 0.5
-traegheit = 0.05
-
-# --- Systemparameter ---
-T_kessel = 95
-T_ruecklauf = 30.0
-T_ist = 28.0
-
-# --- Sollwertprofil ---
-def sollwert(t):
-    return 40.0 if t < 200 else 45.0
-
-# --- Initialisierung ---
-integral = 0.0
-last_error = 0.0
-temps = []
-ventil_oeffnung = []
-sollwerte = []
-stellwert = 0.0
-
-# --- Simulation ---
-for t in range(int(sim_time)):
-    T_soll = sollwert(t)
-    error = T_soll - T_ist
-    sollwerte.append(T_soll)
-
-    if abs(error) < totzone:
-        error = 0.0
-    if abs(error) > reset_band:
-        integral += error * dt
-
-    derivative = (error - last_error) / dt
-    last_error = error
-
-    raw_stellwert = Kp * error + Ki * integral + Kd * derivative
-    raw_stellwert = max(0, min(100, raw_stellwert))
-
-    max_delta = 5.0
-    delta = raw_stellwert - stellwert
-    delta = max(-max_delta, min(max_delta, delta))
-    stellwert += delta
-
-    alpha = stellwert / 100.0
-    T_gemischt = alpha * T_kessel + (1 - alpha) * T_ruecklauf
-    T_ist += (T_gemischt - T_ist) * traegheit
-
-    temps.append(T_ist)
-    ventil_oeffnung.append(stellwert)
-
-# --- Einschwingzeit-Funktion ---
-def berechne_einschwingzeit(start_index, zielwert, toleranz=0.5, stabil_dauer=30):
-    for i in range(start_index, len(temps)):
-        if abs(temps[i] - zielwert) <= toleranz:
-            if all(abs(temps[j] - zielwert) <= toleranz for j in range(i, min(i + stabil_dauer, len(temps)))):
-                return i
-    return None
-
-einschwing_1 = berechne_einschwingzeit(0, 40.0)
-einschwing_2 = berechne_einschwingzeit(200, 45.0)
-
-# --- Ausgabe Einschwingzeit + Ventilstellung ---
-#print("\n📊 Einschwingzeiten:")
-#if einschwing_1 is not None:
-#    print(f"✅ Einschwingzeit auf 40 °C: {einschwing_1} Sekunden")
-#else:
-#    print("❌ Keine stabile Einschwingung auf 40 °C")
-
-#if einschwing_2 is not None:
-#    print(f"✅ Einschwingzeit auf 45 °C (nach Sprung): {einschwing_2 - 200} Sekunden (ab Sekunde 200)")
-#else:
-#    print("❌ Keine stabile Einschwingung auf 45 °C")
-
-# 🔧 Ventilstellung am Ende:
-print(f"\n🟢 Letzte Ventilöffnung: {ventil_oeffnung[-1]:.1f} %")
-
-# --- Plot mit Legenden ---
-fig, ax1 = plt.subplots(figsize=(10, 5))
-ax1.set_title("Stabilisierte PID-Regelung mit Trägheit, Anti-Zittern und Legende")
-ax1.set_xlabel("Zeit [s]")
-ax1.set_ylabel("T_vorlauf [°C]", color='tab:blue')
-l1 = ax1.plot(temps, label="Vorlauftemperatur (Ist)", color='tab:blue')
-l2 = ax1.plot(sollwerte, label="Vorlauftemperatur (Soll)", linestyle='--', color='red')
-
-ax2 = ax1.twinx()
-ax2.set_ylabel("Ventilöffnung [%]", color='tab:green')
-l3 = ax2.plot(ventil_oeffnung, label="Ventilöffnung", color='tab:green')
-
-# Kombinierte Legende
-lines = l1 + l2 + l3
-labels = [line.get_label() for line in lines]
-ax1.legend(lines, labels, loc="upper left")
-
-ax1.grid(True)
-fig.tight_layout()
-plt.show()
+import numpy as np
+
+from BHKW_Einschwingverhalten import einschwingzeit
+from BHKW_Metriken import instrumentiert
+
+# --- PID Parameter ---
+Kp = 3.0
+Ki = 0.1
+Kd = 0.0
+
+# --- Regler-Einstellungen ---
+dt = 1.0
+sim_time = 400
+totzone = 0.3
+reset_band = 0.5
+max_delta = 5.0
+traegheit = 0.05
+
+# --- Systemparameter ---
+T_kessel = 95
+T_ruecklauf = 30.0
+T_start = 28.0
+
+# --- Datentypen für Parametersätze, Reglerzustand und Ergebnisse ---
+PARAMETER_DTYPE = np.dtype([
+    ("Kp", np.float64),
+    ("Ki", np.float64),
+    ("Kd", np.float64),
+    ("totzone", np.float64),
+    ("reset_band", np.float64),
+    ("max_delta", np.float64),
+    ("traegheit", np.float64),
+    ("T_kessel", np.float64),
+    ("T_ruecklauf", np.float64),
+])
+
+ZUSTAND_DTYPE = np.dtype([
+    ("integral", np.float64),
+    ("last_error", np.float64),
+    ("stellwert", np.float64),
+    ("T_ist", np.float64),
+])
+
+ERGEBNIS_DTYPE = np.dtype([
+    ("T_soll", np.float64),
+    ("T_ist", np.float64),
+    ("stellwert", np.float64),
+])
+
+# --- Sollwertprofil ---
+def sollwert(t):
+    return 40.0 if t < 200 else 45.0
+
+def sollwertprofil(anzahl_schritte: int = int(sim_time)) -> np.ndarray:
+    """Sollwertprofil von sollwert(t) als Array für t = 0 … anzahl_schritte-1."""
+    return np.where(np.arange(anzahl_schritte) < 200, 40.0, 45.0)
+
+def regler_parameter(anzahl: int = 1, **werte) -> np.ndarray:
+    """
+    Erzeugt `anzahl` Parametersätze (PARAMETER_DTYPE), vorbelegt mit den
+    Modul-Standardwerten. Einzelne Felder können per Schlüsselwort als
+    Skalar oder Array der Länge `anzahl` überschrieben werden, z.B.
+    regler_parameter(3, Kp=[1.0, 2.0, 3.0]).
+    """
+    parameter = np.empty(anzahl, dtype=PARAMETER_DTYPE)
+    standard = {
+        "Kp": Kp, "Ki": Ki, "Kd": Kd,
+        "totzone": totzone, "reset_band": reset_band, "max_delta": max_delta,
+        "traegheit": traegheit, "T_kessel": T_kessel, "T_ruecklauf": T_ruecklauf,
+    }
+    for name in PARAMETER_DTYPE.names:
+        parameter[name] = werte.pop(name, standard[name])
+    if werte:
+        raise ValueError(f"Unbekannte Reglerparameter: {', '.join(sorted(werte))}")
+    return parameter
+
+def regler_zustand(anzahl: int = 1, T_ist=T_start) -> np.ndarray:
+    """Anfangszustand (ZUSTAND_DTYPE) für `anzahl` Trajektorien."""
+    zustand = np.zeros(anzahl, dtype=ZUSTAND_DTYPE)
+    zustand["T_ist"] = T_ist
+    return zustand
+
+def regler_fuer_schrittweite(parameter, schrittweite: float) -> np.ndarray:
+    """
+    Kopie der Parametersätze für Zeitschritte von `schrittweite` Sekunden.
+
+    traegheit und max_delta wirken einmal je Schritt und gelten für
+    1-s-Schritte (Modulstandard dt = 1); umgerechnet wird auf
+    1 - (1 - traegheit)**schrittweite bzw. max_delta * schrittweite.
+    I- und D-Anteil skalieren bereits über dt in pid_schritt.
+    """
+    parameter = np.array(parameter, copy=True, ndmin=1)
+    parameter["traegheit"] = 1.0 - (1.0 - parameter["traegheit"]) ** schrittweite
+    parameter["max_delta"] = parameter["max_delta"] * schrittweite
+    return parameter
+
+# --- Ein Zeitschritt für alle Trajektorien ---
+@instrumentiert("pid")
+def pid_schritt(parameter, zustand, T_soll, dt=dt) -> np.ndarray:
+    """
+    PID-Schritt mit Totzone, Integrator-Reset-Band und Stellwertbegrenzung
+    (0–100 %, höchstens max_delta pro Schritt).
+
+    `parameter` und `zustand` sind strukturierte Arrays (oder dicts mit
+    denselben Feldern); `zustand` wird in-place fortgeschrieben. Als Istwert
+    dient zustand["T_ist"].
+
+    Rückgabe:
+        Neue Ventilöffnung in %
+    """
+    error = T_soll - zustand["T_ist"]
+    error = np.where(np.abs(error) < parameter["totzone"], 0.0, error)
+    zustand["integral"] = zustand["integral"] + np.where(
+        np.abs(error) > parameter["reset_band"], error * dt, 0.0
+    )
+
+    derivative = (error - zustand["last_error"]) / dt
+    zustand["last_error"] = error
+
+    raw_stellwert = (
+        parameter["Kp"] * error
+        + parameter["Ki"] * zustand["integral"]
+        + parameter["Kd"] * derivative
+    )
+    raw_stellwert = np.clip(raw_stellwert, 0.0, 100.0)
+
+    delta = np.clip(
+        raw_stellwert - zustand["stellwert"], -parameter["max_delta"], parameter["max_delta"]
+    )
+    zustand["stellwert"] = zustand["stellwert"] + delta
+    return zustand["stellwert"]
+
+def strecke_schritt(parameter, zustand) -> np.ndarray:
+    """
+    Mischventil-Strecke: Kessel- und Rücklaufwasser werden gemäß
+    Ventilöffnung gemischt, die Vorlauftemperatur folgt mit Trägheit.
+
+    Rückgabe:
+        Neue Vorlauftemperatur (Ist) in °C
+    """
+    alpha = zustand["stellwert"] / 100.0
+    T_gemischt = alpha * parameter["T_kessel"] + (1 - alpha) * parameter["T_ruecklauf"]
+    zustand["T_ist"] = zustand["T_ist"] + (T_gemischt - zustand["T_ist"]) * parameter["traegheit"]
+    return zustand["T_ist"]
+
+# --- Simulation ---
+def simuliere_regelventil(parameter, sollwerte, zustand=None, dt=dt, T_kessel=None, T_ruecklauf=None) -> np.ndarray:
+    """
+    Simuliert N Parametersätze gleichzeitig über alle Zeitschritte.
+
+    :param parameter: Strukturiertes Array (PARAMETER_DTYPE) der Länge N.
+    :param sollwerte: Sollwertprofil, Form (T,) für alle oder (N, T) je Trajektorie.
+    :param zustand: Optionaler Anfangszustand (ZUSTAND_DTYPE, Länge N). Wird
+        in-place auf den Endzustand fortgeschrieben, sodass eine Simulation
+        abschnittsweise fortgesetzt werden kann. Standard: regler_zustand(N).
+    :param T_kessel, T_ruecklauf: Optionale Zeitreihen (T,) oder (N, T), die
+        die gleichnamigen Parameter Schritt für Schritt ersetzen, z.B.
+        Speichertemperatur oben und tatsächlicher Heizkreisrücklauf aus
+        simuliere_pufferspeicher.
+    :return:
+        Strukturiertes Array (ERGEBNIS_DTYPE) der Form (N, T).
+    """
+    parameter = np.atleast_1d(parameter)
+    anzahl = parameter.shape[0]
+    sollwerte = np.broadcast_to(np.asarray(sollwerte, dtype=np.float64), (anzahl, np.shape(sollwerte)[-1]))
+    schritte = sollwerte.shape[1]
+    if zustand is None:
+        zustand = regler_zustand(anzahl)
+
+    # Zusammenhängende Kopien der Felder: schneller als Feldzugriffe im Strukturarray
+    p = {name: np.ascontiguousarray(parameter[name]) for name in PARAMETER_DTYPE.names}
+    z = {name: zustand[name].copy() for name in ZUSTAND_DTYPE.names}
+    soll_t = np.ascontiguousarray(sollwerte.T)
+    temps = np.empty((schritte, anzahl))
+    ventil_oeffnung = np.empty((schritte, anzahl))
+    verlaeufe = {
+        name: np.ascontiguousarray(np.broadcast_to(np.asarray(werte, dtype=np.float64), (anzahl, schritte)).T)
+        for name, werte in (("T_kessel", T_kessel), ("T_ruecklauf", T_ruecklauf))
+        if werte is not None
+    }
+
+    for t in range(schritte):
+        for name, verlauf in verlaeufe.items():
+            p[name] = verlauf[t]
+        ventil_oeffnung[t] = pid_schritt(p, z, soll_t[t], dt)
+        temps[t] = strecke_schritt(p, z)
+
+    for name in ZUSTAND_DTYPE.names:
+        zustand[name] = z[name]
+
+    ergebnis = np.empty((anzahl, schritte), dtype=ERGEBNIS_DTYPE)
+    ergebnis["T_soll"] = sollwerte
+    ergebnis["T_ist"] = temps.T
+    ergebnis["stellwert"] = ventil_oeffnung.T
+    return ergebnis
+
+# --- Einschwingzeit-Funktion ---
+def berechne_einschwingzeit(temps, start_index, zielwert, toleranz=0.5, stabil_dauer=30):
+    """Einschwingindex eines Verlaufs oder None (siehe BHKW_Einschwingverhalten)."""
+    index = int(einschwingzeit(temps, zielwert, start_index, toleranz, stabil_dauer))
+    return index if index >= 0 else None
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    ergebnis = simuliere_regelventil(regler_parameter(), sollwertprofil(int(sim_time)))[0]
+    temps = ergebnis["T_ist"]
+    sollwerte = ergebnis["T_soll"]
+    ventil_oeffnung = ergebnis["stellwert"]
+
+    einschwing_1 = berechne_einschwingzeit(temps, 0, 40.0)
+    einschwing_2 = berechne_einschwingzeit(temps, 200, 45.0)
+
+    # --- Ausgabe Einschwingzeit + Ventilstellung ---
+    #print("\n📊 Einschwingzeiten:")
+    #if einschwing_1 is not None:
+    #    print(f"✅ Einschwingzeit auf 40 °C: {einschwing_1} Sekunden")
+    #else:
+    #    print("❌ Keine stabile Einschwingung auf 40 °C")
+
+    #if einschwing_2 is not None:
+    #    print(f"✅ Einschwingzeit auf 45 °C (nach Sprung): {einschwing_2 - 200} Sekunden (ab Sekunde 200)")
+    #else:
+    #    print("❌ Keine stabile Einschwingung auf 45 °C")
+
+    # 🔧 Ventilstellung am Ende:
+    print(f"\n🟢 Letzte Ventilöffnung: {ventil_oeffnung[-1]:.1f} %")
+
+    # --- Plot mit Legenden ---
+    fig, ax1 = plt.subplots(figsize=(10, 5))
+    ax1.set_title("Stabilisierte PID-Regelung mit Trägheit, Anti-Zittern und Legende")
+    ax1.set_xlabel("Zeit [s]")
+    ax1.set_ylabel("T_vorlauf [°C]", color='tab:blue')
+    l1 = ax1.plot(temps, label="Vorlauftemperatur (Ist)", color='tab:blue')
+    l2 = ax1.plot(sollwerte, label="Vorlauftemperatur (Soll)", linestyle='--', color='red')
+
+    ax2 = ax1.twinx()
+    ax2.set_ylabel("Ventilöffnung [%]", color='tab:green')
+    l3 = ax2.plot(ventil_oeffnung, label="Ventilöffnung", color='tab:green')
+
+    # Kombinierte Legende
+    lines = l1 + l2 + l3
+    labels = [line.get_label() for line in lines]
+    ax1.legend(lines, labels, loc="upper left")
+
+    ax1.grid(True)
+    fig.tight_layout()
+    plt.show()
@@ -0,0 +1,193 @@
+import numpy as np
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Tuple
+
+from BHKW_Berechnung_SW_VT import STANDARD_KENNLINIE, berechnung_heizkennlinie_batch, stunden_aus_zeitstempeln
+from BHKW_Entscheidung import Statuscode, schaltbefehle_batch, statuscodes_batch
+from BHKW_Gleitender_Mittelwert import GleitenderMittelwert
+from BHKW_Regelkern import simuliere_regelventil_ereignisse, simuliere_regelventil_kern
+from BHKW_Regelventil import regler_fuer_schrittweite, regler_parameter, regler_zustand
+from BHKW_Waermeleistung import berechnung_waermeleistung_array
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Zeitschritte pro Block (konstanter Speicherbedarf je Block)
+BLOCKGROESSE = 86_400
+
+# Ablesestunden für den Mehrtages-Mittelwert der Außentemperatur
+ABLESESTUNDEN = (7, 14, 21)
+
+SIMULATION_DTYPE = np.dtype([
+    ("zeit", "datetime64[ms]"),
+    ("T_out", np.float64),
+    ("Q_heiz", np.float64),
+    ("T_vorlauf_bedarf", np.float64),
+    ("T_vorlauf_soll", np.float64),
+    ("T_ist", np.float64),
+    ("stellwert", np.float64),
+    ("waermeleistung", np.float64),
+    ("status", np.int8),
+    ("an", np.bool_),
+])
+
+Block = Tuple[np.ndarray, np.ndarray]
+
+def aussentemperatur_bloecke(
+    stundenwerte: "pd.DataFrame",
+    dt: float = 1.0,
+    blockgroesse: int = BLOCKGROESSE
+) -> Iterator[Block]:
+    """
+    Zerlegt eine stündliche Außentemperatur (z.B. aus
+    lade_aussentemperatur_stuendlich) in Blöcke mit Zeitschritt dt [s].
+
+    Zwischen den Stundenwerten wird linear interpoliert; es wird immer nur
+    ein Block erzeugt.
+
+    Liefert:
+        Tupel (zeiten als datetime64[ms], T_out in °C) je Block.
+    """
+    if stundenwerte.empty:
+        return
+    stuetz_ms = stundenwerte.index.values.astype("datetime64[ms]").astype(np.int64)
+    stuetz_werte = stundenwerte["T_out"].to_numpy(dtype=np.float64)
+    schritt_ms = int(round(dt * 1000))
+    anzahl = (stuetz_ms[-1] - stuetz_ms[0]) // schritt_ms + 1
+
+    for anfang in range(0, anzahl, blockgroesse):
+        zeiten_ms = stuetz_ms[0] + np.arange(anfang, min(anfang + blockgroesse, anzahl)) * schritt_ms
+        yield zeiten_ms.astype("datetime64[ms]"), np.interp(zeiten_ms, stuetz_ms, stuetz_werte)
+
+def simuliere_anlage(
+    aussentemperatur: Iterable[Block],
+    UA: float,
+    T_in_set: float,
+    V_dot: float,
+    T_ruecklauf: float,
+    kennlinie: Optional[dict] = None,
+    regler: Optional[np.ndarray] = None,
+    raumtemperatur: float = 21.0,
+    signale: Optional[Callable[[np.ndarray], Tuple]] = None,
+    aussentemp_mittelwert_start: float = np.nan,
+    dt: float = 1.0,
+    cp: float = 4180,
+    rho: float = 1000,
+    ereignisgesteuert: bool = False
+) -> Iterator[np.ndarray]:
+    """
+    Verkettet alle Stufen der Anlage blockweise:
+    Wetter → Heizlast → Soll-Vorlauf (Heizkennlinie) → Ventil-PID →
+    Wärmeleistung → AN/AUS.
+
+    Zustände (PID-Integrator, Ventilstellung, Vorlauftemperatur,
+    Mehrtages-Mittelwert) werden über Blockgrenzen fortgeschrieben, sodass
+    das Ergebnis nicht von der Blockgröße abhängt und der Speicherbedarf
+    konstant bleibt. Die AN/AUS-Entscheidung wird ausgewiesen, wirkt aber
+    nicht auf die Strecke zurück.
+
+    :param aussentemperatur: Blöcke (zeiten, T_out), z.B. aus aussentemperatur_bloecke.
+    :param kennlinie: Parameter für berechnung_heizkennlinie_batch
+        (Standard: STANDARD_KENNLINIE).
+    :param regler: Ein Parametersatz (PARAMETER_DTYPE) für 1-s-Schritte;
+        Standard sind die Modulwerte aus BHKW_Regelventil mit T_ruecklauf.
+        traegheit und max_delta werden auf dt umgerechnet
+        (regler_fuer_schrittweite), damit Strecke und Ventil unabhängig
+        von der Schrittweite gleich schnell reagieren.
+    :param signale: Funktion zeiten -> (Stoerung, Schalter, Wartungsmeldung,
+        Thermische_Desinfektion) als Skalare oder Arrays; Standard: Anlage
+        störungsfrei und eingeschaltet.
+    :param aussentemp_mittelwert_start: Mittelwert bis zur ersten Ablesung.
+    :param ereignisgesteuert: Ventil mit simuliere_regelventil_ereignisse
+        (Ruhephasen übersprungen, Abweichung im Rahmen von TOLERANZ_EREIGNIS).
+    :return:
+        Generator über strukturierte Arrays (SIMULATION_DTYPE) je Block.
+    """
+    kennlinie = dict(STANDARD_KENNLINIE, **(kennlinie or {}))
+    if regler is None:
+        regler = regler_parameter(1, T_ruecklauf=T_ruecklauf)
+    regler = regler_fuer_schrittweite(regler, dt)
+    zustand = regler_zustand(1)
+    mittelwert = GleitenderMittelwert(teilfenster=True)
+    letzter_mittelwert = aussentemp_mittelwert_start
+    letzte_stunde = -1
+
+    # Massenstrom [kg/s] und Wärmekapazitätsstrom [W/K]
+    m_dot = V_dot * rho / 3600.0
+    kapazitaetsstrom = m_dot * cp
+
+    for zeiten, T_out in aussentemperatur:
+        ergebnis = np.empty(len(zeiten), dtype=SIMULATION_DTYPE)
+        ergebnis["zeit"] = zeiten
+        ergebnis["T_out"] = T_out
+
+        # 1. Heizlast (W) und benötigte Vorlauftemperatur (°C)
+        Q_heiz = np.maximum(UA * (T_in_set - T_out), 0.0)
+        ergebnis["Q_heiz"] = Q_heiz
+        ergebnis["T_vorlauf_bedarf"] = Q_heiz / kapazitaetsstrom + T_ruecklauf
+
+        # 2. Soll-Vorlauftemperatur aus der Heizkennlinie
+        stunden = stunden_aus_zeitstempeln(zeiten)
+        T_soll = berechnung_heizkennlinie_batch(
+            T_out,
+            raumtemperatur,
+            stunden=stunden,
+            **kennlinie
+        )
+        ergebnis["T_vorlauf_soll"] = T_soll
+
+        # 3. Ventil-PID mit Mischventil-Strecke, Zustand läuft weiter
+        #    (skalarer Kern: bei einer Trajektorie schneller als die vektorisierte Variante)
+        simuliere = simuliere_regelventil_ereignisse if ereignisgesteuert else simuliere_regelventil_kern
+        ventil = simuliere(regler, T_soll, zustand, dt)[0]
+        ergebnis["T_ist"] = ventil["T_ist"]
+        ergebnis["stellwert"] = ventil["stellwert"]
+
+        # 4. Wärmeleistung (kW) des Heizkreises, ΔT ≤ 0 liefert keine Leistung
+        ergebnis["waermeleistung"], _ = berechnung_waermeleistung_array(
+            ventil["T_ist"], T_ruecklauf, V_dot, rho, cp, ungueltig=0.0
+        )
+
+        # 5. Mehrtages-Mittelwert: Ablesung beim ersten Wert jeder Ablesestunde
+        vorherige = np.concatenate([[letzte_stunde], stunden[:-1]])
+        ablesung = np.isin(stunden, ABLESESTUNDEN) & (stunden != vorherige)
+        letzte_stunde = stunden[-1]
+        nach_ablesung = np.concatenate(
+            [[letzter_mittelwert], mittelwert.hinzufuegen_array(T_out[ablesung])]
+        )
+        mittel = nach_ablesung[np.cumsum(ablesung)]
+        letzter_mittelwert = nach_ablesung[-1]
+
+        # 6. Statuscode und AN/AUS
+        flags = signale(zeiten) if signale is not None else (False, True, False, False)
+        codes = statuscodes_batch(*flags, stunden=stunden)
+        ergebnis["status"] = codes
+        ergebnis["an"] = schaltbefehle_batch(codes, mittel)
+
+        yield ergebnis
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    # Beispiel: eine Woche mit Tagesgang der Außentemperatur, 10-s-Schritte
+    stunden_index = pd.date_range("2024-01-08", periods=7 * 24 + 1, freq="h", name="DateTime")
+    tagesgang = 2.0 - 6.0 * np.cos(2 * np.pi * (stunden_index.hour - 3) / 24)
+    wetter = pd.DataFrame({"T_out": tagesgang}, index=stunden_index)
+
+    energie_kwh = 0.0
+    laufzeit_h = 0.0
+    for block in simuliere_anlage(
+        aussentemperatur_bloecke(wetter, dt=10.0, blockgroesse=8640),
+        UA=300.0, T_in_set=20.0, V_dot=0.5, T_ruecklauf=30.0, dt=10.0,
+    ):
+        energie_kwh += block["waermeleistung"].sum() * 10.0 / 3600.0
+        laufzeit_h += block["an"].sum() * 10.0 / 3600.0
+        print(
+            f"{block['zeit'][0].astype('datetime64[D]')}: "
+            f"T_ist Ø {block['T_ist'].mean():5.1f} °C, "
+            f"Ventil Ø {block['stellwert'].mean():5.1f} %, "
+            f"AN {block['an'].sum() * 10.0 / 3600.0:4.1f} h, "
+            f"{Statuscode(block['status'][-1]).name}"
+        )
+
+    print(f"\nWärmemenge: {energie_kwh:.0f} kWh, BHKW-Laufzeit: {laufzeit_h:.1f} h")
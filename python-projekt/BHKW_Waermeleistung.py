@@ -1,3 +1,11 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from BHKW_Metriken import instrumentiert
+from BHKW_Plot import dezimiere, rendere_zeitreihen
+
+@instrumentiert("waermeleistung")
 def berechnung_waermeleistung(
     vorlauftemp: float,
     ruecklauftemp: float,
@@ -46,35 +54,145 @@ def berechnung_waermeleistung(
 
 
 
+def berechnung_waermeleistung_array(
+    vorlauftemp,
+    ruecklauftemp,
+    volumenstrom_m3h,
+    dichte: float = 1000.0,
+    cp: float = 4184.0,
+    ungueltig: float = np.nan
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vektorisierte Wärmeleistung (kW) für ganze Messreihen, gleiche Formel
+    wie berechnung_waermeleistung.
+
+    Statt bei ΔT ≤ 0 abzubrechen, wird für diese Messwerte `ungueltig`
+    eingesetzt (Standard NaN, für die Wärmemengenzählung z.B. 0.0).
+
+    Rückgabe:
+      (Wärmeleistung in kW, Bool-Array gültiger Messwerte mit ΔT > 0)
+    """
+    delta_t = np.subtract(vorlauftemp, ruecklauftemp, dtype=np.float64)
+    gueltig = delta_t > 0
+    waermeleistung_kw = dichte * (np.asarray(volumenstrom_m3h) / 3600.0) * cp * delta_t / 1000.0
+    waermeleistung_kw = np.where(gueltig, waermeleistung_kw, ungueltig)
+    return waermeleistung_kw, gueltig
+
+def _intervalle(zeitstempel, leistung_kw) -> Tuple[np.ndarray, np.ndarray]:
+    """Zeitstempel als datetime64[ns] und Energie (kWh) je Intervall [t_i, t_i+1)."""
+    # Nanosekunden: Sekundenbruchteile (z.B. aus simuliere_anlage mit dt < 1 s) bleiben erhalten
+    zeiten = np.asarray(zeitstempel, dtype="datetime64[ns]")
+    stunden = np.diff(zeiten).astype(np.float64) / 3.6e12
+    leistung = np.nan_to_num(np.asarray(leistung_kw, dtype=np.float64)[:-1], nan=0.0)
+    return zeiten, leistung * stunden
+
+def integriere_energie(zeitstempel, leistung_kw) -> np.ndarray:
+    """
+    Laufende Wärmemenge (kWh) ab dem ersten Zeitstempel.
+
+    Jede Leistung gilt bis zum nächsten Zeitstempel (Rechteckregel wie bei
+    einem Wärmemengenzähler); NaN zählt als 0 kW.
+    """
+    _, energie = _intervalle(zeitstempel, leistung_kw)
+    return np.concatenate([[0.0], np.cumsum(energie)])
+
+def energie_buckets(zeitstempel, leistung_kw, periode: str = "D") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wärmemenge (kWh) je Tag ("D") oder Monat ("M").
+
+    Ein Intervall zählt vollständig zu der Periode, in der es beginnt.
+    Die Zeitstempel müssen aufsteigend sortiert sein.
+
+    Rückgabe:
+      (Periodenbeginn als datetime64, kWh je Periode)
+    """
+    zeiten, energie = _intervalle(zeitstempel, leistung_kw)
+    perioden = zeiten[:-1].astype(f"datetime64[{periode}]")
+    if perioden.size == 0:
+        return perioden, energie
+    anfaenge = np.flatnonzero(np.concatenate([[True], perioden[1:] != perioden[:-1]]))
+    return perioden[anfaenge], np.add.reduceat(energie, anfaenge)
+
+class Waermemengenzaehler:
+    """
+    Laufende Wärmemengenzählung über beliebig viele Messblöcke.
+
+    Der letzte Messwert eines Blocks wird gemerkt, damit das Intervall bis
+    zum ersten Messwert des nächsten Blocks mitgezählt wird. Summiert wird
+    gesamt sowie je Tag und Monat.
+    """
+
+    __slots__ = ("gesamt_kwh", "tage", "monate", "_letzte_zeit", "_letzte_leistung")
+
+    def __init__(self):
+        self.gesamt_kwh = 0.0
+        self.tage: Dict[np.datetime64, float] = {}
+        self.monate: Dict[np.datetime64, float] = {}
+        self._letzte_zeit: Optional[np.datetime64] = None
+        self._letzte_leistung = 0.0
+
+    def hinzufuegen(self, zeitstempel, leistung_kw) -> float:
+        """Zählt einen Block (aufsteigende Zeitstempel) und gibt dessen kWh zurück."""
+        zeiten = np.asarray(zeitstempel, dtype="datetime64[ns]")
+        leistung = np.asarray(leistung_kw, dtype=np.float64)
+        if zeiten.size == 0:
+            return 0.0
+        if self._letzte_zeit is not None:
+            zeiten = np.concatenate([[self._letzte_zeit], zeiten])
+            leistung = np.concatenate([[self._letzte_leistung], leistung])
+        self._letzte_zeit, self._letzte_leistung = zeiten[-1], leistung[-1]
+
+        _, intervalle = _intervalle(zeiten, leistung)
+        summe = float(intervalle.sum())
+        for ablage, periode in ((self.tage, "D"), (self.monate, "M")):
+            perioden, energie = energie_buckets(zeiten, leistung, periode)
+            for beginn, kwh in zip(perioden, energie):
+                ablage[beginn] = ablage.get(beginn, 0.0) + kwh
+        self.gesamt_kwh += summe
+        return summe
+
 def plot_waermeleistung_zeitverlauf(
     timestamps: List[datetime],
     vorlauf_temps: List[float],
     ruecklauf_temps: List[float],
     volumenstrom_m3h: List[float],
     dichte: float = 1000.0,
-    cp: float = 4184.0
+    cp: float = 4184.0,
+    datei: Optional[str] = None
 ) -> None:
     """
     Plottet die Wärmeleistung (kW) über gegebene Zeitpunkte.
+    Messwerte mit ΔT ≤ 0 erscheinen als Lücke. Lange Reihen werden auf
+    Bildschirmauflösung dezimiert.
 
-    :param timestamps: Liste von datetime-Objekten.
+    :param timestamps: Liste von datetime-Objekten (oder datetime64-Array).
     :param vorlauf_temps: Liste von Vorlauftemperaturen (°C).
     :param ruecklauf_temps: Liste von Rücklauftemperaturen (°C).
     :param volumenstrom_m3h: Liste von Volumenstrom-Werten (m³/h).
+    :param datei: Zieldatei (.png/.svg); dann ohne Display statt plt.show().
     """
-    leisten = []
-    for v, r, qv in zip(vorlauf_temps, ruecklauf_temps, volumenstrom_m3h):
-        leisten.append(berechnung_waermeleistung(v, r, qv, dichte, cp))
-    
+    leisten, _ = berechnung_waermeleistung_array(
+        vorlauf_temps, ruecklauf_temps, volumenstrom_m3h, dichte, cp
+    )
+    zeiten = np.asarray(timestamps, dtype="datetime64[ms]")
+
+    if datei is not None:
+        rendere_zeitreihen(
+            datei, zeiten, {"Wärmeleistung": leisten},
+            titel="Wärmeleistung über Zeit", ylabel="Wärmeleistung (kW)"
+        )
+        return
+
+    import matplotlib.pyplot as plt
+
     plt.figure()
-    plt.plot(timestamps, leisten)
+    plt.plot(*dezimiere(zeiten, leisten))
     plt.xlabel("Zeit")
     plt.ylabel("Wärmeleistung (kW)")
     plt.title("Wärmeleistung über Zeit")
     plt.grid(True)
     plt.show()
 
-
 if __name__ == "__main__":
     # Beispielaufruf
     tv = 60.0    # Vorlauftemperatur in °C
@@ -83,3 +201,9 @@ if __name__ == "__main__":
 
     leistung = berechnung_waermeleistung(tv, tr, qv)
     print(f"Wärmeleistung: {leistung:.2f} kW")
+
+    # Wärmemenge eines Tages mit 1-Minuten-Werten
+    zeiten = np.arange("2024-01-15T00:00", "2024-01-16T00:00", dtype="datetime64[m]")
+    vorlauf = 60.0 + 5.0 * np.sin(np.linspace(0, 2 * np.pi, zeiten.size))
+    leistungen, _ = berechnung_waermeleistung_array(vorlauf, tr, qv, ungueltig=0.0)
+    print(f"Wärmemenge am 15.01.: {integriere_energie(zeiten, leistungen)[-1]:.1f} kWh")
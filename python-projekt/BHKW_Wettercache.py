@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+# Standardverzeichnis (None = Cache aus) und Größenlimit des Caches
+CACHE_VERZEICHNIS = os.environ.get("BHKW_CACHE_DIR")
+CACHE_MAX_BYTES = int(os.environ.get("BHKW_CACHE_MAX_BYTES", 1024 ** 3))
+
+# Bei Änderungen am Parser erhöhen, damit alte Einträge nicht mehr passen
+CACHE_VERSION = 1
+
+def datei_hash(pfad: str, blockgroesse: int = 1 << 20) -> str:
+    """SHA-256 über den Dateiinhalt, blockweise gelesen."""
+    h = hashlib.sha256()
+    with open(pfad, "rb") as f:
+        for block in iter(lambda: f.read(blockgroesse), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_schluessel(pfade: Union[str, Sequence[str]], **optionen) -> str:
+    """Schlüssel aus den Inhalts-Hashes aller Quelldateien und den Parse-Optionen."""
+    pfade = [pfade] if isinstance(pfade, str) else list(pfade)
+    inhalt = {
+        "version": CACHE_VERSION,
+        "dateien": [datei_hash(p) for p in pfade],
+        "optionen": optionen,
+    }
+    kodiert = json.dumps(inhalt, sort_keys=True, default=str).encode()
+    return hashlib.sha256(kodiert).hexdigest()[:32]
+
+def _dateien(verzeichnis: Path, schluessel: str):
+    return verzeichnis / f"{schluessel}.zeit.npy", verzeichnis / f"{schluessel}.T_out.npy"
+
+def cache_lesen(schluessel: str, verzeichnis: str) -> Optional[pd.DataFrame]:
+    """
+    Lädt eine gecachte stündliche Außentemperatur als DataFrame.
+
+    Die Werte werden per Memory-Map gelesen; der Zugriff aktualisiert die
+    Änderungszeit, die der Verdrängung als LRU-Kriterium dient.
+    Rückgabe None, wenn kein (vollständiger) Eintrag existiert.
+    """
+    zeit_datei, wert_datei = _dateien(Path(verzeichnis), schluessel)
+    try:
+        zeiten = np.load(zeit_datei, mmap_mode="r")
+        werte = np.load(wert_datei, mmap_mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+    if zeiten.shape != werte.shape:
+        return None
+    for datei in (zeit_datei, wert_datei):
+        os.utime(datei)
+
+    index = pd.DatetimeIndex(zeiten, name="DateTime", freq="h")
+    return pd.DataFrame({"T_out": werte}, index=index, copy=False)
+
+def cache_schreiben(
+    schluessel: str,
+    df: pd.DataFrame,
+    verzeichnis: str,
+    max_bytes: int = CACHE_MAX_BYTES
+) -> None:
+    """
+    Speichert die Spalte "T_out" samt Zeitindex als .npy-Dateien.
+
+    Geschrieben wird über temporäre Dateien und os.replace, damit parallel
+    laufende Prozesse nie halbe Einträge sehen. Danach wird der Cache auf
+    max_bytes verkleinert.
+    """
+    ordner = Path(verzeichnis)
+    ordner.mkdir(parents=True, exist_ok=True)
+    spalten = (
+        np.asarray(df.index.values),
+        df["T_out"].to_numpy(dtype=np.float64),
+    )
+    for datei, werte in zip(_dateien(ordner, schluessel), spalten):
+        # Prozess- und Thread-Kennung: parallele Schreiber desselben Schlüssels kommen sich nicht in die Quere
+        tmp = datei.with_name(f"{datei.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, werte)
+        os.replace(tmp, datei)
+    cache_aufraeumen(verzeichnis, max_bytes)
+
+def cache_aufraeumen(verzeichnis: str, max_bytes: int = CACHE_MAX_BYTES) -> int:
+    """
+    Verdrängt die am längsten nicht genutzten Einträge, bis die Gesamtgröße
+    höchstens max_bytes beträgt.
+
+    Rückgabe:
+        Anzahl gelöschter Einträge.
+    """
+    eintraege = {}
+    for datei in Path(verzeichnis).glob("*.npy"):
+        try:
+            info = datei.stat()
+        except FileNotFoundError:
+            continue
+        schluessel = datei.name.split(".", 1)[0]
+        groesse, zuletzt = eintraege.get(schluessel, (0, 0.0))
+        eintraege[schluessel] = (groesse + info.st_size, max(zuletzt, info.st_mtime))
+
+    gesamt = sum(groesse for groesse, _ in eintraege.values())
+    geloescht = 0
+    for schluessel, (groesse, _) in sorted(eintraege.items(), key=lambda e: e[1][1]):
+        if gesamt <= max_bytes:
+            break
+        for datei in _dateien(Path(verzeichnis), schluessel):
+            datei.unlink(missing_ok=True)
+        gesamt -= groesse
+        geloescht += 1
+    return geloescht
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+from BHKW_Wettercache import CACHE_VERZEICHNIS, cache_lesen, cache_schluessel, cache_schreiben
+
+# Bekannte Zeitstempel-Formate: ISO, deutsch, DWD (MESS_DATUM)
+ZEITFORMATE = ("%Y-%m-%d %H:%M:%S", "%d.%m.%Y %H:%M", "%Y%m%d%H%M")
+
+# Zeilen pro eingelesenem Block (begrenzt den Speicherbedarf)
+CHUNKGROESSE = 200_000
+
+Pfade = Union[str, Sequence[str]]
+
+def erkenne_zeitformat(
+    werte: Iterable[str],
+    formate: Sequence[str] = ZEITFORMATE
+) -> Optional[str]:
+    """
+    Bestimmt anhand einer Stichprobe von Zeitstempeln das passende Format.
+
+    Rückgabe:
+        Das Format aus `formate`, das die meisten Werte parsen kann,
+        oder None, wenn keines passt.
+    """
+    probe = pd.Series(list(werte), dtype=str).dropna()
+    bestes_format, beste_treffer = None, 0
+    for fmt in formate:
+        treffer = pd.to_datetime(probe, format=fmt, errors="coerce").notna().sum()
+        if treffer > beste_treffer:
+            bestes_format, beste_treffer = fmt, treffer
+    return bestes_format
+
+def parse_zeitstempel(
+    werte: pd.Series,
+    zeitformat: str,
+    formate: Sequence[str] = ZEITFORMATE
+) -> pd.Series:
+    """
+    Parst Zeitstempel vektorisiert mit dem erkannten Format. Werte, die
+    nicht passen, werden mit den übrigen Formaten nachgeparst; was dann
+    noch übrig bleibt, wird NaT.
+    """
+    zeiten = pd.to_datetime(werte, format=zeitformat, errors="coerce")
+    for fmt in formate:
+        fehlend = zeiten.isna() & werte.notna()
+        if fmt == zeitformat or not fehlend.any():
+            continue
+        zeiten[fehlend] = pd.to_datetime(werte[fehlend], format=fmt, errors="coerce")
+    return zeiten
+
+def temperatur_aus_rohwerten(werte: pd.Series) -> np.ndarray:
+    """
+    Wandelt Rohwerte in °C um: alle Nicht-Ziffern entfernen, durch 1000 teilen.
+
+    Bestehen alle Werte nur aus einer Ganzzahl, reicht eine numerische
+    Umwandlung ohne Regex (gleiches Ergebnis, Vorzeichen entfällt ebenso).
+    """
+    zahlen = pd.to_numeric(werte, errors="coerce")
+    if not pd.api.types.is_integer_dtype(zahlen.dtype):
+        ziffern = werte.astype(str).str.replace(r"[^0-9]", "", regex=True)
+        zahlen = pd.to_numeric(ziffern, errors="coerce")
+    return np.abs(zahlen.to_numpy(dtype=np.float64)) / 1000.0
+
+def lies_wetterdaten_chunks(
+    weather_csv: Pfade,
+    chunkgroesse: int = CHUNKGROESSE,
+    zeitformat: Optional[str] = None,
+    zeitspalte: int = 0,
+    tempspalte: int = 1,
+    sep: str = ";",
+    encoding: str = "latin1"
+) -> Iterator[pd.DataFrame]:
+    """
+    Liest eine oder mehrere Wetter-CSV-Dateien blockweise ein.
+
+    Das Zeitformat wird je Datei einmal aus dem ersten Block erkannt (sofern
+    nicht vorgegeben) und danach vektorisiert geparst. Zeilen ohne gültigen
+    Zeitstempel werden verworfen; Duplikate bleiben erhalten.
+
+    Liefert:
+        DataFrames mit DatetimeIndex "DateTime" und Spalte "T_out" (°C).
+    """
+    pfade = [weather_csv] if isinstance(weather_csv, str) else list(weather_csv)
+    for pfad in pfade:
+        fmt = zeitformat
+        bloecke = pd.read_csv(
+            pfad,
+            sep=sep,
+            usecols=[zeitspalte, tempspalte],
+            header=0,
+            dtype=str,
+            encoding=encoding,
+            chunksize=chunkgroesse,
+        )
+        for block in bloecke:
+            zeit_roh = block.iloc[:, 0].str.strip()
+            if fmt is None:
+                fmt = erkenne_zeitformat(zeit_roh.head(100))
+                if fmt is None:
+                    raise ValueError(f"Unbekanntes Zeitformat in {pfad}: {zeit_roh.iloc[0]!r}")
+            zeiten = parse_zeitstempel(zeit_roh, fmt)
+            gueltig = zeiten.notna().to_numpy()
+            yield pd.DataFrame(
+                {"T_out": temperatur_aus_rohwerten(block.iloc[:, 1])[gueltig]},
+                index=pd.DatetimeIndex(zeiten[gueltig], name="DateTime"),
+            )
+
+def lade_aussentemperatur_stuendlich(
+    weather_csv: Pfade,
+    chunkgroesse: int = CHUNKGROESSE,
+    zeitformat: Optional[str] = None,
+    cache_verzeichnis: Optional[str] = CACHE_VERZEICHNIS,
+    **lese_optionen
+) -> pd.DataFrame:
+    """
+    Liefert die stündliche Außentemperatur "T_out" mit interpolierten Lücken.
+
+    Mit cache_verzeichnis (Standard: Umgebungsvariable BHKW_CACHE_DIR) wird
+    das Ergebnis je Dateiinhalt und Parse-Optionen als .npy abgelegt und bei
+    späteren Aufrufen per Memory-Map geladen, ohne die CSV erneut zu parsen.
+    """
+    if not cache_verzeichnis:
+        return _stundenraster(weather_csv, chunkgroesse, zeitformat, **lese_optionen)
+
+    schluessel = cache_schluessel(weather_csv, zeitformat=zeitformat, **lese_optionen)
+    df = cache_lesen(schluessel, cache_verzeichnis)
+    if df is None:
+        df = _stundenraster(weather_csv, chunkgroesse, zeitformat, **lese_optionen)
+        cache_schreiben(schluessel, df, cache_verzeichnis)
+    return df
+
+def _stundenraster(
+    weather_csv: Pfade,
+    chunkgroesse: int,
+    zeitformat: Optional[str],
+    **lese_optionen
+) -> pd.DataFrame:
+    """
+    Ergebnis wie df.asfreq("h").interpolate() auf den gesamten Daten
+    (Raster ab dem frühesten Zeitstempel, bei Duplikaten zählt der erste
+    Wert), aber blockweise: von jedem Block werden nur Zeilen behalten,
+    die auf das Stundenraster fallen.
+    """
+    stunde = np.timedelta64(1, "h").astype("timedelta64[ns]").astype(np.int64)
+
+    def raster_werte(anker: Optional[int]):
+        teile, t_min, t_max = [], None, None
+        for block in lies_wetterdaten_chunks(weather_csv, chunkgroesse, zeitformat, **lese_optionen):
+            if block.empty:
+                continue
+            ns = block.index.as_unit("ns").asi8
+            if anker is None:
+                anker = int(ns[0])
+            t_min = ns.min() if t_min is None else min(t_min, ns.min())
+            t_max = ns.max() if t_max is None else max(t_max, ns.max())
+            teile.append(block[(ns - anker) % stunde == 0])
+        return teile, anker, t_min, t_max
+
+    teile, anker, t_min, t_max = raster_werte(None)
+    if not teile:
+        return pd.DataFrame({"T_out": []}, index=pd.DatetimeIndex([], name="DateTime", freq="h"))
+    if (t_min - anker) % stunde != 0:
+        # Unsortierte Datei: Raster hängt am frühesten Zeitstempel, neu einlesen
+        teile, anker, t_min, t_max = raster_werte(int(t_min))
+
+    df = pd.concat(teile)
+    df = df[~df.index.duplicated(keep="first")]
+    raster = pd.date_range(
+        pd.Timestamp(t_min), pd.Timestamp(t_max), freq="h", name="DateTime", unit=df.index.unit
+    )
+    return df.reindex(raster).interpolate()
@@ -1,4 +1,6 @@
-import matplotlib.pyplot as plt
+import sys
+
+from BHKW_Heizlast import vorlauf_aus_heizlast
 
 # --- Konstanten ---
 cp = 4180           # spezifische Wärmekapazität [J/kg·K]
@@ -6,30 +8,38 @@ rho = 1000          # Dichte Wasser [kg/m³]
 V_dot = 0.5         # Volumenstrom [m³/h]
 T_ruecklauf = 30.0  # Rücklauftemperatur [°C]
 
-# --- Massenstrom berechnen ---
-m_dot = V_dot * rho / 3600  # [kg/s]
-
 # --- Beispielhafte Heizlast in W pro Stunde (24h-Tagesverlauf) ---
 Q_heizlast = [
     6000, 5800, 5600, 5400, 5200, 5000, 4800, 4600, 4000, 3500, 3200, 3000,
     2800, 2700, 2600, 2500, 3000, 4000, 4500, 5000, 5500, 5800, 6000, 6200
 ]
 
-# --- Vorlauftemperatur berechnen ---
-T_vorlauf = [(Q / (m_dot * cp)) + T_ruecklauf for Q in Q_heizlast]
-
-# --- Ausgabe + Plot ---
-for stunde, (Q, T_vl) in enumerate(zip(Q_heizlast, T_vorlauf)):
-    print(f"{stunde:02d}:00 - Heizlast: {Q:4.0f} W → Vorlauf: {T_vl:.2f} °C")
-
-# Plot
-plt.figure(figsize=(10, 5))
-plt.plot(range(24), T_vorlauf, marker='o')
-plt.title("Vorlauftemperatur über 24h bei stündlich variierender Heizlast")
-plt.xlabel("Stunde des Tages")
-plt.ylabel("Vorlauftemperatur [°C]")
-plt.grid(True)
-plt.xticks(range(0, 24))
-plt.tight_layout()
-plt.show()
-	
\ No newline at end of file
+
+if __name__ == "__main__":
+    import matplotlib
+
+    # Optional: Zieldatei als Argument → ohne Display rendern
+    if len(sys.argv) > 1:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    # --- Vorlauftemperatur berechnen ---
+    T_vorlauf = vorlauf_aus_heizlast(Q_heizlast, V_dot, T_ruecklauf, cp, rho)
+
+    # --- Ausgabe + Plot ---
+    for stunde, (Q, T_vl) in enumerate(zip(Q_heizlast, T_vorlauf)):
+        print(f"{stunde:02d}:00 - Heizlast: {Q:4.0f} W → Vorlauf: {T_vl:.2f} °C")
+
+    # Plot
+    plt.figure(figsize=(10, 5))
+    plt.plot(range(24), T_vorlauf, marker='o')
+    plt.title("Vorlauftemperatur über 24h bei stündlich variierender Heizlast")
+    plt.xlabel("Stunde des Tages")
+    plt.ylabel("Vorlauftemperatur [°C]")
+    plt.grid(True)
+    plt.xticks(range(0, 24))
+    plt.tight_layout()
+    if len(sys.argv) > 1:
+        plt.savefig(sys.argv[1])
+    else:
+        plt.show()